@@ -289,22 +289,22 @@ class Ui_MainWindow(object):
         self.label_log.setFont(font)
         self.label_log.setObjectName("label_log")
         self.verticalLayout_4.addWidget(self.label_log)
-        self.listWidget_log = QtWidgets.QListWidget(self.verticalWidget_4)
-        self.listWidget_log.setMinimumSize(QtCore.QSize(0, 200))
-        self.listWidget_log.setMaximumSize(QtCore.QSize(1000, 300))
+        self.listView_log = QtWidgets.QListView(self.verticalWidget_4)
+        self.listView_log.setMinimumSize(QtCore.QSize(0, 200))
+        self.listView_log.setMaximumSize(QtCore.QSize(1000, 300))
         font = QtGui.QFont()
         font.setPointSize(10)
-        self.listWidget_log.setFont(font)
-        self.listWidget_log.setStyleSheet("QFrame, QLabel, QToolTip {\n"
+        self.listView_log.setFont(font)
+        self.listView_log.setStyleSheet("QFrame, QLabel, QToolTip {\n"
 "    border: 2px solid #2979ff;\n"
 "    border-radius: 4px;\n"
 "    padding: 2px;\n"
 "}")
-        self.listWidget_log.setFrameShape(QtWidgets.QFrame.Box)
-        self.listWidget_log.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAsNeeded)
-        self.listWidget_log.setWordWrap(True)
-        self.listWidget_log.setObjectName("listWidget_log")
-        self.verticalLayout_4.addWidget(self.listWidget_log)
+        self.listView_log.setFrameShape(QtWidgets.QFrame.Box)
+        self.listView_log.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAsNeeded)
+        self.listView_log.setWordWrap(True)
+        self.listView_log.setObjectName("listView_log")
+        self.verticalLayout_4.addWidget(self.listView_log)
         self.horizontalLayout_2.addWidget(self.verticalWidget_4)
         self.horizontalLayout_9.addWidget(self.horizontalWidget)
         self.scrollArea.setWidget(self.scrollAreaWidgetContents)
@@ -1,7 +1,10 @@
 import sys
 import os
 import csv
+import io
+import logging
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
 from pathlib import Path
 import datetime
 from PyQt5 import QtWidgets, QtGui, QtCore
@@ -12,20 +15,42 @@ from GUI.rapiid_GUI import Ui_MainWindow  # importing main window of the GUI
 import cv2
 import numpy as np
 import pylibdmtx.pylibdmtx as dmtx
+import scripts.applog as applog
+import scripts.calibration as calibration
+import scripts.catalogue as catalogue
+import scripts.colourprofile as colourprofile
+import scripts.staging as staging
+import scripts.container as container
+import scripts.journal as journal
+import scripts.autocapture as autocapture
+import scripts.derivatives as derivatives
+import scripts.focusstack as focusstack
+import scripts.labelcrop as labelcrop
+import scripts.multicode as multicode
+import scripts.ocr as ocr
+import scripts.quality as quality
+import scripts.review as review
+import scripts.sharpness as sharpness
+import scripts.stability as stability
+
+# Diagnostics go to the session log file (see scripts/applog.py); messages for
+# the operator go through ui_log, which also feeds the in-app log panel
+log = logging.getLogger("rapiid")
+ui_log = logging.getLogger("rapiid.ui")
 
 # Optional imports with error handling
 try:
     import scripts.ymlRW as ymlRW
     YML_AVAILABLE = True
 except ImportError:
-    print("Warning: scripts.ymlRW not available. Config file functionality disabled.")
+    log.warning("scripts.ymlRW not available. Config file functionality disabled.")
     YML_AVAILABLE = False
 
 try:
     from qt_material import apply_stylesheet
     QT_MATERIAL_AVAILABLE = True
 except ImportError:
-    print("Warning: qt_material not available. Using default theme.")
+    log.warning("qt_material not available. Using default theme.")
     QT_MATERIAL_AVAILABLE = False
 
 try:
@@ -33,9 +58,31 @@ try:
     import piexif
     EXIF_AVAILABLE = True
 except ImportError:
-    print("Warning: PIL/piexif not available. EXIF embedding disabled.")
+    log.warning("PIL/piexif not available. EXIF embedding disabled.")
     EXIF_AVAILABLE = False
 
+try:
+    import scripts.encoders as encoders
+    import scripts.highbit as highbit
+    ENCODERS_AVAILABLE = True
+except ImportError:
+    log.warning("scripts.encoders not available. Saving JPEG only.")
+    ENCODERS_AVAILABLE = False
+
+try:
+    import scripts.replay as replay
+    REPLAY_AVAILABLE = True
+except ImportError:
+    log.warning("scripts.replay not available. Record/replay disabled.")
+    REPLAY_AVAILABLE = False
+
+try:
+    import scripts.mp_engine as mp_engine
+    MP_ENGINE_AVAILABLE = True
+except ImportError:
+    log.warning("scripts.mp_engine not available. Cameras run on threads only.")
+    MP_ENGINE_AVAILABLE = False
+
 # Shown in the log panel when no FLIR camera is found. Only relevant to FLIR
 # users, so it is worded as a conditional hint rather than an error.
 SPINNAKER_HINT = (
@@ -47,14 +94,178 @@ SPINNAKER_HINT = (
     "list of installer options. Not required if you are only using webcams."
 )
 
+# Last entry of every camera dropdown — opens a file dialog to pick a
+# recording, video or image folder to play back as a camera. Opened sources
+# are listed above it as "Replay: <name>".
+REPLAY_ITEM = "Replay from file…"
+REPLAY_PREFIX = "Replay: "
+DEFAULT_REPLAY_SETTINGS = {'speed': 'real', 'loop': True, 'preload': False}
+
+# Camera acquisition engine: "threads" runs every camera loop in the GUI
+# process; "processes" gives each camera its own process (scripts.mp_engine).
+DEFAULT_ACQUISITION_SETTINGS = {'engine': 'threads', 'heartbeat_timeout_s': 5.0}
+
+# Capture catalogue (scripts.catalogue). path None = ~/.rapiid/catalogue.sqlite.
+# csv "incremental" appends each capture set to the per-taxon CSV; "on_exit"
+# rewrites the CSVs of the taxa captured this session when the app closes.
+DEFAULT_CATALOGUE_SETTINGS = {'path': None, 'csv': 'incremental'}
+
+# Local staging (scripts.staging): captures are written to `path` (None =
+# ~/.rapiid/staging) and moved to the output folder in the background.
+DEFAULT_STAGING_SETTINGS = {'enabled': False, 'path': None, 'streams': 4,
+                            'retries': 5, 'verify': True}
+
+# Container output (scripts.container): captures are appended to per-session
+# ZIP chunks in <output>/_containers/ instead of one file per image.
+DEFAULT_CONTAINER_SETTINGS = {'enabled': False, 'chunk_mb': 1024}
+
+# Capture journal (scripts.journal): each capture set is journaled until its
+# rows are recorded. fsync flushes images, CSV rows and the journal to disk
+# before moving on, so a power cut cannot lose or corrupt a finished capture.
+DEFAULT_JOURNAL_SETTINGS = {'enabled': True, 'fsync': True}
+
+# Derivatives (scripts.derivatives): JPEGs made from the captured frame while
+# the master is encoded. sizes maps a name (the file suffix) to the longest
+# edge in pixels; location is alongside (beside the master) or sidecar
+# (<output>/_derivatives/).
+DEFAULT_DERIVATIVE_SETTINGS = {'enabled': False, 'sizes': dict(derivatives.DEFAULT_SIZES),
+                               'quality': 85, 'location': 'alongside', 'threads': 2}
+
+# Label crops (scripts.labelcrop): each label found in a capture is cropped,
+# deskewed and saved as a <image>_crop<N>.jpg derivative in the background,
+# at the derivatives' location. min_area is the smallest label as a fraction
+# of the frame.
+DEFAULT_LABEL_CROP_SETTINGS = {'enabled': False, 'max_labels': labelcrop.MAX_LABELS,
+                               'min_area': labelcrop.MIN_AREA, 'quality': 90, 'threads': 2}
+
+# OCR (scripts.ocr): each capture is read by Tesseract on `processes` worker
+# processes and the text saved to <image>_ocr.json at the derivatives'
+# location. lang and psm are Tesseract's; cache None = ~/.rapiid/ocr_cache.sqlite.
+DEFAULT_OCR_SETTINGS = {'enabled': False, 'lang': ocr.LANG, 'psm': ocr.PSM, 'processes': 1,
+                        'cache': None}
+
+# Live view stability (scripts.stability): a view is settled once settle_frames
+# frames in a row differ from the one before by at most threshold grey levels
+# (mean). With wait, a capture waits up to timeout_s for all views to settle.
+DEFAULT_STABILITY_SETTINGS = {'threshold': stability.DEFAULT_THRESHOLD,
+                              'settle_frames': stability.DEFAULT_SETTLE_FRAMES,
+                              'wait': False, 'timeout_s': 2.0}
+
+# Burst capture (scripts.sharpness): grab `frames` frames per label camera
+# and save the sharpest. 1 = single-frame capture; its sharpness is still
+# recorded.
+DEFAULT_BURST_SETTINGS = {'frames': 1}
+
+# Lens and perspective correction (scripts.calibration): with enabled, captures
+# from calibrated cameras are corrected; preview also corrects the live views.
+# path None = ~/.rapiid/calibration.json.
+DEFAULT_CALIBRATION_SETTINGS = {'enabled': True, 'preview': False, 'path': None}
+
+# Colour profiles (scripts.colourprofile): with enabled, captures from
+# profiled cameras are colour corrected; preview also corrects the live views.
+# path None = ~/.rapiid/colour.json.
+DEFAULT_COLOUR_SETTINGS = {'enabled': True, 'preview': False, 'path': None}
+
+# Focus stacking (scripts.focusstack): grab `frames` frames per label camera
+# and fuse them. Webcams with manual focus step it through focus_range
+# (near, far; camera-specific units), waiting settle_s at each step; without
+# a range (or focus control) frames are interval_s apart while the operator
+# moves the stage. Fusion runs in tile x tile pieces on `threads` threads
+# (0 = one per core).
+DEFAULT_FOCUS_STACK_SETTINGS = {'enabled': False, 'frames': 5, 'interval_s': 0.5,
+                                'focus_range': None, 'settle_s': focusstack.FOCUS_SETTLE_S,
+                                'tile': focusstack.TILE, 'levels': focusstack.LEVELS,
+                                'threads': 0}
+
+# Tray capture (scripts.multicode): every DataMatrix code in each capture
+# frame is read, in tile x tile pieces overlapping by overlap pixels on
+# `threads` threads (0 = one per core), and the label each code is on is
+# saved as that specimen's own image with its own CSV row. max_count 0 reads
+# every code; min_label_area is the smallest label as a fraction of the frame.
+DEFAULT_MULTICODE_SETTINGS = {'enabled': False, 'max_count': 0, 'tile': multicode.TILE,
+                              'overlap': multicode.OVERLAP,
+                              'timeout_ms': multicode.TIMEOUT_MS,
+                              'context': multicode.CONTEXT,
+                              'min_label_area': multicode.MIN_LABEL_AREA, 'threads': 0}
+
+# Quality gate (scripts.quality): exposure and focus checks on each capture
+# frame. mode is off, warn (log the problems) or block (ask to retake before
+# anything is written). Luminance is the mean grey level (0-255), clipping a
+# percentage of pixels, focus the sharpness score; min_focus 0 = unchecked.
+DEFAULT_QUALITY_SETTINGS = {'mode': 'warn', 'min_luminance': 40, 'max_luminance': 220,
+                            'max_clipped_high': 1.0, 'max_clipped_low': 5.0, 'min_focus': 0}
+
+# Auto capture (scripts.autocapture): capture once a new accession has been
+# decoded stable_reads times in a row and every label view is settled.
+DEFAULT_AUTOCAPTURE_SETTINGS = {'enabled': False, 'stable_reads': 3}
+
+
+def ask_replay_source(parent):
+    """Ask for a replay source. Returns a path, or '' if cancelled.
+
+    Picking an image selects its whole folder, played in name order.
+    """
+    path, chosen_filter = QtWidgets.QFileDialog.getOpenFileName(
+        parent, "Replay from file...", str(Path.home()),
+        "Recordings (frames.csv);;"
+        "Videos (*.mp4 *.avi *.mov *.mkv);;"
+        "Image folder — pick any image (*.png *.jpg *.jpeg *.tif *.tiff *.bmp *.webp)"
+    )
+    if path and chosen_filter.startswith("Image folder"):
+        path = str(Path(path).parent)
+    return path
+
 # FLIR camera imports
 try:
     import PySpin
     FLIR_AVAILABLE = True
-    print("FLIR PySpin library loaded successfully.")
+    log.info("FLIR PySpin library loaded successfully.")
 except ImportError:
     FLIR_AVAILABLE = False
-    print("FLIR PySpin library not available. FLIR camera functionality disabled.")
+    log.warning("FLIR PySpin library not available. FLIR camera functionality disabled.")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Live view pipeline
+# ──────────────────────────────────────────────────────────────────────────────
+
+def clamp_roi(roi, shape):
+    """`roi` = (x, y, w, h) cut down to a frame of `shape`, or None if it
+    lies wholly outside it — e.g. a ROI saved for a larger webcam, restored
+    on a smaller one."""
+    x, y, w, h = (int(v) for v in roi)
+    x, y = max(0, x), max(0, y)
+    w, h = min(w, shape[1] - x), min(h, shape[0] - y)
+    return (x, y, w, h) if w > 0 and h > 0 else None
+
+
+def frame_to_display_rgb(frame, width, height, flip=False, correct=None):
+    """Prepare a full-res BGR camera frame for a live view widget.
+
+    Resizes to the widget size first, so the flip and colour conversion only
+    touch display-sized pixels, and returns C-contiguous RGB ready for
+    QImage. `correct`, if given, is applied to the display-size frame before
+    the flip (the colour and lens correction previews). Shared by the label
+    and barcode loops and scripts.benchmark.
+    """
+    if width > 0 and height > 0:
+        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_LINEAR)
+    if correct is not None:
+        frame = correct(frame)
+    if flip:
+        frame = cv2.flip(frame, -1)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    # Ensure C-contiguous memory layout — required by QImage
+    if not rgb.flags['C_CONTIGUOUS']:
+        rgb = np.ascontiguousarray(rgb)
+    return rgb
+
+
+def draw_settled(rgb, settled):
+    """Mark a live view frame with a dot in its top right corner: green once
+    the view has settled, amber while it is moving."""
+    colour = (0, 200, 83) if settled else (255, 171, 0)
+    cv2.circle(rgb, (rgb.shape[1] - 14, 14), 6, colour, -1, cv2.LINE_AA)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -83,7 +294,7 @@ class Worker(QtCore.QRunnable):
         try:
             result = self.fn(*self.args, **self.kwargs)
         except Exception as e:
-            traceback.print_exc()
+            log.exception("Error in background task")
             exctype, value = sys.exc_info()[:2]
             self.signals.error.emit((exctype, value, traceback.format_exc()))
         else:
@@ -92,6 +303,24 @@ class Worker(QtCore.QRunnable):
             self.signals.finished.emit()
 
 
+def wait_responsive(future, poll=0.01):
+    """Wait for `future` on the GUI thread, processing events (but not user
+    input) meanwhile so the live views keep updating. Returns its result."""
+    while not future.done():
+        QApplication.processEvents(QtCore.QEventLoop.ExcludeUserInputEvents)
+        wait_futures([future], timeout=poll)
+    return future.result()
+
+
+def sleep_responsive(seconds):
+    """time.sleep() for the GUI thread: the live views keep updating."""
+    import time
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        QApplication.processEvents(QtCore.QEventLoop.ExcludeUserInputEvents)
+        time.sleep(0.01)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # FLIR camera
 # ──────────────────────────────────────────────────────────────────────────────
@@ -114,11 +343,11 @@ class FLIRCamera:
             self.system = PySpin.System.GetInstance()
             self.cam_list = self.system.GetCameras()
             if self.cam_list.GetSize() == 0:
-                print("No FLIR cameras detected")
+                log.warning("No FLIR cameras detected")
                 self.cleanup()
                 return False
             if self.camera_index >= self.cam_list.GetSize():
-                print(f"FLIR camera index {self.camera_index} out of range "
+                log.warning(f"FLIR camera index {self.camera_index} out of range "
                       f"({self.cam_list.GetSize()} camera(s) found)")
                 self.cleanup()
                 return False
@@ -130,7 +359,7 @@ class FLIRCamera:
                     PySpin.StreamBufferHandlingMode_NewestOnly
                 )
             except Exception:
-                print("Warning: could not set StreamBufferHandlingMode")
+                log.warning("could not set StreamBufferHandlingMode")
 
             try:
                 self.camera.TLStream.StreamBufferCountMode.SetValue(
@@ -138,13 +367,13 @@ class FLIRCamera:
                 )
                 self.camera.TLStream.StreamBufferCountManual.SetValue(2)
             except Exception:
-                print("Warning: could not set StreamBufferCount")
+                log.warning("could not set StreamBufferCount")
 
             self.is_initialized = True
-            print("FLIR camera initialized successfully")
+            log.info("FLIR camera initialized successfully")
             return True
         except Exception as ex:
-            print(f"Error initializing FLIR camera: {ex}")
+            log.error(f"Error initializing FLIR camera: {ex}")
             return False
 
     def configure_camera(self, exposure=None, gain=None, gamma=None,
@@ -156,7 +385,7 @@ class FLIRCamera:
                 if self.camera.AcquisitionMode.GetAccessMode() == PySpin.RW:
                     self.camera.AcquisitionMode.SetValue(PySpin.AcquisitionMode_Continuous)
                 else:
-                    print("AcquisitionMode not writable — camera may already be streaming")
+                    log.warning("AcquisitionMode not writable — camera may already be streaming")
 
             if set_acquisition_mode and live_fps is not None:
                 try:
@@ -165,7 +394,7 @@ class FLIRCamera:
                         max_fps = self.camera.AcquisitionFrameRate.GetMax()
                         self.camera.AcquisitionFrameRate.SetValue(min(float(live_fps), max_fps))
                 except Exception:
-                    print("Warning: hardware frame rate cap not available on this camera")
+                    log.warning("hardware frame rate cap not available on this camera")
 
             if exposure is not None:
                 self.camera.ExposureAuto.SetValue(PySpin.ExposureAuto_Off)
@@ -191,7 +420,7 @@ class FLIRCamera:
 
             return True
         except Exception as ex:
-            print(f"Error configuring FLIR camera: {ex}")
+            log.error(f"Error configuring FLIR camera: {ex}")
             return False
 
     def start_acquisition(self):
@@ -203,7 +432,7 @@ class FLIRCamera:
             self.is_acquiring = True
             return True
         except Exception as ex:
-            print(f"Error starting acquisition: {ex}")
+            log.error(f"Error starting acquisition: {ex}")
             return False
 
     def stop_acquisition(self):
@@ -240,10 +469,10 @@ class FLIRCamera:
         except PySpin.SpinnakerException as ex:
             error_str = str(ex)
             if not any(code in error_str for code in ("-1011", "-1013", "-1010")):
-                print(f"Error getting frame: {ex}")
+                log.error(f"Error getting frame: {ex}")
             return None
         except Exception as ex:
-            print(f"Unexpected error getting frame: {ex}")
+            log.error(f"Unexpected error getting frame: {ex}")
             return None
 
     def get_frame_hq(self):
@@ -275,7 +504,7 @@ class FLIRCamera:
             image_result.Release()
 
         except Exception as ex:
-            print(f"Error capturing HQ frame: {ex}")
+            log.error(f"Error capturing HQ frame: {ex}")
         finally:
             self.stop_acquisition()
             if was_acquiring:
@@ -284,6 +513,171 @@ class FLIRCamera:
 
         return frame
 
+    def iter_frames_hq(self, count):
+        """Yield `count` consecutive HQ_LINEAR frames (None for a failed one)
+        from a single acquisition, so a burst does not restart the stream
+        for every frame. The live stream is paused until the iterator is
+        exhausted or closed."""
+        if not self.is_initialized:
+            return
+
+        was_acquiring = self.is_acquiring
+        if was_acquiring:
+            self.stop_acquisition()
+
+        try:
+            self.camera.BeginAcquisition()
+            self.is_acquiring = True
+
+            try:
+                exposure_ms = self.camera.ExposureTime.GetValue() / 1000.0
+                timeout_ms = max(200, int(exposure_ms) + 500)
+            except Exception:
+                timeout_ms = 2000
+
+            for _ in range(count):
+                frame = None
+                try:
+                    image_result = self.camera.GetNextImage(timeout_ms)
+                    if not image_result.IsIncomplete():
+                        image_converted = image_result.Convert(
+                            PySpin.PixelFormat_BGR8, PySpin.HQ_LINEAR
+                        )
+                        frame = image_converted.GetNDArray().copy()
+                    image_result.Release()
+                except Exception as ex:
+                    log.error(f"Error capturing burst frame: {ex}")
+                yield frame
+
+        except Exception as ex:
+            log.error(f"Error starting burst capture: {ex}")
+        finally:
+            self.stop_acquisition()
+            if was_acquiring:
+                self.camera.BeginAcquisition()
+                self.is_acquiring = True
+
+    def get_frame_hq16(self, pixel_formats=None):
+        """Grab a single high-bit-depth frame for archival saving.
+
+        Switches PixelFormat to the first format in `pixel_formats` that the
+        camera supports for this one frame and restores it afterwards, so the
+        live view stays on the cheap 8-bit path. Packed formats are unpacked
+        and demosaiced in numpy/OpenCV rather than by Spinnaker.
+
+        Returns a 16-bit BGR (or mono) image, or None if the camera supports
+        none of the formats — the caller falls back to get_frame_hq().
+        """
+        if not self.is_initialized or not ENCODERS_AVAILABLE:
+            return None
+
+        was_acquiring = self.is_acquiring
+        if was_acquiring:
+            self.stop_acquisition()
+
+        frame = None
+        original_format = None
+        try:
+            node = self.camera.PixelFormat
+            original_format = node.GetIntValue()
+            for name in pixel_formats or highbit.HIGH_BIT_PIXEL_FORMATS:
+                entry = node.GetEntryByName(name)
+                if entry is not None and PySpin.IsAvailable(entry) and PySpin.IsReadable(entry):
+                    node.SetIntValue(entry.GetValue())
+                    break
+            else:
+                log.warning("No high-bit-depth pixel format available on this camera")
+                return None
+
+            self.camera.BeginAcquisition()
+            self.is_acquiring = True
+
+            try:
+                exposure_ms = self.camera.ExposureTime.GetValue() / 1000.0
+                timeout_ms = max(200, int(exposure_ms) + 500)
+            except Exception:
+                timeout_ms = 2000
+
+            image_result = self.camera.GetNextImage(timeout_ms)
+            if not image_result.IsIncomplete():
+                # Copy out of the driver buffer before it is released
+                raw = image_result.GetData().copy()
+                frame = highbit.raw_to_image16(
+                    raw, image_result.GetPixelFormatName(),
+                    image_result.GetWidth(), image_result.GetHeight()
+                )
+            image_result.Release()
+
+        except Exception as ex:
+            log.error(f"Error capturing high-bit-depth frame: {ex}")
+        finally:
+            self.stop_acquisition()
+            if original_format is not None:
+                try:
+                    self.camera.PixelFormat.SetIntValue(original_format)
+                except Exception as ex:
+                    log.error(f"Error restoring pixel format: {ex}")
+            if was_acquiring:
+                self.camera.BeginAcquisition()
+                self.is_acquiring = True
+
+        return frame
+
+    def get_serial(self):
+        """Return the camera's serial number, or None if it cannot be read."""
+        if not self.is_initialized:
+            return None
+        try:
+            return self.camera.DeviceSerialNumber.GetValue()
+        except Exception:
+            return None
+
+    def set_roi(self, roi):
+        """Crop the sensor readout to `roi` = (x, y, w, h) in full-sensor pixels.
+
+        Pass None to restore the full sensor. The crop is applied on the camera
+        (OffsetX/OffsetY/Width/Height), so only the ROI pixels are transferred
+        and converted. Values are snapped to the camera's increments — kept
+        even so the Bayer phase is unchanged. The image format nodes are not
+        writable while streaming, so the caller must stop acquisition first.
+
+        Returns the ROI actually applied, or None for the full sensor.
+        """
+        if not self.is_initialized:
+            return None
+        try:
+            cam = self.camera
+            # Zero the offsets first so any width/height up to the sensor
+            # size is accepted, then shrink and finally re-offset.
+            cam.OffsetX.SetValue(cam.OffsetX.GetMin())
+            cam.OffsetY.SetValue(cam.OffsetY.GetMin())
+            max_w = cam.Width.GetMax()
+            max_h = cam.Height.GetMax()
+
+            if roi is None:
+                cam.Width.SetValue(max_w)
+                cam.Height.SetValue(max_h)
+                return None
+
+            def snap(value, node, lo, hi):
+                inc = max(2, int(node.GetInc()))
+                return int(max(lo, min(hi, int(value) // inc * inc)))
+
+            x, y, w, h = roi
+            w = snap(w, cam.Width, cam.Width.GetMin(), max_w)
+            h = snap(h, cam.Height, cam.Height.GetMin(), max_h)
+            x = snap(x, cam.OffsetX, 0, max_w - w)
+            y = snap(y, cam.OffsetY, 0, max_h - h)
+
+            cam.Width.SetValue(w)
+            cam.Height.SetValue(h)
+            cam.OffsetX.SetValue(x)
+            cam.OffsetY.SetValue(y)
+            return (x, y, w, h)
+        except Exception as ex:
+            log.error(f"Error setting FLIR ROI: {ex}")
+            return None
+
     def cleanup(self):
         try:
             if self.camera and self.is_initialized:
@@ -304,9 +698,137 @@ class FLIRCamera:
                 self.system.ReleaseInstance()
                 self.system = None
 
-            print("FLIR camera cleanup completed")
+            log.info("FLIR camera cleanup completed")
         except Exception as ex:
-            print(f"Error during cleanup: {ex}")
+            log.error(f"Error during cleanup: {ex}")
+
+
+class ProcessCameraSource:
+    """A camera opened inside a scripts.mp_engine worker process.
+
+    Built from the picklable spec returned by LabelCameraSlot.process_spec()
+    (or UI._barcode_process_spec()), it does what LabelCameraSlot does for
+    its own handles in the threaded engine — webcam ROI cropping, FLIR
+    settings and on-sensor ROI, HQ capture — but in the worker process.
+    """
+
+    def __init__(self, spec):
+        self.kind = spec['type']
+        self.cap = None
+        self.flir_camera = None
+        self.roi = None
+        # Webcams are throttled like the threaded loop; FLIR paces itself
+        # by its frame rate and Replay by the recording's timestamps
+        self.frame_interval = 1.0 / 15 if self.kind == 'Webcam' else 0
+
+        if self.kind == 'FLIR':
+            if not FLIR_AVAILABLE:
+                raise RuntimeError("PySpin library not available")
+            self.flir_camera = FLIRCamera(camera_index=spec['index'])
+            if not self.flir_camera.initialize():
+                raise RuntimeError(f"FLIR Camera {spec['index']} failed to initialize")
+            self.apply_settings(spec.get('settings') or {})
+        elif self.kind == 'Replay':
+            self.cap = replay.ReplayCamera(spec['path'], **spec.get('replay_settings', {}))
+        else:
+            backend = cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_ANY
+            self.cap = cv2.VideoCapture(spec['index'], backend)
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+            if not self.cap.isOpened():
+                raise RuntimeError(f"Cannot open {spec.get('camera')}")
+        if spec.get('roi'):
+            self.set_roi(spec['roi'])
+
+    def start(self):
+        if self.flir_camera:
+            return self.flir_camera.start_acquisition()
+        return True
+
+    def stop(self):
+        if self.flir_camera:
+            self.flir_camera.stop_acquisition()
+
+    def read(self):
+        if self.flir_camera:
+            return self.flir_camera.get_frame()
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        if self.roi:
+            roi = clamp_roi(self.roi, frame.shape)
+            if roi != self.roi:
+                # mp_engine reports the new self.roi to the GUI
+                log.warning(f"ROI {self.roi} does not fit the {frame.shape[1]}x{frame.shape[0]} "
+                            f"frame — {f'cut to {roi}' if roi else 'dropped'}")
+                self.roi = roi
+                if roi is None:
+                    return frame
+            x, y, w, h = roi
+            frame = frame[y:y + h, x:x + w]
+        return frame
+
+    def capture(self, high_bit=False):
+        """HQ capture frame for FLIR; None means "use the latest frame"."""
+        if not self.flir_camera:
+            return None
+        if high_bit:
+            frame = self.flir_camera.get_frame_hq16()
+            if frame is not None:
+                return frame
+        return self.flir_camera.get_frame_hq()
+
+    def capture_burst(self, high_bit, count):
+        """FLIR burst frames; None for other cameras, which burst from the
+        stream (see mp_engine)."""
+        if not self.flir_camera:
+            return None
+        if high_bit:
+            return (self.capture(True) for _ in range(count))
+        return self.flir_camera.iter_frames_hq(count)
+
+    def capture_stack(self, high_bit, count, wait=None, **options):
+        """Focus stack frames (see scripts.focusstack.grab): HQ captures for
+        FLIR, the next frames read for other cameras, stepping the focus of
+        webcams that have focus control."""
+        import time
+        focus = None
+        if self.kind == 'Webcam' and options.get('focus_range'):
+            focus = focusstack.WebcamFocus(self.cap)
+        read = (lambda: self.capture(high_bit)) if self.flir_camera else self.read
+        return focusstack.grab(read, count, focus=focus, wait=wait or time.sleep, **options)
+
+    def apply_settings(self, settings):
+        if not self.flir_camera:
+            return
+        was_acquiring = self.flir_camera.is_acquiring
+        if was_acquiring:
+            self.flir_camera.stop_acquisition()
+        self.flir_camera.configure_camera(
+            exposure=settings.get('exposure'), gain=settings.get('gain'),
+            gamma=settings.get('gamma'), set_acquisition_mode=False
+        )
+        if was_acquiring:
+            self.flir_camera.start_acquisition()
+
+    def set_roi(self, roi):
+        """Apply `roi`; returns the ROI actually applied."""
+        if self.flir_camera:
+            was_acquiring = self.flir_camera.is_acquiring
+            if was_acquiring:
+                self.flir_camera.stop_acquisition()
+            roi = self.flir_camera.set_roi(roi)
+            if was_acquiring:
+                self.flir_camera.start_acquisition()
+        self.roi = tuple(roi) if roi else None
+        return self.roi
+
+    def close(self):
+        if self.cap:
+            self.cap.release()
+        if self.flir_camera and self.flir_camera.is_initialized:
+            self.flir_camera.stop_acquisition()
+            self.flir_camera.cleanup()
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -315,41 +837,72 @@ class FLIRCamera:
 
 class ExifManager:
     @staticmethod
-    def add_exif_to_image(image_path, creator, taxon, accession, device_info, institution=""):
+    def get_tiff_tags(creator, taxon, accession, device_info, institution=""):
+        """Baseline TIFF text tags carrying the same metadata as the EXIF block.
+
+        Used for formats written without piexif (16-bit TIFF), which take
+        the tags directly rather than an EXIF segment.
+        """
+        now = datetime.datetime.now()
+        rights = institution if institution else "Manaaki Whenua Landcare Research"
+        return {
+            'artist': creator,
+            'copyright': f"CC-BY 4.0 {now.year} {rights}",
+            'make': "RAPIID",
+            'model': device_info,
+            'software': "RAPIID v4.0.1",
+            'datetime': now.strftime("%Y:%m:%d %H:%M:%S"),
+            'description': f"Specimen: {taxon} - {accession} - LABEL",
+        }
+
+    @staticmethod
+    def get_exif_bytes(creator, taxon, accession, device_info, institution=""):
+        """Return the EXIF block embedded in every saved image, or None
+        if piexif is not installed."""
+        if not EXIF_AVAILABLE:
+            return None
+        tags = ExifManager.get_tiff_tags(creator, taxon, accession, device_info, institution)
+        exif_dict = {
+            "0th": {
+                piexif.ImageIFD.Copyright: tags['copyright'].encode(),
+                piexif.ImageIFD.Artist: tags['artist'].encode(),
+                piexif.ImageIFD.DateTime: tags['datetime'].encode(),
+                piexif.ImageIFD.Make: tags['make'].encode(),
+                piexif.ImageIFD.Model: tags['model'].encode(),
+                piexif.ImageIFD.Software: tags['software'].encode(),
+                piexif.ImageIFD.ImageDescription: tags['description'].encode(),
+            },
+            "Exif": {
+                piexif.ExifIFD.DateTimeOriginal: tags['datetime'].encode(),
+                piexif.ExifIFD.DateTimeDigitized: tags['datetime'].encode(),
+                piexif.ExifIFD.UserComment: f"Taxon: {taxon}, Accession: {accession}".encode(),
+            },
+            "GPS": {},
+            "1st": {},
+            "thumbnail": None,
+        }
+        return piexif.dump(exif_dict)
+
+    @staticmethod
+    def add_exif_to_image(image_path, creator, taxon, accession, device_info, institution="",
+                          fsync=False):
         if not EXIF_AVAILABLE:
             return False, "EXIF embedding skipped (PIL/piexif not installed)"
         try:
-            now = datetime.datetime.now()
-            rights = institution if institution else "Manaaki Whenua Landcare Research"
-            exif_dict = {
-                "0th": {
-                    piexif.ImageIFD.Copyright: f"CC-BY 4.0 {now.year} {rights}".encode(),
-                    piexif.ImageIFD.Artist: creator.encode(),
-                    piexif.ImageIFD.DateTime: now.strftime("%Y:%m:%d %H:%M:%S").encode(),
-                    piexif.ImageIFD.Make: b"RAPIID",
-                    piexif.ImageIFD.Model: device_info.encode(),
-                    piexif.ImageIFD.Software: b"RAPIID v4.0.1",
-                    piexif.ImageIFD.ImageDescription: f"Specimen: {taxon} - {accession} - LABEL".encode(),
-                },
-                "Exif": {
-                    piexif.ExifIFD.DateTimeOriginal: now.strftime("%Y:%m:%d %H:%M:%S").encode(),
-                    piexif.ExifIFD.DateTimeDigitized: now.strftime("%Y:%m:%d %H:%M:%S").encode(),
-                    piexif.ExifIFD.UserComment: f"Taxon: {taxon}, Accession: {accession}".encode(),
-                },
-                "GPS": {},
-                "1st": {},
-                "thumbnail": None,
-            }
-            exif_bytes = piexif.dump(exif_dict)
-            img = Image.open(image_path)
-            img.save(image_path, exif=exif_bytes)
-            img.close()
+            exif_bytes = ExifManager.get_exif_bytes(
+                creator, taxon, accession, device_info, institution
+            )
+            out = io.BytesIO()
+            with Image.open(image_path) as img:
+                img.save(out, format=img.format, exif=exif_bytes)
+            journal.write_atomic(image_path, out.getvalue(), fsync)
             return True, f"EXIF data added to {os.path.basename(image_path)}"
         except Exception as e:
             return False, f"Failed to add EXIF data: {e}"
 
     @staticmethod
-    def get_csv_data(creator, taxon, accession, file_format, device_info="", tag="_label", institution=""):
+    def get_csv_data(creator, taxon, accession, file_format, device_info="", tag="_label", institution="",
+                     sharpness=None):
         now = datetime.datetime.now()
         rights = institution if institution else "Manaaki Whenua Landcare Research"
         return {
@@ -364,15 +917,12 @@ class ExifManager:
             'capture_device': device_info or "RAPIID",
             'caption': f"{accession} - Specimen label",
             'title': f"{taxon} - {accession} - Specimen label",
+            'sharpness': f"{sharpness:.1f}" if sharpness is not None else "",
         }
 
 
 class FileManager:
-    CSV_HEADERS = [
-        'image_filename', 'accession_number', 'taxon_name', 'image_format',
-        'copyright_type', 'rights_owner', 'creator', 'date_captured',
-        'capture_device', 'caption', 'title',
-    ]
+    CSV_HEADERS = catalogue.CSV_COLUMNS
 
     @staticmethod
     def create_folders(output_path):
@@ -384,16 +934,15 @@ class FileManager:
 
     @staticmethod
     def create_or_update_csv(output_location, taxon, csv_data):
-        taxon_folder = Path(output_location).joinpath(taxon)
-        csv_path = taxon_folder.joinpath(f"{taxon}_captures.csv")
-        file_exists = csv_path.exists()
+        return FileManager.append_csv_rows(output_location, taxon, [csv_data])
+
+    @staticmethod
+    def append_csv_rows(output_location, taxon, rows, fsync=False):
+        """Append `rows` to the taxon's CSV with a single open. A retaken
+        image's row replaces its earlier one, as in the catalogue."""
+        csv_path = catalogue.csv_path(output_location, taxon)
         try:
-            taxon_folder.mkdir(parents=True, exist_ok=True)
-            with open(csv_path, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=FileManager.CSV_HEADERS)
-                if not file_exists:
-                    writer.writeheader()
-                writer.writerow(csv_data)
+            catalogue.replace_csv_rows(csv_path, rows, fsync)
             return True, f"Saved capture metadata to {csv_path.name}"
         except Exception as e:
             return False, f"Failed to write CSV: {e}"
@@ -449,6 +998,69 @@ class AspectRatioLabel(QLabel):
                 self._resizing = False
 
 
+class LiveViewLabel(AspectRatioLabel):
+    """AspectRatioLabel that lets the user drag out a region of interest.
+
+    Selection is only active while `selecting` is True, so a stray drag on
+    the live view never changes the camera. The finished rectangle is
+    emitted in pixmap coordinates — i.e. relative to the displayed frame,
+    not the widget, which is larger by the border and padding.
+    """
+
+    roi_selected = QtCore.pyqtSignal(QtCore.QRect)
+
+    def __init__(self, ratio_w=16, ratio_h=9, parent=None):
+        super().__init__(ratio_w, ratio_h, parent)
+        self.selecting = False
+        self._origin = None
+        self._rubber_band = QRubberBand(QRubberBand.Rectangle, self)
+
+    def set_selecting(self, selecting):
+        self.selecting = selecting
+        self.setCursor(Qt.CrossCursor if selecting else Qt.ArrowCursor)
+        if not selecting:
+            self._origin = None
+            self._rubber_band.hide()
+
+    def _pixmap_origin(self):
+        """Top-left of the centred pixmap in widget coordinates."""
+        pixmap = self.pixmap()
+        if pixmap is None or pixmap.isNull():
+            return None
+        return QtCore.QPoint((self.width() - pixmap.width()) // 2,
+                             (self.height() - pixmap.height()) // 2)
+
+    def mousePressEvent(self, event):
+        if self.selecting and event.button() == Qt.LeftButton:
+            self._origin = event.pos()
+            self._rubber_band.setGeometry(QtCore.QRect(self._origin, QtCore.QSize()))
+            self._rubber_band.show()
+        else:
+            super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._origin is not None:
+            self._rubber_band.setGeometry(QtCore.QRect(self._origin, event.pos()).normalized())
+        else:
+            super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if self._origin is None:
+            super().mouseReleaseEvent(event)
+            return
+        rect = QtCore.QRect(self._origin, event.pos()).normalized()
+        self._origin = None
+        self._rubber_band.hide()
+        origin = self._pixmap_origin()
+        # Ignore clicks and tiny drags — almost always accidental
+        if origin is None or rect.width() < 8 or rect.height() < 8:
+            return
+        pixmap_rect = QtCore.QRect(QtCore.QPoint(0, 0), self.pixmap().size())
+        rect = rect.translated(-origin).intersected(pixmap_rect)
+        if not rect.isEmpty():
+            self.roi_selected.emit(rect)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # LabelCameraSlot — one self-contained label camera widget
 # ──────────────────────────────────────────────────────────────────────────────
@@ -458,16 +1070,43 @@ class LabelCameraSlot(QWidget):
     Self-contained widget representing one label camera.
 
     Each slot owns its live-view QLabel, start/stop button, camera dropdown,
-    and FLIR exposure/gain/gamma spinboxes.  The UI class creates/destroys
-    these dynamically and iterates over them at capture time.
+    FLIR exposure/gain/gamma spinboxes and ROI controls.  The UI class
+    creates/destroys these dynamically and iterates over them at capture time.
     """
 
-    def __init__(self, slot_index, webcams, flir_count, frame_signal, parent=None):
+    # Emitted with the applied ROI tuple (or None) so the UI can log it
+    roi_changed = QtCore.pyqtSignal(object)
+
+    def __init__(self, slot_index, webcams, flir_count, frame_signal,
+                 roi_profiles=None, replay_settings=None, stability_settings=None, parent=None):
         super().__init__(parent)
         self.slot_index = slot_index
         self.flir_count = flir_count
         self.frame_signal = frame_signal
 
+        # Region of interest as (x, y, w, h) in full-frame pixels, or None.
+        # roi_profiles is shared with the UI and maps a device id (FLIR serial
+        # or webcam name) to its saved ROI, so a camera gets its ROI back
+        # whichever slot it is opened in.
+        self.roi = None
+        self.roi_profiles = roi_profiles if roi_profiles is not None else {}
+
+        # Playback options for Replay sources, shared with the UI
+        self.replay_settings = replay_settings if replay_settings is not None else dict(DEFAULT_REPLAY_SETTINGS)
+        self.recorder = None        # replay.FrameRecorder while "Record" is on
+
+        # Whether the live view has stopped moving; fed by the live view loop,
+        # with thresholds shared with the UI
+        self.stability = stability.StabilityDetector(
+            stability_settings if stability_settings is not None else dict(DEFAULT_STABILITY_SETTINGS))
+
+        # mp_engine.CameraProcess while the live view runs in a worker
+        # process. The slot's own handles are released meanwhile, so the
+        # device id and description are cached for EXIF and ROI profiles.
+        self.process = None
+        self._process_device_id = None
+        self._process_device_info = None
+
         # Each slot owns its own FLIRCamera instance so multiple slots can
         # use different physical FLIR cameras independently.
         self.flir_camera = None
@@ -539,6 +1178,8 @@ class LabelCameraSlot(QWidget):
             self.cam_combo.addItem(name)
         for i in range(flir_count):
             self.cam_combo.addItem(f"FLIR Camera {i}")
+        if REPLAY_AVAILABLE:
+            self.cam_combo.addItem(REPLAY_ITEM)
         cam_col.addWidget(self.cam_combo)
         controls.addLayout(cam_col)
 
@@ -572,11 +1213,49 @@ class LabelCameraSlot(QWidget):
         gamma_col.addWidget(self.gamma_spinbox)
         controls.addLayout(gamma_col)
 
+        # ROI selection — drag on the live view while "Set ROI" is checked
+        roi_col = QVBoxLayout()
+        roi_col.addWidget(QLabel("Region of interest"))
+        roi_row = QHBoxLayout()
+        self.roi_btn = QPushButton("Set ROI")
+        self.roi_btn.setCheckable(True)
+        self.roi_btn.setToolTip("Drag a rectangle on the live view to crop this camera to the label area")
+        self.roi_reset_btn = QPushButton("Reset")
+        self.roi_reset_btn.setToolTip("Restore the full camera frame")
+        roi_row.addWidget(self.roi_btn)
+        roi_row.addWidget(self.roi_reset_btn)
+        roi_col.addLayout(roi_row)
+        controls.addLayout(roi_col)
+
+        # Lens and perspective calibration from a checkerboard
+        cal_col = QVBoxLayout()
+        cal_col.addWidget(QLabel("Calibration"))
+        cal_row = QHBoxLayout()
+        self.calibrate_btn = QPushButton("Calibrate…")
+        self.calibrate_btn.setToolTip(
+            "Calibrate this camera's lens distortion and viewing angle with a checkerboard")
+        self.colour_btn = QPushButton("Colour…")
+        self.colour_btn.setToolTip("Profile this camera's colour with a ColorChecker chart")
+        cal_row.addWidget(self.calibrate_btn)
+        cal_row.addWidget(self.colour_btn)
+        cal_col.addLayout(cal_row)
+        controls.addLayout(cal_col)
+
+        # Record the raw stream to disk for later replay
+        rec_col = QVBoxLayout()
+        rec_col.addWidget(QLabel("Recording"))
+        self.record_btn = QPushButton("Record")
+        self.record_btn.setCheckable(True)
+        self.record_btn.setToolTip("Save every frame with its timestamp so the stream can be replayed later")
+        self.record_btn.setEnabled(REPLAY_AVAILABLE)
+        rec_col.addWidget(self.record_btn)
+        controls.addLayout(rec_col)
+
         controls.addStretch()
         layout.addLayout(controls)
 
         # Live view — sits below controls, expands to fill remaining cell space
-        self.live_view = AspectRatioLabel(ratio_w=16, ratio_h=9)
+        self.live_view = LiveViewLabel(ratio_w=16, ratio_h=9)
         layout.addWidget(self.live_view, stretch=1)
 
         # No separator — the tile border provides enough visual separation
@@ -590,6 +1269,9 @@ class LabelCameraSlot(QWidget):
         self.exposure_spinbox.valueChanged.connect(lambda _: self._settings_timer.start())
         self.gain_spinbox.valueChanged.connect(lambda _: self._settings_timer.start())
         self.gamma_spinbox.valueChanged.connect(lambda _: self._settings_timer.start())
+        self.roi_btn.toggled.connect(self.live_view.set_selecting)
+        self.roi_reset_btn.pressed.connect(lambda: self.set_roi(None))
+        self.live_view.roi_selected.connect(self._on_roi_selected)
 
         # No camera is opened until the user makes a selection — the placeholder
         # prevents any camera handle being claimed before the user chooses.
@@ -617,7 +1299,7 @@ class LabelCameraSlot(QWidget):
                 self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
                 self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
         except Exception as e:
-            print(f"Slot {self.slot_index}: error opening cap for {camera_name}: {e}")
+            log.error(f"Slot {self.slot_index}: error opening cap for {camera_name}: {e}")
 
     def _on_camera_changed(self, selected):
         """Respond to the user picking a different camera in the dropdown."""
@@ -633,12 +1315,27 @@ class LabelCameraSlot(QWidget):
                     self.cam_combo.setCurrentIndex(idx)
                 self.cam_combo.blockSignals(False)
                 return
+            if selected == REPLAY_ITEM:
+                path = ask_replay_source(self)
+                if path:
+                    self.open_replay(path)
+                else:
+                    self.cam_combo.blockSignals(True)
+                    prev = self.selected_camera if self.selected_camera else "— Select camera —"
+                    idx = self.cam_combo.findText(prev)
+                    if idx >= 0:
+                        self.cam_combo.setCurrentIndex(idx)
+                    self.cam_combo.blockSignals(False)
+                return
             # Clean up existing FLIR instance if switching away from it
             if self.flir_camera and self.flir_camera.is_initialized:
                 self.flir_camera.stop_acquisition()
                 self.flir_camera.cleanup()
                 self.flir_camera = None
 
+            # The previous camera's ROI means nothing to the new one
+            self.roi = None
+
             if selected == "— Select camera —" or not selected:
                 self.selected_camera = ''
                 self.label_camera_type = 'Webcam'
@@ -652,6 +1349,21 @@ class LabelCameraSlot(QWidget):
                 self._set_flir_controls_enabled(False)
                 self.selected_camera = selected
                 self._open_cap(selected)
+                self.restore_roi()
+
+            elif selected.startswith(REPLAY_PREFIX):
+                self.label_camera_type = 'Replay'
+                self._set_flir_controls_enabled(False)
+                if self.cap:
+                    self.cap.release()
+                    self.cap = None
+                try:
+                    self.cap = replay.ReplayCamera(self.cam_combo.currentData(), **self.replay_settings)
+                    self.selected_camera = selected
+                    self.restore_roi()
+                except ValueError as e:
+                    log.warning(f"Slot {self.slot_index}: cannot replay: {e}")
+                    self.selected_camera = ''
 
             elif selected.startswith("FLIR Camera") and FLIR_AVAILABLE:
                 self.label_camera_type = 'FLIR'
@@ -661,8 +1373,11 @@ class LabelCameraSlot(QWidget):
                 if self.flir_camera.initialize():
                     self.selected_camera = selected
                     self._apply_camera_settings()
+                    # Always apply — the camera keeps its last ROI until it is
+                    # power-cycled, so a camera with no saved ROI is reset.
+                    self.restore_roi(reset_missing=True)
                 else:
-                    print(f"Slot {self.slot_index}: FLIR Camera {flir_index} failed to initialize")
+                    log.warning(f"Slot {self.slot_index}: FLIR Camera {flir_index} failed to initialize")
                     self.flir_camera = None
                     self.selected_camera = ''
 
@@ -671,32 +1386,191 @@ class LabelCameraSlot(QWidget):
                 self.parent()._refresh_camera_availability()
 
         except Exception as e:
-            print(f"Slot {self.slot_index}: error changing camera: {e}")
+            log.error(f"Slot {self.slot_index}: error changing camera: {e}")
 
     def _apply_camera_settings(self):
         """Push current spinbox values to the FLIR camera (debounced)."""
         try:
             if self.label_camera_type != 'FLIR':
                 return
+            if self.process:
+                self.process.send('settings', self._camera_settings())
+                return
             if not (self.flir_camera and self.flir_camera.is_initialized):
                 return
-            exposure = self.exposure_spinbox.value() * 1000.0   # ms → µs
-            gain = self.gain_spinbox.value()
-            gamma = self.gamma_spinbox.value() / 100.0
             was_streaming = self.label_webcamView
             if was_streaming:
                 self.flir_camera.stop_acquisition()
             self.flir_camera.configure_camera(
-                exposure=exposure, gain=gain, gamma=gamma,
-                set_acquisition_mode=False
+                **self._camera_settings(), set_acquisition_mode=False
             )
             if was_streaming:
                 self.flir_camera.start_acquisition()
         except Exception as e:
-            print(f"Slot {self.slot_index}: error applying settings: {e}")
+            log.error(f"Slot {self.slot_index}: error applying settings: {e}")
+
+    def _camera_settings(self):
+        return {
+            'exposure': self.exposure_spinbox.value() * 1000.0,   # ms → µs
+            'gain': self.gain_spinbox.value(),
+            'gamma': self.gamma_spinbox.value() / 100.0,
+        }
+
+    def _on_roi_selected(self, rect):
+        """Convert a rectangle dragged on the live view into a full-frame ROI."""
+        self.roi_btn.setChecked(False)
+        frame = self.frame
+        pixmap = self.live_view.pixmap()
+        if frame is None or pixmap is None or pixmap.isNull():
+            return
+        frame_h, frame_w = frame.shape[:2]
+        sx = frame_w / pixmap.width()
+        sy = frame_h / pixmap.height()
+        x, y = rect.x() * sx, rect.y() * sy
+        w, h = rect.width() * sx, rect.height() * sy
+        if self.is_flipped():
+            # Webcam live view is rotated 180° for display — undo it
+            x = frame_w - (x + w)
+            y = frame_h - (y + h)
+        # The displayed frame is already cropped to the current ROI
+        off_x, off_y = (self.roi[0], self.roi[1]) if self.roi else (0, 0)
+        self.set_roi((off_x + x, off_y + y, w, h))
 
     # ── Public interface ───────────────────────────────────────────────────────
 
+    def open_replay(self, path):
+        """Select `path` (a recording, video or image folder) as this slot's
+        camera. Its entry is added to the dropdown so it can be re-selected."""
+        name = REPLAY_PREFIX + Path(path).name
+        idx = self.cam_combo.findText(name)
+        if idx < 0:
+            idx = self.cam_combo.count() - 1   # above the "Replay from file…" entry
+            self.cam_combo.insertItem(idx, name, str(path))
+        else:
+            self.cam_combo.setItemData(idx, str(path))
+        if idx == self.cam_combo.currentIndex():
+            self._on_camera_changed(name)
+        else:
+            self.cam_combo.setCurrentIndex(idx)
+        return self.selected_camera == name
+
+    def process_spec(self):
+        """Picklable description of the selected camera for a
+        ProcessCameraSource in a worker process."""
+        spec = {
+            'name': f"label_{self.slot_index + 1}",
+            'type': self.label_camera_type,
+            'camera': self.selected_camera,
+            'roi': self.roi,
+        }
+        if self.label_camera_type == 'Replay':
+            spec['path'] = self.cam_combo.currentData()
+            spec['replay_settings'] = dict(self.replay_settings)
+        else:
+            spec['index'] = int(self.selected_camera.split()[-1])
+        if self.label_camera_type == 'FLIR':
+            spec['settings'] = self._camera_settings()
+        return spec
+
+    def release_device(self):
+        """Close this slot's webcam/FLIR handle so a worker process can open
+        it. Replays stay open — several readers can share a file."""
+        self._process_device_id = self.get_device_id()
+        self._process_device_info = self.get_device_info()
+        if self.label_camera_type == 'Replay':
+            return
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+        if self.flir_camera and self.flir_camera.is_initialized:
+            self.flir_camera.stop_acquisition()
+            self.flir_camera.cleanup()
+        self.flir_camera = None
+
+    def reopen_device(self):
+        """Re-open the selected camera in this process after its worker
+        process has stopped."""
+        if self.label_camera_type != 'Replay' and self.selected_camera:
+            self._on_camera_changed(self.selected_camera)
+
+    def is_flipped(self):
+        """True if the live view is shown rotated 180° — webcams, and replays
+        of webcam recordings."""
+        if self.label_camera_type == 'Replay':
+            return bool(getattr(self.cap, 'flip', False))
+        return self.label_camera_type == 'Webcam'
+
+    def get_device_id(self):
+        """Stable id for per-camera settings: FLIR serial, else the webcam name."""
+        if self.process:
+            return self._process_device_id
+        if self.label_camera_type == 'FLIR' and self.flir_camera:
+            serial = self.flir_camera.get_serial()
+            if serial:
+                return str(serial)
+        return self.selected_camera or None
+
+    def set_roi(self, roi, remember=True):
+        """Crop this camera to `roi` = (x, y, w, h) in full-frame pixels, or
+        restore the full frame with None.
+
+        FLIR cameras crop on the sensor, so fewer pixels are transferred and
+        converted. Webcams are cropped in update_label_camera with a numpy
+        slice, which is a view and costs nothing. With `remember` the ROI is
+        recorded against the device id so writeConfig can persist it.
+        """
+        try:
+            if roi is not None:
+                roi = tuple(max(0, int(round(v))) for v in roi)
+            if self.process:
+                # Applied in the worker; it reports the snapped FLIR ROI back
+                self.process.send('roi', roi)
+            elif self.label_camera_type == 'FLIR':
+                if not (self.flir_camera and self.flir_camera.is_initialized):
+                    return
+                was_streaming = self.label_webcamView
+                if was_streaming:
+                    self.flir_camera.stop_acquisition()
+                roi = self.flir_camera.set_roi(roi)
+                if was_streaming:
+                    self.flir_camera.start_acquisition()
+            self.roi = roi
+
+            device_id = self.get_device_id()
+            if remember and device_id:
+                if roi:
+                    self.roi_profiles[device_id] = list(roi)
+                else:
+                    self.roi_profiles.pop(device_id, None)
+            self.roi_changed.emit(roi)
+        except Exception as e:
+            log.error(f"Slot {self.slot_index}: error setting ROI: {e}")
+
+    def restore_roi(self, reset_missing=False):
+        """Apply the saved ROI for the current device, if there is one."""
+        roi = self.roi_profiles.get(self.get_device_id())
+        if roi or reset_missing:
+            self.set_roi(roi, remember=False)
+
+    def crop_to_roi(self, frame):
+        """Return the ROI of a full webcam frame as a zero-copy view.
+
+        A ROI that does not fit the frame (one saved for a larger camera) is
+        cut down to it, or dropped if it lies wholly outside it.
+        """
+        if not self.roi:
+            return frame
+        roi = clamp_roi(self.roi, frame.shape)
+        if roi != tuple(self.roi):
+            log.warning(f"Slot {self.slot_index}: ROI {tuple(self.roi)} does not fit the "
+                        f"{frame.shape[1]}x{frame.shape[0]} frame — "
+                        f"{f'cut to {roi}' if roi else 'dropped'}")
+            self.set_roi(roi, remember=False)
+            if roi is None:
+                return frame
+        x, y, w, h = roi
+        return frame[y:y + h, x:x + w]
+
     def sync_camera_availability(self, taken_cameras):
         """Visually mark taken cameras and store the taken set for the
         signal handler to enforce when the user makes a selection."""
@@ -714,14 +1588,78 @@ class LabelCameraSlot(QWidget):
                 item.setForeground(QtGui.QColor())   # reset to theme default
                 font = item.font(); font.setItalic(False); item.setFont(font)
 
-    def get_frame_for_capture(self):
-        """Return the best available frame for saving to disk."""
+    def get_frame_for_capture(self, high_bit_depth=False):
+        """Return the best available frame for saving to disk.
+
+        With `high_bit_depth`, FLIR cameras return a 16-bit frame when the
+        sensor supports it; webcams always return their 8-bit frame.
+        """
+        if self.process:
+            return self.process.capture(high_bit_depth)
         if self.label_camera_type == 'FLIR' and self.flir_camera and self.flir_camera.is_initialized:
+            if high_bit_depth:
+                frame = self.flir_camera.get_frame_hq16()
+                if frame is not None:
+                    return frame
             return self.flir_camera.get_frame_hq()
         return self.frame
 
+    def capture_burst(self, count, high_bit_depth=False):
+        """Grab `count` frames and return (the sharpest, the scores of all
+        in order). count=1 is a single-frame capture, still scored."""
+        if self.process:
+            return self.process.capture_burst(count, high_bit_depth)
+        return sharpness.sharpest(self._iter_capture_frames(count, high_bit_depth))
+
+    def capture_stack(self, count, high_bit_depth=False, **options):
+        """Grab a `count`-frame focus stack (`options` as for
+        scripts.focusstack.grab) while the live views keep updating.
+        Returns the frames."""
+        if self.process:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                return wait_responsive(executor.submit(
+                    self.process.capture_stack, count, high_bit_depth, **options))
+        if self.label_camera_type == 'FLIR' and self.flir_camera and self.flir_camera.is_initialized:
+            return focusstack.grab(lambda: self.get_frame_for_capture(high_bit_depth), count,
+                                   wait=sleep_responsive, **options)
+        focus = None
+        if self.label_camera_type == 'Webcam' and self.cap and options.get('focus_range'):
+            focus = focusstack.WebcamFocus(self.cap)
+        return focusstack.grab(lambda: self._next_frame(self.frame), count, focus=focus,
+                               wait=sleep_responsive, **options)
+
+    def _next_frame(self, frame, timeout=1.0):
+        """The first frame the live view loop stores after `frame`, or None
+        if none arrives within `timeout` seconds."""
+        import time
+        deadline = time.monotonic() + timeout
+        while self.frame is frame and self.label_webcamView and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return None if self.frame is frame else self.frame
+
+    def _iter_capture_frames(self, count, high_bit_depth):
+        if self.label_camera_type == 'FLIR' and self.flir_camera and self.flir_camera.is_initialized:
+            if high_bit_depth or count == 1:
+                # A 16-bit frame switches the pixel format for each grab
+                for _ in range(count):
+                    yield self.get_frame_for_capture(high_bit_depth)
+            else:
+                yield from self.flir_camera.iter_frames_hq(count)
+            return
+        # Webcams and replays: the current frame, then each new one the live
+        # view loop stores
+        frame = self.frame
+        yield frame
+        for _ in range(count - 1):
+            frame = self._next_frame(frame)
+            if frame is None:
+                return
+            yield frame
+
     def get_device_info(self):
         """Short description of the active camera for EXIF/CSV metadata."""
+        if self.process:
+            return self._process_device_info
         try:
             if self.label_camera_type == 'FLIR' and self.flir_camera and self.flir_camera.is_initialized:
                 cam = self.flir_camera.camera
@@ -731,6 +1669,8 @@ class LabelCameraSlot(QWidget):
                     return f"FLIR {model} S/N:{serial}"
                 except Exception:
                     return "FLIR Camera"
+            elif self.label_camera_type == 'Replay' and self.cap:
+                return f"Replay ({self.cap.source.name})"
             elif self.cap:
                 width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
                 height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
@@ -743,6 +1683,12 @@ class LabelCameraSlot(QWidget):
     def cleanup(self):
         """Release all camera resources owned by this slot."""
         self.label_webcamView = False
+        if self.process:
+            self.process.close()
+            self.process = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
         if self.cap:
             self.cap.release()
             self.cap = None
@@ -821,6 +1767,254 @@ class ProgressDialog(QDialog):
         QApplication.processEvents()   # keep UI responsive between steps
 
 
+class CalibrationDialog(QDialog):
+    """Calibrate a label camera from checkerboard views (scripts.calibration).
+
+    Each *Add view* grabs a capture frame and finds the board's corners.
+    Views at several angles give the lens model; the last view, with the
+    board flat where the labels go, sets the plane that is squared up.
+    """
+
+    def __init__(self, slot, store, parent=None):
+        super().__init__(parent)
+        self.slot = slot
+        self.store = store
+        self.device_id = slot.get_device_id()
+        self.views = []
+        self.size = None
+        self.setWindowTitle(f"Calibrate label camera {slot.slot_index + 1}")
+        self.setMinimumWidth(420)
+
+        layout = QVBoxLayout(self)
+        intro = QLabel(
+            "Hold a printed checkerboard in front of the camera at a few different "
+            "angles, clicking <b>Add view</b> for each. Then lay it flat on the stage "
+            "where the labels go, add that view last, and click <b>Finish</b>.")
+        intro.setWordWrap(True)
+        layout.addWidget(intro)
+
+        pattern_row = QHBoxLayout()
+        pattern_row.addWidget(QLabel("Inner corners"))
+        self.cols_spin = QSpinBox()
+        self.cols_spin.setRange(3, 30)
+        self.cols_spin.setValue(calibration.PATTERN[0])
+        self.rows_spin = QSpinBox()
+        self.rows_spin.setRange(3, 30)
+        self.rows_spin.setValue(calibration.PATTERN[1])
+        pattern_row.addWidget(self.cols_spin)
+        pattern_row.addWidget(QLabel("×"))
+        pattern_row.addWidget(self.rows_spin)
+        pattern_row.addStretch()
+        layout.addLayout(pattern_row)
+
+        self.status = QLabel()
+        self.status.setWordWrap(True)
+        layout.addWidget(self.status)
+
+        buttons = QHBoxLayout()
+        self.add_btn = QPushButton("Add view")
+        self.finish_btn = QPushButton("Finish")
+        self.remove_btn = QPushButton("Remove calibration")
+        close_btn = QPushButton("Close")
+        for button in (self.add_btn, self.finish_btn, self.remove_btn, close_btn):
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+        self.add_btn.clicked.connect(self.add_view)
+        self.finish_btn.clicked.connect(self.finish)
+        self.remove_btn.clicked.connect(self.remove)
+        close_btn.clicked.connect(self.reject)
+        self._update()
+
+    def _update(self, message=None):
+        existing = self.store.get(self.device_id)
+        if not self.device_id or not self.slot.label_webcamView:
+            message = "Start this camera's live view first."
+        elif self.slot.roi:
+            message = "Reset this camera's ROI first — calibrate on the full frame."
+        elif message is None:
+            message = (f"Calibrated from {existing['views']} view(s), "
+                       f"error {existing['error']:.2f} px." if existing else "Not calibrated.")
+        ready = bool(self.device_id and self.slot.label_webcamView and not self.slot.roi)
+        self.add_btn.setEnabled(ready)
+        self.finish_btn.setEnabled(ready and bool(self.views))
+        self.remove_btn.setEnabled(existing is not None)
+        self.cols_spin.setEnabled(not self.views)
+        self.rows_spin.setEnabled(not self.views)
+        self.status.setText(f"Views: {len(self.views)}. {message}")
+
+    def _pattern(self):
+        return self.cols_spin.value(), self.rows_spin.value()
+
+    def add_view(self):
+        frame = self.slot.get_frame_for_capture()
+        if frame is None:
+            self._update("No frame from the camera.")
+            return
+        size = (frame.shape[1], frame.shape[0])
+        if self.size and size != self.size:
+            self._update("The frame size changed — start again.")
+            return
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            corners = wait_responsive(executor.submit(
+                calibration.find_corners, frame, self._pattern()))
+        if corners is None:
+            self._update("Checkerboard not found — check the corner counts and "
+                         "that the whole board is in view.")
+            return
+        self.size = size
+        self.views.append(corners)
+        self._update("View added.")
+
+    def finish(self):
+        try:
+            result = calibration.calibrate(self.views, self.size, self._pattern())
+        except (cv2.error, ValueError) as e:
+            self._update(f"Calibration failed: {e}")
+            return
+        self.store.set(self.device_id, result)
+        self.views = []
+        self._update(f"Saved — reprojection error {result['error']:.2f} px.")
+        ui_log.info(f"Camera {self.slot.slot_index + 1} ({self.device_id}) calibrated from "
+                    f"{result['views']} view(s), error {result['error']:.2f} px.")
+
+    def remove(self):
+        self.store.set(self.device_id, None)
+        self.views = []
+        self._update("Calibration removed.")
+        ui_log.info(f"Camera {self.slot.slot_index + 1} ({self.device_id}) calibration removed.")
+
+
+class ColourProfileDialog(QDialog):
+    """Profile a label camera's colour from a ColorChecker snapshot
+    (scripts.colourprofile).
+
+    *Take snapshot* grabs a capture frame at the output format's bit depth
+    and looks for the chart; if it is not found (or OpenCV's contrib mcc
+    module is missing) the user drags a rectangle round the 24 patches on
+    the snapshot instead. The fitted profile is saved with *Save profile*.
+    """
+
+    VIEW_WIDTH = 640
+
+    def __init__(self, slot, store, high_bit_depth=False, parent=None):
+        super().__init__(parent)
+        self.slot = slot
+        self.store = store
+        self.high_bit_depth = high_bit_depth
+        self.device_id = slot.get_device_id()
+        self.frame = None
+        self.profile = None
+        self.setWindowTitle(f"Colour profile for label camera {slot.slot_index + 1}")
+
+        layout = QVBoxLayout(self)
+        intro = QLabel(
+            "Place a 24-patch ColorChecker where the labels go, lit as they will be, "
+            "and click <b>Take snapshot</b>. If the chart is not outlined, drag a "
+            "rectangle round its patches on the snapshot.")
+        intro.setWordWrap(True)
+        layout.addWidget(intro)
+
+        self.view = LiveViewLabel(16, 9)
+        self.view.setFixedWidth(self.VIEW_WIDTH + 8)   # border and padding
+        self.view.set_selecting(True)
+        self.view.roi_selected.connect(self._on_chart_selected)
+        layout.addWidget(self.view)
+
+        self.status = QLabel()
+        self.status.setWordWrap(True)
+        layout.addWidget(self.status)
+
+        buttons = QHBoxLayout()
+        self.snapshot_btn = QPushButton("Take snapshot")
+        self.save_btn = QPushButton("Save profile")
+        self.remove_btn = QPushButton("Remove profile")
+        close_btn = QPushButton("Close")
+        for button in (self.snapshot_btn, self.save_btn, self.remove_btn, close_btn):
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+        self.snapshot_btn.clicked.connect(self.take_snapshot)
+        self.save_btn.clicked.connect(self.save)
+        self.remove_btn.clicked.connect(self.remove)
+        close_btn.clicked.connect(self.reject)
+        self._update()
+
+    def _update(self, message=None):
+        existing = self.store.get(self.device_id)
+        ready = bool(self.device_id and self.slot.label_webcamView)
+        if not ready:
+            message = "Start this camera's live view first."
+        elif message is None:
+            message = (f"Profiled: mean ΔE {existing['error_before']:.1f} → "
+                       f"{existing['error']:.1f}." if existing else "No colour profile.")
+        self.snapshot_btn.setEnabled(ready)
+        self.save_btn.setEnabled(self.profile is not None)
+        self.remove_btn.setEnabled(existing is not None)
+        self.status.setText(message)
+
+    def _show(self, corners=None):
+        """Show the snapshot, outlining the chart at `corners`."""
+        frame = self.frame if self.frame.dtype == np.uint8 else (self.frame >> 8).astype(np.uint8)
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        h, w = frame.shape[:2]
+        scale = min(self.VIEW_WIDTH / w, (self.view.heightForWidth(self.VIEW_WIDTH + 8) - 8) / h)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        rgb = frame_to_display_rgb(frame, *size)
+        if corners is not None:
+            scaled = np.int32(np.asarray(corners) * scale).reshape(-1, 1, 2)
+            cv2.polylines(rgb, [scaled], True, (0, 200, 83), 2, cv2.LINE_AA)
+        image = QImage(rgb.data, size[0], size[1], rgb.strides[0], QImage.Format_RGB888)
+        self.view.setPixmap(QPixmap.fromImage(image))
+
+    def take_snapshot(self):
+        frame = self.slot.get_frame_for_capture(self.high_bit_depth)
+        if frame is None:
+            self._update("No frame from the camera.")
+            return
+        self.frame = frame
+        self.profile = None
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            corners = wait_responsive(executor.submit(colourprofile.find_chart, frame))
+        self._show(corners)
+        if corners is None:
+            self._update("Chart not found — drag a rectangle round its 24 patches.")
+        else:
+            self._fit(corners)
+
+    def _on_chart_selected(self, rect):
+        if self.frame is None:
+            return
+        scale = self.frame.shape[1] / self.view.pixmap().width()
+        x, y, w, h = (v * scale for v in (rect.x(), rect.y(), rect.width(), rect.height()))
+        corners = [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+        self._show(corners)
+        self._fit(corners)
+
+    def _fit(self, corners):
+        try:
+            self.profile = colourprofile.calibrate(self.frame, corners)
+        except ValueError as e:
+            self.profile = None
+            self._update(f"Could not profile: {e}")
+            return
+        self._update(f"Mean ΔE {self.profile['error_before']:.1f} → "
+                     f"{self.profile['error']:.1f} with the profile. Save it?")
+
+    def save(self):
+        self.store.set(self.device_id, self.profile)
+        ui_log.info(f"Camera {self.slot.slot_index + 1} ({self.device_id}) colour profiled, "
+                    f"mean ΔE {self.profile['error_before']:.1f} → {self.profile['error']:.1f}.")
+        self.profile = None
+        self._update("Profile saved.")
+
+    def remove(self):
+        self.store.set(self.device_id, None)
+        self._update("Colour profile removed.")
+        ui_log.info(f"Camera {self.slot.slot_index + 1} ({self.device_id}) colour profile removed.")
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Main UI window
 # ──────────────────────────────────────────────────────────────────────────────
@@ -829,14 +2023,24 @@ class UI(QMainWindow):
     # Signals used by worker threads to push frames safely to the main thread
     _label_frame_signal = QtCore.pyqtSignal(QtGui.QPixmap, QtWidgets.QLabel)
     _barcode_frame_signal = QtCore.pyqtSignal(QtGui.QPixmap, QtWidgets.QLabel)
+    _accession_read_signal = QtCore.pyqtSignal(str)   # every decode, repeats included
 
-    def __init__(self):
+    def __init__(self, replay_sources=None, barcode_replay=None, replay_speed=None, engine=None):
         super(UI, self).__init__()
         try:
             self.exit_program = False
             self.ui = Ui_MainWindow()
             self.ui.setupUi(self)
 
+            # Log panel — newest first, capped; fed by the "rapiid.ui" logger
+            # from any thread
+            self.log_model = applog.LogListModel(parent=self)
+            self.ui.listView_log.setModel(self.log_model)
+            self._panel_handler = applog.PanelHandler(self.log_model)
+            ui_log.addHandler(self._panel_handler)
+            if ui_log.getEffectiveLevel() > logging.INFO:
+                ui_log.setLevel(logging.INFO)
+
             # Load app icon — taskbar, window title bar, and header bar
             if getattr(sys, 'frozen', False):
                 app_dir = Path(sys.executable).parent
@@ -867,11 +2071,53 @@ class UI(QMainWindow):
                 )
 
             self.threadpool = QtCore.QThreadPool()
-            print("Multithreading with maximum %d threads" % self.threadpool.maxThreadCount())
+            log.info("Multithreading with maximum %d threads", self.threadpool.maxThreadCount())
 
             # ── Global state ──────────────────────────────────────────────────
+            self.output_format = "jpg"      # key into encoders.OUTPUT_FORMATS
             self.file_format = ".jpg"
+            if ENCODERS_AVAILABLE:
+                self.encoder_settings = encoders.merge_settings()
+                self.encoder_pool = encoders.EncoderPool(self.encoder_settings['threads'])
             self.label_slots = []           # list[LabelCameraSlot]
+            self.roi_profiles = {}          # device id → saved ROI [x, y, w, h]
+            self.replay_settings = dict(DEFAULT_REPLAY_SETTINGS)
+            if replay_speed:
+                self.replay_settings['speed'] = replay_speed
+            self._replay_sources = list(replay_sources or [])   # --replay, opened after discovery
+            self.stability_settings = dict(DEFAULT_STABILITY_SETTINGS)
+            self.acquisition_settings = dict(DEFAULT_ACQUISITION_SETTINGS)
+            if engine:
+                self.acquisition_settings['engine'] = engine
+            self.catalogue_settings = dict(DEFAULT_CATALOGUE_SETTINGS)
+            self.catalogue = None           # scripts.catalogue.Catalogue
+            self._csv_pending = set()       # (output folder, taxon) to export on exit
+            self.staging_settings = dict(DEFAULT_STAGING_SETTINGS)
+            self.mover = None               # scripts.staging.Mover
+            self.container_settings = dict(DEFAULT_CONTAINER_SETTINGS)
+            self.container = None           # scripts.container.SessionContainer
+            self.journal_settings = dict(DEFAULT_JOURNAL_SETTINGS)
+            self.journal = None             # scripts.journal.CaptureJournal
+            self.derivative_settings = dict(DEFAULT_DERIVATIVE_SETTINGS)
+            self.derivative_pool = None     # scripts.derivatives.DerivativePool
+            self.label_crop_settings = dict(DEFAULT_LABEL_CROP_SETTINGS)
+            self.crop_pool = None           # scripts.labelcrop.CropPool
+            self.ocr_settings = dict(DEFAULT_OCR_SETTINGS)
+            self.ocr_pool = None            # scripts.ocr.OcrPool
+            self.burst_settings = dict(DEFAULT_BURST_SETTINGS)
+            self.calibration_settings = dict(DEFAULT_CALIBRATION_SETTINGS)
+            self.calibrations = None        # scripts.calibration.CalibrationStore
+            self.colour_settings = dict(DEFAULT_COLOUR_SETTINGS)
+            self.colour_profiles = None     # scripts.colourprofile.ProfileStore
+            self.focus_stack_settings = dict(DEFAULT_FOCUS_STACK_SETTINGS)
+            self.stack_pool = None          # scripts.focusstack.StackPool
+            self.multicode_settings = dict(DEFAULT_MULTICODE_SETTINGS)
+            self.multicode_pool = None      # scripts.multicode.DecodePool
+            self.quality_settings = dict(DEFAULT_QUALITY_SETTINGS)
+            self.autocapture_settings = dict(DEFAULT_AUTOCAPTURE_SETTINGS)
+            self.accession_trigger = None   # scripts.autocapture.AccessionTrigger
+            self.throughput = autocapture.Throughput()
+            self._barcode_replay = barcode_replay
             self._all_webcams = []          # full discovered webcam list (for adding new slots)
             self._flir_count = 0            # number of FLIR cameras found at discovery
 
@@ -881,11 +2127,24 @@ class UI(QMainWindow):
             self._barcode_taken_cameras = set()  # label cameras taken, for barcode revert guard
             self.webcam_arr_barcode = []
             self.cap_barcode = None
+            self.barcode_recorder = None
+            self.barcode_process = None     # mp_engine.CameraProcess in process mode
 
             # ── Setup that doesn't need camera hardware ───────────────────────
             self.setup_ui_connections()
             self.setup_file_system()
             self.setup_config_system()
+            self.setup_staging()
+            self.setup_journal()
+            self.setup_derivatives()
+            self.setup_label_crops()
+            self.setup_ocr()
+            self.setup_review()
+            self.setup_calibration()
+            self.setup_colour()
+            self.setup_focus_stack()
+            self.setup_multicode()
+            self.setup_autocapture()
 
             # Show immediately — camera discovery happens on a background thread
             self.showMaximized()
@@ -907,8 +2166,7 @@ class UI(QMainWindow):
             self.threadpool.start(worker)
 
         except Exception as e:
-            print(f"Error during UI initialization: {e}")
-            traceback.print_exc()
+            log.exception(f"Error during UI initialization: {e}")
             sys.exit(1)
 
     # ── Camera discovery ───────────────────────────────────────────────────────
@@ -950,9 +2208,9 @@ class UI(QMainWindow):
             webcams.append(f"Webcam {index}")
 
         # Count FLIR cameras via Spinnaker (fast — no frame grab needed).
-        # Any failure reason is returned rather than printed: the installed app
-        # is built with base="Win32GUI" and has no console, so print() output is
-        # invisible to end users. The caller logs it to the in-app log panel.
+        # Any failure reason is returned rather than only logged: the installed
+        # app is built with base="Win32GUI" and has no console, so end users
+        # rarely see the log file. The caller shows it in the in-app log panel.
         flir_count = 0
         flir_error = None
         if FLIR_AVAILABLE:
@@ -985,6 +2243,7 @@ class UI(QMainWindow):
         self.setup_barcode_camera_selection()
 
         self._set_camera_controls_enabled(True)
+        self._open_command_line_replays()
 
         parts = []
         if self._all_webcams:
@@ -1005,6 +2264,27 @@ class UI(QMainWindow):
         elif not self._flir_count:
             self.log_info("No FLIR cameras detected. " + SPINNAKER_HINT)
 
+    def _open_command_line_replays(self):
+        """Open the --replay / --barcode-replay sources and start them."""
+        if not REPLAY_AVAILABLE:
+            if self._replay_sources or self._barcode_replay:
+                self.log_info("Replay is not available — ignoring --replay.")
+            return
+        for i, source in enumerate(self._replay_sources):
+            if i >= len(self.label_slots):
+                self._add_label_slot()
+            slot = self.label_slots[i]
+            if slot.open_replay(source):
+                self.begin_label_camera(slot)
+            else:
+                self.log_info(f"Cannot replay {source}.")
+        if self._barcode_replay:
+            if self.open_barcode_replay(self._barcode_replay):
+                self.begin_barcode_webcam(cam_id=self.ui.barcode_camera,
+                                          button_id=self.ui.pushButton_barcode_webcam)
+            else:
+                self.log_info(f"Cannot replay {self._barcode_replay}.")
+
     @QtCore.pyqtSlot(tuple)
     def _on_discovery_error(self, error_tuple):
         _, value, _ = error_tuple
@@ -1067,10 +2347,17 @@ class UI(QMainWindow):
                 webcams=webcams,
                 flir_count=self._flir_count,
                 frame_signal=self._label_frame_signal,
+                roi_profiles=self.roi_profiles,
+                replay_settings=self.replay_settings,
+                stability_settings=self.stability_settings,
                 parent=self,
             )
             slot.start_btn.pressed.connect(lambda s=slot: self.begin_label_camera(s))
             slot.remove_btn.pressed.connect(lambda s=slot: self._remove_label_slot(s))
+            slot.roi_changed.connect(lambda roi, s=slot: self._on_slot_roi_changed(s, roi))
+            slot.record_btn.toggled.connect(lambda on, s=slot: self.toggle_recording(s, on))
+            slot.calibrate_btn.pressed.connect(lambda s=slot: self.calibrate_slot(s))
+            slot.colour_btn.pressed.connect(lambda s=slot: self.profile_slot_colour(s))
 
             self.label_slots.append(slot)
             self._retile_grid()
@@ -1081,7 +2368,7 @@ class UI(QMainWindow):
                 self.log_info(f"Added label camera {idx + 1}.")
 
         except Exception as e:
-            print(f"Error adding label slot: {e}")
+            log.error(f"Error adding label slot: {e}")
             self.log_info(f"Error adding label camera: {e}")
 
     def _remove_label_slot(self, slot):
@@ -1112,9 +2399,71 @@ class UI(QMainWindow):
             self.log_info(f"Removed label camera. {len(self.label_slots)} remaining.")
 
         except Exception as e:
-            print(f"Error removing label slot: {e}")
+            log.error(f"Error removing label slot: {e}")
             self.log_info(f"Error removing label camera: {e}")
 
+    def _on_slot_roi_changed(self, slot, roi):
+        if roi:
+            x, y, w, h = roi
+            self.log_info(f"Label camera {slot.slot_index + 1}: ROI set to "
+                          f"{w}×{h} at ({x}, {y}).")
+        else:
+            self.log_info(f"Label camera {slot.slot_index + 1}: using the full frame.")
+
+    def toggle_recording(self, slot, on):
+        """Start or stop recording a label camera's stream to
+        <output>/_recordings/<timestamp>_label_N for later replay."""
+        try:
+            if on:
+                stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                folder = Path(self.output_location) / "_recordings" / f"{stamp}_label_{slot.slot_index + 1}"
+                slot.recorder = replay.FrameRecorder(
+                    folder,
+                    source=slot.selected_camera,
+                    # Replays of webcam recordings must stay flipped when re-recorded
+                    camera_type='Webcam' if slot.is_flipped() else slot.label_camera_type,
+                    serial=slot.get_device_id(),
+                )
+                self.log_info(f"Label camera {slot.slot_index + 1}: recording to {folder}")
+            elif slot.recorder:
+                recorder, slot.recorder = slot.recorder, None
+                recorder.close()
+                self.log_info(f"Label camera {slot.slot_index + 1}: recording stopped — "
+                              f"{recorder.frames_written} frames written, "
+                              f"{recorder.frames_dropped} dropped.")
+        except Exception as e:
+            log.error(f"Error toggling recording: {e}")
+            self.log_info(f"Error recording label camera {slot.slot_index + 1}: {e}")
+            slot.record_btn.blockSignals(True)
+            slot.record_btn.setChecked(False)
+            slot.record_btn.blockSignals(False)
+
+    def toggle_barcode_recording(self, on):
+        """Start or stop recording the barcode camera's stream."""
+        try:
+            if on:
+                stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                folder = Path(self.output_location) / "_recordings" / f"{stamp}_barcode"
+                flipped = getattr(self.cap_barcode, 'flip', True)
+                self.barcode_recorder = replay.FrameRecorder(
+                    folder,
+                    source=self.selected_barcodecam,
+                    camera_type='Webcam' if flipped else 'Replay',
+                )
+                self.log_info(f"Barcode camera: recording to {folder}")
+            elif self.barcode_recorder:
+                recorder, self.barcode_recorder = self.barcode_recorder, None
+                recorder.close()
+                self.log_info(f"Barcode camera: recording stopped — "
+                              f"{recorder.frames_written} frames written, "
+                              f"{recorder.frames_dropped} dropped.")
+        except Exception as e:
+            log.error(f"Error toggling barcode recording: {e}")
+            self.log_info(f"Error recording barcode camera: {e}")
+            self.pushButton_barcode_record.blockSignals(True)
+            self.pushButton_barcode_record.setChecked(False)
+            self.pushButton_barcode_record.blockSignals(False)
+
     def _update_remove_buttons(self):
         """Disable Remove on the last slot (must always have at least one)."""
         only_one = len(self.label_slots) == 1
@@ -1128,8 +2477,12 @@ class UI(QMainWindow):
         signal handlers revert the selection if a taken item is picked,
         since qt_material's delegate ignores item flags for blocking clicks.
         """
-        label_selected = {s.selected_camera for s in self.label_slots if s.selected_camera}
+        # Replays open their own reader, so any number of cameras can share one
+        label_selected = {s.selected_camera for s in self.label_slots
+                          if s.selected_camera and not s.selected_camera.startswith(REPLAY_PREFIX)}
         barcode_selected = self.selected_barcodecam if self.selected_barcodecam else ''
+        if barcode_selected.startswith(REPLAY_PREFIX):
+            barcode_selected = ''
         all_taken = label_selected | ({barcode_selected} if barcode_selected else set())
 
         # Update each label slot's taken set and visual state
@@ -1187,6 +2540,7 @@ class UI(QMainWindow):
 
             self._label_frame_signal.connect(self._display_frame)
             self._barcode_frame_signal.connect(self._display_frame)
+            self._accession_read_signal.connect(self._on_accession_read)
 
             self.statusBar().showMessage("Ready")
 
@@ -1209,8 +2563,46 @@ class UI(QMainWindow):
             self._label_grid.setColumnStretch(1, 1)
             self.ui.labelCameraScrollArea.setWidget(container)
 
+            # Output format selector — added in code so the generated .ui
+            # file stays untouched. Follows the sidebar's field-then-caption
+            # layout, directly below the accession field.
+            self.comboBox_output_format = QComboBox(self.ui.verticalWidget_4)
+            if ENCODERS_AVAILABLE:
+                for key, fmt in encoders.OUTPUT_FORMATS.items():
+                    self.comboBox_output_format.addItem(fmt['name'], key)
+            else:
+                self.comboBox_output_format.addItem("JPEG (8-bit)", "jpg")
+            self.label_output_format = QLabel("Output format", self.ui.verticalWidget_4)
+            self.label_output_format.setFont(self.ui.label_accession.font())
+            row = self.ui.verticalLayout_4.indexOf(self.ui.label_accession) + 1
+            self.ui.verticalLayout_4.insertWidget(row, self.comboBox_output_format)
+            self.ui.verticalLayout_4.insertWidget(row + 1, self.label_output_format)
+            self.comboBox_output_format.currentIndexChanged.connect(
+                lambda _: self.set_output_format(self.comboBox_output_format.currentData())
+            )
+
+            # Barcode camera "Record" button, next to its camera dropdown
+            self.pushButton_barcode_record = QPushButton("Record", self.ui.verticalWidget_4)
+            self.pushButton_barcode_record.setCheckable(True)
+            self.pushButton_barcode_record.setToolTip(
+                "Save every frame with its timestamp so the stream can be replayed later")
+            self.pushButton_barcode_record.setEnabled(REPLAY_AVAILABLE)
+            self.ui.horizontalLayout.insertWidget(2, self.pushButton_barcode_record)
+            self.pushButton_barcode_record.toggled.connect(self.toggle_barcode_recording)
+
         except Exception as e:
-            print(f"Error setting up UI connections: {e}")
+            log.error(f"Error setting up UI connections: {e}")
+
+    def set_output_format(self, key):
+        """Select the saved file format (a key of encoders.OUTPUT_FORMATS)."""
+        idx = self.comboBox_output_format.findData(key)
+        if idx < 0:
+            self.log_info(f"Output format '{key}' is not available — keeping {self.output_format}.")
+            return
+        self.output_format = key
+        self.file_format = encoders.OUTPUT_FORMATS[key]['ext'] if ENCODERS_AVAILABLE else ".jpg"
+        if idx != self.comboBox_output_format.currentIndex():
+            self.comboBox_output_format.setCurrentIndex(idx)
 
     def _set_camera_controls_enabled(self, enabled: bool):
         """Enable/disable all camera-related controls (used during discovery)."""
@@ -1232,6 +2624,8 @@ class UI(QMainWindow):
 
             for name in self.webcam_arr_barcode:
                 self.ui.comboBox_selectBarcodeCam.addItem(name)
+            if REPLAY_AVAILABLE:
+                self.ui.comboBox_selectBarcodeCam.addItem(REPLAY_ITEM)
 
             self.ui.comboBox_selectBarcodeCam.currentTextChanged.connect(
                 self.select_barcode_webcam
@@ -1243,11 +2637,11 @@ class UI(QMainWindow):
             elif len(self.webcam_arr_barcode) > 0:
                 self.ui.comboBox_selectBarcodeCam.setCurrentIndex(1)
 
-            if self.ui.comboBox_selectBarcodeCam.count() > 1:
+            if self.ui.comboBox_selectBarcodeCam.currentIndex() > 0:
                 self.select_barcode_webcam()
 
         except Exception as e:
-            print(f"Error setting up barcode camera selection: {e}")
+            log.error(f"Error setting up barcode camera selection: {e}")
 
     def setup_file_system(self):
         try:
@@ -1255,8 +2649,57 @@ class UI(QMainWindow):
             self.update_output_location()
             self.ui.pushButton_outputFolder.pressed.connect(self.set_output_location)
             self.output_location_folder = Path(self.output_location)
+            self.open_catalogue()
         except Exception as e:
-            print(f"Error setting up file system: {e}")
+            log.error(f"Error setting up file system: {e}")
+
+    def open_catalogue(self):
+        """(Re)open the capture catalogue named by catalogue_settings.
+
+        Without a catalogue, duplicates are detected by folder and rows are
+        appended straight to the CSV, as before the catalogue existed.
+        """
+        path = self.catalogue_settings.get('path') or catalogue.CATALOGUE_PATH
+        if self.catalogue is not None:
+            if self.catalogue.path == Path(path).expanduser():
+                return
+            self._export_pending_csvs()
+            self.catalogue.close()
+            self.catalogue = None
+        try:
+            self.catalogue = catalogue.Catalogue(Path(path).expanduser())
+            log.info(f"Capture catalogue: {self.catalogue.path}")
+            self._import_existing_csvs()
+        except Exception as e:
+            log.error(f"Error opening catalogue {path}: {e}")
+            self.log_info(f"Capture catalogue unavailable ({e}) — writing CSV files only.")
+
+    def _import_existing_csvs(self):
+        """Import the output folder's existing CSVs into the catalogue, once
+        per folder, on a worker thread."""
+        if self.catalogue is None:
+            return
+        output_location = self.output_location
+
+        def on_imported(count):
+            if count:
+                self.log_info(f"Catalogue: imported {count} earlier capture(s) from the "
+                              f"CSV files in {output_location}.")
+
+        worker = Worker(lambda progress_callback: self.catalogue.import_csvs(output_location))
+        worker.signals.result.connect(on_imported)
+        self.threadpool.start(worker)
+
+    def _export_pending_csvs(self):
+        """Rewrite the CSVs of taxa captured since the last export
+        (catalogue csv: on_exit)."""
+        for output_location, taxon in sorted(self._csv_pending):
+            try:
+                path, count = self.catalogue.export_csv(output_location, taxon)
+                log.info(f"Exported {count} row(s) to {path}")
+            except Exception as e:
+                log.error(f"Error exporting {taxon} CSV: {e}")
+        self._csv_pending.clear()
 
     def setup_config_system(self):
         try:
@@ -1269,7 +2712,7 @@ class UI(QMainWindow):
                 self.ui.pushButton_load_config.setEnabled(False)
                 self.ui.pushButton_writeConfig.setEnabled(False)
         except Exception as e:
-            print(f"Error setting up config system: {e}")
+            log.error(f"Error setting up config system: {e}")
 
     # ── Thread-safe display ────────────────────────────────────────────────────
 
@@ -1296,7 +2739,17 @@ class UI(QMainWindow):
 
     def select_barcode_webcam(self):
         try:
-            selected_camera = self.ui.comboBox_selectBarcodeCam.currentText()
+            combo = self.ui.comboBox_selectBarcodeCam
+            selected_camera = combo.currentText()
+
+            if selected_camera == REPLAY_ITEM:
+                path = ask_replay_source(self)
+                if not (path and self.open_barcode_replay(path)):
+                    combo.blockSignals(True)
+                    prev = self.selected_barcodecam if self.selected_barcodecam else "— Select camera —"
+                    combo.setCurrentIndex(max(combo.findText(prev), 0))
+                    combo.blockSignals(False)
+                return
 
             # Revert if this camera is already taken by a label slot
             if (selected_camera and selected_camera != "— Select camera —"
@@ -1318,18 +2771,37 @@ class UI(QMainWindow):
                 return
             if self.barcode_webcamView and self.cap_barcode:
                 self.cap_barcode.release()
-            webcam_id = int(selected_camera.split()[-1])
-            backend = cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_ANY
-            self.cap_barcode = cv2.VideoCapture(webcam_id, backend)
-            self.cap_barcode.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-            self.cap_barcode.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+            if selected_camera.startswith(REPLAY_PREFIX):
+                self.cap_barcode = replay.ReplayCamera(combo.currentData(), **self.replay_settings)
+            else:
+                webcam_id = int(selected_camera.split()[-1])
+                backend = cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_ANY
+                self.cap_barcode = cv2.VideoCapture(webcam_id, backend)
+                self.cap_barcode.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+                self.cap_barcode.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
             self.selected_barcodecam = selected_camera
             self.log_info("Selected " + selected_camera)
             self._refresh_camera_availability()
         except Exception as e:
-            print(f"Error selecting barcode webcam: {e}")
+            log.error(f"Error selecting barcode webcam: {e}")
             self.log_info(f"Error selecting barcode camera: {e}")
 
+    def open_barcode_replay(self, path):
+        """Select `path` as the barcode camera; see LabelCameraSlot.open_replay."""
+        combo = self.ui.comboBox_selectBarcodeCam
+        name = REPLAY_PREFIX + Path(path).name
+        idx = combo.findText(name)
+        if idx < 0:
+            idx = combo.count() - 1
+            combo.insertItem(idx, name, str(path))
+        else:
+            combo.setItemData(idx, str(path))
+        if idx == combo.currentIndex():
+            self.select_barcode_webcam()
+        else:
+            combo.setCurrentIndex(idx)
+        return self.selected_barcodecam == name
+
     def begin_barcode_webcam(self, cam_id, button_id):
         try:
             selected_camera = self.ui.comboBox_selectBarcodeCam.currentText()
@@ -1337,7 +2809,7 @@ class UI(QMainWindow):
                 if selected_camera == "— Select camera —" or not selected_camera:
                     self.log_info("Barcode camera: please select a camera first.")
                     return
-                label_conflict = any(
+                label_conflict = not selected_camera.startswith(REPLAY_PREFIX) and any(
                     s.label_webcamView and s.selected_camera == selected_camera
                     for s in self.label_slots
                 )
@@ -1346,8 +2818,11 @@ class UI(QMainWindow):
                     self.barcode_webcamView = True
                     self.log_info("Started barcode camera live view.")
                     self._refresh_camera_availability()
-                    worker = Worker(self.update_barcode_webcam, cam_id)
-                    self.threadpool.start(worker)
+                    if self._use_processes():
+                        self._start_barcode_process(cam_id)
+                    else:
+                        worker = Worker(self.update_barcode_webcam, cam_id)
+                        self.threadpool.start(worker)
                 else:
                     self.log_info("Selected camera is already in use by a label camera.")
             else:
@@ -1355,8 +2830,10 @@ class UI(QMainWindow):
                 self.log_info("Ended barcode camera live view.")
                 self.barcode_webcamView = False
                 self._refresh_camera_availability()
+                if self.barcode_process:
+                    self._stop_barcode_process()
         except Exception as e:
-            print(f"Error in begin_barcode_webcam: {e}")
+            log.error(f"Error in begin_barcode_webcam: {e}")
             self.log_info(f"Error with barcode camera: {e}")
 
     def update_barcode_webcam(self, cam_id, progress_callback):
@@ -1376,10 +2853,17 @@ class UI(QMainWindow):
         try:
             while self.barcode_webcamView and self.cap_barcode:
                 t_start = time.monotonic()
-                ret, frame = self.cap_barcode.read()
+                cap = self.cap_barcode
+                # Replay sources pace themselves and carry their own flip flag
+                self_paced = getattr(cap, 'self_paced', False)
+                flip = getattr(cap, 'flip', True)
+                ret, frame = cap.read()
 
                 if ret:
                     frame_count += 1
+                    recorder = self.barcode_recorder
+                    if recorder:
+                        recorder.add(frame)
 
                     # Decode on full-res frame — accuracy matters here
                     if frame_count % decode_interval == 0:
@@ -1391,18 +2875,10 @@ class UI(QMainWindow):
                                 QtCore.Qt.QueuedConnection,
                                 QtCore.Q_ARG(str, last_decoded)
                             )
+                            self._accession_read_signal.emit(last_decoded)
 
                     # Display pipeline — resize BGR first, then process small frame
-                    disp_w = cam_id.width()
-                    disp_h = cam_id.height()
-                    if disp_w > 0 and disp_h > 0:
-                        small = cv2.resize(frame, (disp_w, disp_h),
-                                           interpolation=cv2.INTER_LINEAR)
-                    else:
-                        small = frame
-
-                    small = cv2.flip(small, -1)
-                    rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+                    rgb = frame_to_display_rgb(frame, cam_id.width(), cam_id.height(), flip)
 
                     if last_decoded:
                         # Font size and position scaled to the display frame
@@ -1410,19 +2886,17 @@ class UI(QMainWindow):
                                     cv2.FONT_HERSHEY_SIMPLEX, 0.55,
                                     (48, 56, 65), 1, cv2.LINE_AA)
 
-                    if not rgb.flags['C_CONTIGUOUS']:
-                        rgb = np.ascontiguousarray(rgb)
-
                     h, w, ch = rgb.shape
                     qimg = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
                     self._barcode_frame_signal.emit(
                         QtGui.QPixmap.fromImage(qimg), cam_id
                     )
 
-                elapsed = time.monotonic() - t_start
-                sleep_time = frame_interval - elapsed
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
+                if not self_paced:
+                    elapsed = time.monotonic() - t_start
+                    sleep_time = frame_interval - elapsed
+                    if sleep_time > 0:
+                        time.sleep(sleep_time)
 
             QtCore.QMetaObject.invokeMethod(
                 cam_id, "setText",
@@ -1431,14 +2905,15 @@ class UI(QMainWindow):
             )
 
         except Exception as e:
-            print(f"Error in barcode webcam update: {e}")
+            log.error(f"Error in barcode webcam update: {e}")
             QtCore.QMetaObject.invokeMethod(
                 cam_id, "setText",
                 QtCore.Qt.QueuedConnection,
                 QtCore.Q_ARG(str, "Error in barcode camera.")
             )
 
-    def decode_datamatrix(self, frame):
+    @staticmethod
+    def decode_datamatrix(frame):
         """Attempt to decode a datamatrix barcode from a BGR frame.
 
         Strategy:
@@ -1485,7 +2960,7 @@ class UI(QMainWindow):
             return None
 
         except Exception as e:
-            print(f"Error decoding datamatrix: {e}")
+            log.error(f"Error decoding datamatrix: {e}")
             return None
 
     # ── Label camera live view ─────────────────────────────────────────────────
@@ -1501,6 +2976,7 @@ class UI(QMainWindow):
                 barcode_conflict = (
                     self.barcode_webcamView
                     and self.selected_barcodecam == slot.selected_camera
+                    and not slot.selected_camera.startswith(REPLAY_PREFIX)
                 )
                 if barcode_conflict:
                     self.log_info("Selected camera is already in use by the barcode camera.")
@@ -1511,6 +2987,10 @@ class UI(QMainWindow):
                 self.log_info(f"Started label camera {slot.slot_index + 1} live view.")
                 self._refresh_camera_availability()
 
+                if self._use_processes():
+                    self._start_slot_process(slot)
+                    return
+
                 if slot.label_camera_type == 'FLIR' and slot.flir_camera:
                     if not slot.flir_camera.start_acquisition():
                         self.log_info("Failed to start FLIR acquisition.")
@@ -1525,64 +3005,65 @@ class UI(QMainWindow):
                 slot.label_webcamView = False
                 self.log_info(f"Ended label camera {slot.slot_index + 1} live view.")
                 self._refresh_camera_availability()
-                if slot.label_camera_type == 'FLIR' and slot.flir_camera:
+                if slot.process:
+                    self._stop_slot_process(slot)
+                elif slot.label_camera_type == 'FLIR' and slot.flir_camera:
                     slot.flir_camera.stop_acquisition()
 
         except Exception as e:
-            print(f"Error in begin_label_camera (slot {slot.slot_index}): {e}")
+            log.error(f"Error in begin_label_camera (slot {slot.slot_index}): {e}")
             self.log_info(f"Error with label camera {slot.slot_index + 1}: {e}")
 
     def update_label_camera(self, slot, progress_callback):
         """Worker: stream frames for a single LabelCameraSlot.
 
         Pipeline order (optimised for low-powered hardware):
-          1. Grab full-res BGR frame (camera native)
+          1. Grab full-res BGR frame (camera native, cropped to the ROI)
           2. Store full-res BGR on slot.frame for HQ capture
           3. Resize BGR down to the display widget size  ← most of the saving
           4. Flip (webcam only) on the small frame
           5. cvtColor BGR→RGB on the small frame
           6. Build QImage directly at display size — no .scaled() needed
-        Steps 4-6 operate on ~6-10× fewer pixels than the original pipeline.
+        Steps 4-6 operate on ~6-10× fewer pixels than the original pipeline;
+        `python -m scripts.benchmark` measures both.
         """
         import time
         webcam_frame_interval = 1.0 / 15
+        slot.stability.reset()
+        device_id = slot.get_device_id()
 
         try:
             while slot.label_webcamView:
                 t_start = time.monotonic()
                 frame = None
 
-                if slot.label_camera_type == 'Webcam' and slot.cap:
+                if slot.label_camera_type in ('Webcam', 'Replay') and slot.cap:
                     ret, frame = slot.cap.read()
                     if not ret:
                         time.sleep(0.05)
                         continue
+                    recorder = slot.recorder
+                    if recorder:
+                        recorder.add(frame)
+                    # FLIR crops on the sensor; webcams are cropped here
+                    frame = slot.crop_to_roi(frame)
                 elif slot.label_camera_type == 'FLIR' and slot.flir_camera:
                     frame = slot.flir_camera.get_frame()
                     if frame is None:
                         time.sleep(0.01)
                         continue
+                    recorder = slot.recorder
+                    if recorder:
+                        recorder.add(frame)
 
                 if frame is not None:
                     slot.frame = frame   # store full-res BGR for HQ capture
 
-                    disp_w = slot.live_view.width()
-                    disp_h = slot.live_view.height()
-
-                    if disp_w > 0 and disp_h > 0:
-                        # Resize first — all subsequent ops work on display-sized pixels
-                        small = cv2.resize(frame, (disp_w, disp_h),
-                                           interpolation=cv2.INTER_LINEAR)
-                    else:
-                        small = frame
-
-                    if slot.label_camera_type == 'Webcam':
-                        small = cv2.flip(small, -1)
-
-                    rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
-                    # Ensure C-contiguous memory layout — required by QImage
-                    if not rgb.flags['C_CONTIGUOUS']:
-                        rgb = np.ascontiguousarray(rgb)
+                    # Resize first — all subsequent ops work on display-sized pixels
+                    rgb = frame_to_display_rgb(frame, slot.live_view.width(),
+                                               slot.live_view.height(), slot.is_flipped(),
+                                               self._preview_correction(slot, device_id, frame))
+                    draw_settled(rgb, slot.stability.update(rgb))
 
                     h, w, ch = rgb.shape
                     qimg = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
@@ -1591,7 +3072,8 @@ class UI(QMainWindow):
                         QtGui.QPixmap.fromImage(qimg), slot.live_view
                     )
 
-                # Webcam throttle — FLIR paces itself via hardware frame rate cap
+                # Webcam throttle — FLIR paces itself via hardware frame rate
+                # cap and Replay on the recording's timestamps
                 if slot.label_camera_type == 'Webcam':
                     elapsed = time.monotonic() - t_start
                     sleep_time = webcam_frame_interval - elapsed
@@ -1605,46 +3087,291 @@ class UI(QMainWindow):
             )
 
         except Exception as e:
-            print(f"Error in label camera update (slot {slot.slot_index}): {e}")
+            log.error(f"Error in label camera update (slot {slot.slot_index}): {e}")
             QtCore.QMetaObject.invokeMethod(
                 slot.live_view, "setText",
                 QtCore.Qt.QueuedConnection,
                 QtCore.Q_ARG(str, "Error in label camera.")
             )
 
+        slot.stability.reset()
         return slot.frame
 
+    def _preview_correction(self, slot, device_id, frame):
+        """The colour and lens corrections for a live view frame, or None
+        when neither preview is on. The lens correction is left out while
+        the user is dragging out an ROI, which is picked on the uncorrected
+        view."""
+        steps = []
+        settings = self.colour_settings
+        if settings['enabled'] and settings['preview']:
+            steps.append(lambda small: self.colour_profiles.correct(device_id, small))
+        settings = self.calibration_settings
+        if settings['enabled'] and settings['preview'] and not slot.live_view.selecting:
+            size = (frame.shape[1], frame.shape[0])
+            steps.append(lambda small: self.calibrations.preview(device_id, small, size, slot.roi))
+        if len(steps) < 2:
+            return steps[0] if steps else None
+        return lambda small: steps[1](steps[0](small))
+
+    # ── Process acquisition engine ─────────────────────────────────────────────
+
+    def _use_processes(self):
+        return MP_ENGINE_AVAILABLE and self.acquisition_settings['engine'] == 'processes'
+
+    def _start_slot_process(self, slot):
+        """Hand the slot's camera to a worker process and show its frames."""
+        spec = slot.process_spec()
+        slot.release_device()
+        slot.process = mp_engine.CameraProcess(
+            ProcessCameraSource, spec, pick=sharpness.sharpest,
+            heartbeat_timeout=self.acquisition_settings['heartbeat_timeout_s'],
+        )
+        slot.process.start()
+        worker = Worker(self.update_label_camera_process, slot, slot.process)
+        worker.signals.result.connect(
+            lambda reason, s=slot: self._on_slot_process_ended(s, reason))
+        self.threadpool.start(worker)
+
+    def _stop_slot_process(self, slot):
+        process, slot.process = slot.process, None
+        process.close()
+        slot.reopen_device()
+
+    def _on_slot_process_ended(self, slot, reason):
+        """Main-thread slot: a label camera's worker exited its loop. A
+        reason means the process crashed or hung, so clean up after it."""
+        if not reason:
+            return
+        self.log_info(f"Label camera {slot.slot_index + 1}: camera process {reason} — "
+                      "live view stopped.")
+        slot.start_btn.setText("Start live view")
+        slot.label_webcamView = False
+        if slot.process:
+            self._stop_slot_process(slot)
+        self._refresh_camera_availability()
+
+    def update_label_camera_process(self, slot, process, progress_callback):
+        """Worker: display frames from a label camera's worker process.
+
+        The frame arrives as a view into shared memory, so this thread only
+        runs the display pipeline. Returns None when stopped normally, or the
+        reason the worker process failed.
+        """
+        slot.stability.reset()
+        device_id = slot.get_device_id()
+        try:
+            while slot.label_webcamView and slot.process is process:
+                frame = None    # let go of the last frame's view first
+                seq, frame = process.wait_frame(timeout=0.5)
+                for event in process.poll_events():
+                    if event[0] == 'roi':
+                        slot.roi = event[1]
+                    elif event[0] == 'error':
+                        log.error(f"Label camera {slot.slot_index + 1} process error:\n{event[1]}")
+                if frame is None:
+                    reason = process.health()
+                    if reason:
+                        return reason
+                    continue
+
+                recorder = slot.recorder
+                if recorder:
+                    recorder.add(frame.copy())
+                # Only the shape is used (ROI selection) — captures are
+                # requested from the worker. A private copy, taken when the
+                # shape changes, so no view outlives the ring.
+                if slot.frame is None or slot.frame.shape != frame.shape:
+                    slot.frame = np.array(frame, copy=True)
+                rgb = frame_to_display_rgb(frame, slot.live_view.width(),
+                                           slot.live_view.height(), slot.is_flipped(),
+                                           self._preview_correction(slot, device_id, frame))
+                if not process.ring.is_current(seq):
+                    continue   # overwritten while converting — drop it
+                draw_settled(rgb, slot.stability.update(rgb))
+                h, w, ch = rgb.shape
+                qimg = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
+                self._label_frame_signal.emit(QtGui.QPixmap.fromImage(qimg), slot.live_view)
+
+            QtCore.QMetaObject.invokeMethod(
+                slot.live_view, "setText",
+                QtCore.Qt.QueuedConnection,
+                QtCore.Q_ARG(str, "Live view disabled.")
+            )
+        except Exception as e:
+            if slot.process is process:
+                log.error(f"Error in label camera process view (slot {slot.slot_index}): {e}")
+                return f"failed ({e})"
+        finally:
+            slot.stability.reset()
+        return None
+
+    def _barcode_process_spec(self):
+        combo = self.ui.comboBox_selectBarcodeCam
+        if self.selected_barcodecam.startswith(REPLAY_PREFIX):
+            return {'name': 'barcode', 'type': 'Replay', 'camera': self.selected_barcodecam,
+                    'path': combo.currentData(), 'replay_settings': dict(self.replay_settings)}
+        return {'name': 'barcode', 'type': 'Webcam', 'camera': self.selected_barcodecam,
+                'index': int(self.selected_barcodecam.split()[-1])}
+
+    def _start_barcode_process(self, cam_id):
+        """Run the barcode camera and its DataMatrix decoding in a worker
+        process."""
+        spec = self._barcode_process_spec()
+        flip = getattr(self.cap_barcode, 'flip', True)
+        if spec['type'] == 'Webcam' and self.cap_barcode:
+            self.cap_barcode.release()
+            self.cap_barcode = None
+        self.barcode_process = mp_engine.CameraProcess(
+            ProcessCameraSource, spec, decoder=UI.decode_datamatrix, decode_every=5,
+            heartbeat_timeout=self.acquisition_settings['heartbeat_timeout_s'],
+        )
+        self.barcode_process.start()
+        worker = Worker(self.update_barcode_process, cam_id, self.barcode_process, flip)
+        worker.signals.result.connect(self._on_barcode_process_ended)
+        self.threadpool.start(worker)
+
+    def _stop_barcode_process(self):
+        process, self.barcode_process = self.barcode_process, None
+        process.close()
+        if not self.selected_barcodecam.startswith(REPLAY_PREFIX):
+            self.select_barcode_webcam()    # re-open the webcam in this process
+
+    def _on_barcode_process_ended(self, reason):
+        if not reason:
+            return
+        self.log_info(f"Barcode camera: camera process {reason} — live view stopped.")
+        self.ui.pushButton_barcode_webcam.setText("Start live view")
+        self.barcode_webcamView = False
+        if self.barcode_process:
+            self._stop_barcode_process()
+        self._refresh_camera_availability()
+
+    def update_barcode_process(self, cam_id, process, flip, progress_callback):
+        """Worker: display barcode frames from the worker process and copy
+        decoded accessions into the accession field."""
+        last_decoded = None
+        try:
+            while self.barcode_webcamView and self.barcode_process is process:
+                frame = None    # let go of the last frame's view first
+                seq, frame = process.wait_frame(timeout=0.5)
+                for event in process.poll_events():
+                    if event[0] == 'decoded':
+                        last_decoded = event[1]
+                        QtCore.QMetaObject.invokeMethod(
+                            self.ui.lineEdit_accession, "setText",
+                            QtCore.Qt.QueuedConnection,
+                            QtCore.Q_ARG(str, last_decoded)
+                        )
+                        self._accession_read_signal.emit(last_decoded)
+                    elif event[0] == 'error':
+                        log.error(f"Barcode camera process error:\n{event[1]}")
+                if frame is None:
+                    reason = process.health()
+                    if reason:
+                        return reason
+                    continue
+
+                recorder = self.barcode_recorder
+                if recorder:
+                    recorder.add(frame.copy())
+                rgb = frame_to_display_rgb(frame, cam_id.width(), cam_id.height(), flip)
+                if not process.ring.is_current(seq):
+                    continue
+                if last_decoded:
+                    cv2.putText(rgb, "Decoded: " + last_decoded, (8, 20),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.55,
+                                (48, 56, 65), 1, cv2.LINE_AA)
+                h, w, ch = rgb.shape
+                qimg = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
+                self._barcode_frame_signal.emit(QtGui.QPixmap.fromImage(qimg), cam_id)
+
+            QtCore.QMetaObject.invokeMethod(
+                cam_id, "setText",
+                QtCore.Qt.QueuedConnection,
+                QtCore.Q_ARG(str, "Live view disabled.")
+            )
+        except Exception as e:
+            if self.barcode_process is process:
+                log.error(f"Error in barcode camera process view: {e}")
+                return f"failed ({e})"
+        return None
+
     # ── Capture ────────────────────────────────────────────────────────────────
 
     def capture_set(self):
         try:
-            self.output_location_folder = (
-                Path(self.output_location)
-                .joinpath(self.ui.lineEdit_taxon.text())
-                .joinpath(self.ui.lineEdit_accession.text())
-            )
-            if os.path.exists(self.output_location_folder):
-                self.show_popup()
+            found = self._already_imaged()
+            if found:
+                self.show_popup(found)
             else:
                 self._do_capture()
         except Exception as e:
-            print(f"Error in capture_set: {e}")
+            log.error(f"Error in capture_set: {e}")
             self.log_info(f"Error during capture: {e}")
 
-    def show_popup(self):
+    def _already_imaged(self):
+        """Set the accession's output folder and return where it has been
+        imaged before: catalogue rows, True for an existing folder, or a
+        false value."""
+        self.output_location_folder = (
+            Path(self.output_location)
+            .joinpath(self.ui.lineEdit_taxon.text())
+            .joinpath(self.ui.lineEdit_accession.text())
+        )
+        if self.catalogue is not None:
+            return self.catalogue.find_accession(
+                self.ui.lineEdit_accession.text(), self.output_location)
+        if self._container_active():
+            return self._find_in_containers(self.ui.lineEdit_taxon.text(),
+                                            self.ui.lineEdit_accession.text())
+        return (os.path.exists(self.output_location_folder)
+                or os.path.exists(self._write_path(self.output_location_folder)))
+
+    def _find_in_containers(self, taxon, accession):
+        """Earlier captures of `accession` in container mode without a
+        catalogue, from the session containers' indexes and the taxon CSV of
+        exported ones, as find_accession() rows; empty if none."""
+        folder = Path(self.output_location) / container.CONTAINER_DIR
+        rows = [entry.get('metadata') or {}
+                for chunks in {folder, self._write_path(folder)}
+                for entry in container.find_records(chunks, f"{taxon}/{accession}/")]
+        csv_file = catalogue.csv_path(self.output_location, taxon)
+        if csv_file.exists():
+            with open(csv_file, newline='', encoding='utf-8') as f:
+                rows += [row for row in csv.DictReader(f) if row.get('accession_number') == accession]
+        if not rows:
+            return []
+        return [{'taxon_name': taxon,
+                 'images': len({row.get('image_filename') for row in rows}),
+                 'last_captured': max(row.get('date_captured', '') for row in rows)}]
+
+    def show_popup(self, found=None):
         try:
-            button = QMessageBox.question(
-                self, "RAPIID Dialog",
-                "A folder with this accession number already exists!\n"
-                "Do you want to overwrite the existing file/s?"
-            )
+            if isinstance(found, list):
+                where = "\n".join(
+                    f"  {r['taxon_name']}: {r['images']} image(s), last {r['last_captured']}"
+                    for r in found
+                )
+                text = ("This accession number has already been imaged:\n" + where +
+                        "\n\nDo you want to capture it again (overwriting files of the same name)?")
+            else:
+                text = ("A folder with this accession number already exists!\n"
+                        "Do you want to overwrite the existing file/s?")
+            button = QMessageBox.question(self, "RAPIID Dialog", text)
             if button == QMessageBox.Yes:
                 self._do_capture()
         except Exception as e:
-            print(f"Error showing popup: {e}")
+            log.error(f"Error showing popup: {e}")
 
-    def _do_capture(self):
-        """Capture sequentially from all label slots with progress feedback."""
+    def _do_capture(self, auto=False):
+        """Capture from all label slots with progress feedback.
+
+        Frames are grabbed one slot at a time (a FLIR HQ grab pauses that
+        camera's stream), but each frame goes to the encoder pool as soon as
+        it is grabbed, so encoding and writing overlap the next grab.
+        `auto` marks a capture started by auto capture, for the throughput.
+        """
         try:
             n = len(self.label_slots)
             self.ui.pushButton_capture.setEnabled(False)
@@ -1659,11 +3386,62 @@ class UI(QMainWindow):
                 capture_dlg.show()
                 QApplication.processEvents()
 
-            for i, slot in enumerate(self.label_slots):
-                tag = f"_label_{slot.slot_index + 1}" if n > 1 else "_label"
+            if self.stability_settings['wait']:
+                self._wait_until_settled()
+
+            accession = self.ui.lineEdit_accession.text()
+            tags = [f"_label_{slot.slot_index + 1}" if n > 1 else "_label"
+                    for slot in self.label_slots]
+            entry = None
+            if self.journal is not None and not self._container_active():
+                entry = self.journal.begin(
+                    self.output_location,
+                    [dict(zip(('final', 'write'), paths)) for tag in tags
+                     for paths in self._capture_files(tag)],
+                    accession=accession,
+                )
+
+            # Blocking on quality holds every frame until all are checked
+            block = self.quality_settings['mode'] == 'block'
+            jobs = []
+            for i, (slot, tag) in enumerate(zip(self.label_slots, tags)):
                 if n > 1:
                     capture_dlg.set_step(i + 1, f"Saving image {i + 1} of {n}…")
-                self.capture_label_camera(slot, tag)
+                jobs += self.capture_label_camera(slot, tag, submit=not block, entry=entry)
+
+            problems = [f"Camera {job['slot'].slot_index + 1}: {', '.join(job['issues'])}"
+                        for job in jobs if job['issues']]
+            if block and problems:
+                choice = self._quality_prompt(problems)
+                if choice != QMessageBox.Save:
+                    if entry is not None:
+                        self.journal.finish(entry)
+                    if n > 1:
+                        capture_dlg.close()
+                    self.ui.pushButton_capture.setEnabled(True)
+                    if choice == QMessageBox.Retry:
+                        self.log_info("Quality check failed — retaking.")
+                        QtCore.QTimer.singleShot(0, lambda: self._do_capture(auto))
+                    else:
+                        self.log_info("Quality check failed — capture discarded.")
+                        self._flash_capture_feedback(success=False)
+                    return
+            if block:
+                jobs = [job for job in (self._submit_capture(job) for job in jobs) if job]
+            for problem in problems:
+                self.log_info(f"Quality warning — {problem}")
+            if problems and not block:
+                self.statusBar().showMessage("Quality warning — see the log.", 6000)
+
+            rows = [row for row in (self._finish_capture(job) for job in jobs) if row]
+            self._record_capture_set(rows, entry)
+            if rows:
+                if self.accession_trigger is not None:
+                    self.accession_trigger.captured(accession)
+                # A tray set holds a specimen per code read
+                specimens = sum(1 for row in rows if row.get('source_image')) or 1
+                self.throughput.add(auto, specimens)
+                self.update_throughput_status()
 
             if n > 1:
                 capture_dlg.set_step(n, "Done!")
@@ -1672,11 +3450,61 @@ class UI(QMainWindow):
 
             self.ui.pushButton_capture.setEnabled(True)
         except Exception as e:
-            print(f"Error in _do_capture: {e}")
+            log.error(f"Error in _do_capture: {e}")
             self.log_info(f"Error during capture: {e}")
             self.ui.pushButton_capture.setEnabled(True)
 
-    def capture_label_camera(self, slot, tag):
+    def _quality_prompt(self, problems):
+        """Ask what to do with a capture that failed the quality check:
+        Retry (retake now), Save (keep it) or Cancel (discard it)."""
+        box = QMessageBox(
+            QMessageBox.Warning, "RAPIID Dialog",
+            "The quality check failed:\n\n" + "\n".join(problems) + "\n\nRetake now?",
+            QMessageBox.Retry | QMessageBox.Save | QMessageBox.Cancel, self)
+        box.button(QMessageBox.Save).setText("Save anyway")
+        box.setDefaultButton(QMessageBox.Retry)
+        return box.exec_()
+
+    def _labels_settled(self):
+        """Whether every running label view has settled (False with none
+        running)."""
+        running = [slot for slot in self.label_slots if slot.label_webcamView]
+        return bool(running) and all(slot.stability.settled for slot in running)
+
+    def _wait_until_settled(self):
+        """Wait up to timeout_s for the label views to settle, keeping the
+        live views updating. Returns the seconds waited, or None on timeout,
+        when the capture goes ahead anyway."""
+        import time
+        timeout = float(self.stability_settings['timeout_s'])
+        started = time.monotonic()
+        while not self._labels_settled():
+            if not any(slot.label_webcamView for slot in self.label_slots):
+                return 0.0
+            if time.monotonic() - started >= timeout:
+                self.log_info(f"Label views still moving after {timeout:.1f} s — capturing anyway.")
+                return None
+            QApplication.processEvents(QtCore.QEventLoop.ExcludeUserInputEvents)
+            time.sleep(0.01)
+        waited = time.monotonic() - started
+        if waited >= 0.05:
+            self.log_info(f"Waited {waited * 1000:.0f} ms for the label views to settle.")
+        return waited
+
+    def capture_label_camera(self, slot, tag, submit=True, entry=None):
+        """Grab a frame from `slot` (the sharpest of a burst with burst
+        capture on, a fused focus stack with focus stacking on), check its
+        quality and queue it for encoding and writing.
+
+        Returns the job dicts for _finish_capture(): the frame's own, then
+        with tray capture on one for each specimen read in the frame, whose
+        files are added to the journal `entry`. Empty if no frame was
+        available. Metadata is embedded while encoding, so each image is
+        written exactly once. With `submit` False the frames stay in the
+        jobs until _submit_capture(), so a failed quality check can stop
+        them being written; job['issues'] lists the problems found.
+        """
+        import time
         try:
             self.create_output_folders()
             accession = self.ui.lineEdit_accession.text()
@@ -1684,48 +3512,905 @@ class UI(QMainWindow):
             creator = self.ui.lineEdit_creator.text()
             institution = self.ui.lineEdit_institution.text()
 
-            file_name = str(
-                self.output_location_folder.joinpath(accession + tag + self.file_format)
-            )
+            file_name, write_name = self._capture_paths(tag)
 
-            frame_to_save = slot.get_frame_for_capture()
+            fmt = encoders.OUTPUT_FORMATS[self.output_format] if ENCODERS_AVAILABLE else None
+            high_bit = bool(fmt and fmt['high_bit'])
+            count = max(1, int(self.burst_settings['frames']))
+            t0 = time.perf_counter()
+            if self.focus_stack_settings['enabled']:
+                count = 1
+                frame_to_save = self._capture_focus_stack(slot, high_bit)
+                scores = [sharpness.score(frame_to_save)] if frame_to_save is not None else []
+            else:
+                frame_to_save, scores = slot.capture_burst(count, high_bit_depth=high_bit)
             if frame_to_save is None:
                 self.log_info(f"Camera {slot.slot_index + 1}: no frame available!")
                 self._flash_capture_feedback(success=False)
-                return
-
-            cv2.imwrite(file_name, frame_to_save)
-            self.log_info(f"Camera {slot.slot_index + 1}: {os.path.basename(file_name)} saved.")
-            self._flash_capture_feedback(success=True)
+                return []
+            if count > 1:
+                best = scores.index(max(scores))
+                self.log_info(
+                    f"Camera {slot.slot_index + 1}: kept frame {best + 1} of {len(scores)} "
+                    f"(sharpness {', '.join(f'{v:.0f}' for v in scores)}; "
+                    f"burst took {(time.perf_counter() - t0) * 1000:.0f} ms)."
+                )
 
             device_info = slot.get_device_info()
+            job = {
+                'slot': slot,
+                'taxon': taxon,
+                'file_name': file_name,
+                'write_name': write_name,
+                'frame': frame_to_save,
+                'metadata': (creator, taxon, accession, device_info, institution),
+                'csv_data': ExifManager.get_csv_data(
+                    creator, taxon, accession, self.file_format, device_info,
+                    tag=tag, institution=institution,
+                    sharpness=max(scores) if scores else None
+                ),
+            }
 
-            _, exif_msg = ExifManager.add_exif_to_image(
-                file_name, creator, taxon, accession, device_info, institution
-            )
-            self.log_info(exif_msg)
+            metrics = quality.measure(frame_to_save)
+            metrics['focus'] = max(scores) if scores else None
+            checked = self.quality_settings['mode'] != 'off'
+            job['issues'] = quality.check(metrics, self.quality_settings) if checked else []
+            job['csv_data'].update(quality.csv_fields(metrics, job['issues'], checked))
+
+            # Corrected after the quality check, which is about the exposure
+            # and focus of the frame as captured, not the corrected colours
+            # or borders. Colour first, on the smaller uncorrected frame
+            device_id = slot.get_device_id()
+            if self.colour_settings['enabled']:
+                t0 = time.perf_counter()
+                job['frame'] = self.colour_profiles.correct(device_id, job['frame'])
+                if job['frame'] is not frame_to_save:
+                    log.debug(f"Slot {slot.slot_index}: colour correction took "
+                              f"{(time.perf_counter() - t0) * 1000:.1f} ms")
+            if self.calibration_settings['enabled']:
+                t0 = time.perf_counter()
+                corrected = self.calibrations.correct(device_id, job['frame'], slot.roi)
+                if corrected is not job['frame']:
+                    log.debug(f"Slot {slot.slot_index}: lens correction took "
+                              f"{(time.perf_counter() - t0) * 1000:.1f} ms")
+                job['frame'] = corrected
+
+            jobs = [job]
+            if self.multicode_settings['enabled']:
+                jobs += self._specimen_jobs(job, tag, entry)
+            if submit:
+                # Each specimen keeps its row even if the frame's own job fails
+                jobs = [j for j in (self._submit_capture(j) for j in jobs) if j]
+            return jobs
 
-            csv_data = ExifManager.get_csv_data(
-                creator, taxon, accession, self.file_format, device_info,
-                tag=tag, institution=institution
-            )
-            _, csv_msg = FileManager.create_or_update_csv(
-                self.output_location, taxon, csv_data
+        except Exception as e:
+            log.error(f"Error capturing from slot {slot.slot_index}: {e}")
+            self.log_info(f"Camera {slot.slot_index + 1}: capture failed! {e}")
+            self._flash_capture_feedback(success=False)
+            return []
+
+    def _specimen_jobs(self, job, tag, entry=None):
+        """Read the DataMatrix codes in a capture's frame and return a job
+        for each specimen found: its label cut out of the frame, saved under
+        its own accession (<taxon>/<accession>/<accession><tag>_specimen)
+        with the capture's metadata, quality and sharpness. The suffix keeps
+        it apart from the tray image when the accession field holds one of
+        the tray's own codes."""
+        slot = job['slot']
+        camera = f"Camera {slot.slot_index + 1}"
+        try:
+            result = wait_responsive(self.multicode_pool.submit(job['frame']))
+        except Exception as e:
+            log.error(f"Error reading the codes of {job['file_name']}: {e}")
+            self.log_info(f"{camera}: reading the tray's codes failed: {e}")
+            return []
+        found = result['specimens']
+        self.log_info(f"{camera}: {len(found)} specimen code(s) read in {result['ms']:.0f} ms"
+                      + (f" — {', '.join(s['text'] for s in found)}." if found else "."))
+        creator, taxon, _, device_info, institution = job['metadata']
+        taxon_folder = Path(self.output_location).joinpath(taxon)
+        kept = ('sharpness',) + quality.CSV_FIELDS
+        tag += multicode.SPECIMEN_SUFFIX
+        jobs = []
+        for specimen in found:
+            accession = specimen['text']
+            if self.catalogue is not None and self.catalogue.find_accession(
+                    accession, self.output_location):
+                self.log_info(f"{accession} has already been imaged — saving it again.")
+            file_name = str(taxon_folder.joinpath(accession, accession + tag + self.file_format))
+            csv_data = ExifManager.get_csv_data(creator, taxon, accession, self.file_format,
+                                                device_info, tag=tag, institution=institution)
+            csv_data.update({c: job['csv_data'][c] for c in kept})
+            csv_data.update(multicode.csv_fields(job['file_name'], specimen))
+            jobs.append({
+                'slot': slot,
+                'taxon': taxon,
+                'file_name': file_name,
+                'write_name': str(self._write_path(file_name)),
+                'frame': labelcrop.crop(job['frame'], specimen['region']),
+                'metadata': (creator, taxon, accession, device_info, institution),
+                'csv_data': csv_data,
+                'issues': [],       # the capture's own job reports them
+            })
+        if entry is not None and jobs:
+            self.journal.add_files(entry, [
+                dict(zip(('final', 'write'), paths))
+                for s in jobs for paths in self._image_files(s['file_name'])])
+        if not self._container_active():
+            for s in jobs:
+                Path(s['write_name']).parent.mkdir(parents=True, exist_ok=True)
+        return jobs
+
+    def _capture_focus_stack(self, slot, high_bit_depth):
+        """Grab a focus stack from `slot` and fuse it on the stack pool, the
+        live views updating meanwhile. Returns the fused frame, or None."""
+        settings = self.focus_stack_settings
+        camera = f"Camera {slot.slot_index + 1}"
+        if not settings['focus_range']:
+            self.statusBar().showMessage(
+                f"{camera}: focus stack — step the stage through the specimen…", 5000)
+        frames = slot.capture_stack(
+            max(1, int(settings['frames'])), high_bit_depth,
+            interval=float(settings['interval_s']), focus_range=settings['focus_range'],
+            settle_s=float(settings['settle_s']),
+        )
+        if not frames:
+            return None
+        result = wait_responsive(self.stack_pool.submit(frames))
+        self.log_info(f"{camera}: fused a {len(frames)}-frame focus stack "
+                      f"in {result['ms']:.0f} ms.")
+        return result['frame']
+
+    def _submit_capture(self, job):
+        """Queue a grabbed frame for encoding and writing. Returns the job,
+        or None if it could not be queued."""
+        slot = job['slot']
+        try:
+            frame_to_save = job.pop('frame')
+            metadata = job['metadata']
+            file_name, write_name = job['file_name'], job['write_name']
+            fmt = encoders.OUTPUT_FORMATS[self.output_format] if ENCODERS_AVAILABLE else None
+
+            if not ENCODERS_AVAILABLE:
+                ok, buf = cv2.imencode(self.file_format, frame_to_save)
+                if not ok:
+                    raise IOError("encoding failed")
+                journal.write_atomic(write_name, buf.tobytes(), self._fsync())
+                _, job['meta_msg'] = ExifManager.add_exif_to_image(
+                    write_name, *metadata, fsync=self._fsync())
+                self._submit_derivatives(job, frame_to_save)
+                self._submit_label_crops(job, frame_to_save)
+                self._submit_ocr(job, frame_to_save)
+                return job
+
+            if fmt['codec'] == 'tiff' and not highbit.TIFFFILE_AVAILABLE:
+                job['meta_msg'] = "Metadata tags skipped (tifffile not installed)"
+            elif fmt['codec'] != 'tiff' and not EXIF_AVAILABLE:
+                job['meta_msg'] = "EXIF embedding skipped (PIL/piexif not installed)"
+            job['future'] = self.encoder_pool.submit(
+                frame_to_save, write_name, self.output_format, self.encoder_settings,
+                exif_bytes=ExifManager.get_exif_bytes(*metadata),
+                tiff_tags=ExifManager.get_tiff_tags(*metadata),
+                writer=self._container_writer(file_name, job['csv_data']),
             )
-            self.log_info(csv_msg)
+            self._submit_derivatives(job, frame_to_save)
+            self._submit_label_crops(job, frame_to_save)
+            self._submit_ocr(job, frame_to_save)
+            return job
+
+        except Exception as e:
+            log.error(f"Error capturing from slot {slot.slot_index}: {e}")
+            self.log_info(f"Camera {slot.slot_index + 1}: capture failed! {e}")
+            self._flash_capture_feedback(success=False)
+            return None
+
+    def _capture_paths(self, tag):
+        """(final path, path written now) of the image for `tag` — they
+        differ while staging."""
+        accession = self.ui.lineEdit_accession.text()
+        file_name = str(self.output_location_folder.joinpath(accession + tag + self.file_format))
+        return file_name, str(self._write_path(file_name))
+
+    def _capture_files(self, tag):
+        """(final, write) paths of every file a capture for `tag` writes:
+        the image, then its derivatives."""
+        return self._image_files(self._capture_paths(tag)[0])
+
+    def _image_files(self, file_name):
+        """(final, write) paths of every file saving the image `file_name`
+        writes: the image, then its derivatives."""
+        return [(file_name, str(self._write_path(file_name)))] + [
+            (str(final), str(self._write_path(final)))
+            for final, _ in self._derivative_targets(file_name).values()
+        ]
+
+    def _derivative_targets(self, file_name):
+        """{name: (final path, longest edge)} of the derivatives to make of
+        `file_name`; empty when derivatives are off."""
+        if self.derivative_pool is None:
+            return {}
+        settings = self.derivative_settings
+        return {
+            name: (derivatives.derivative_path(file_name, name, self.output_location,
+                                               settings['location']), edge)
+            for name, edge in settings['sizes'].items()
+        }
+
+    def _submit_derivatives(self, job, frame):
+        """Queue the derivatives of a capture from its in-memory frame."""
+        targets = self._derivative_targets(job['file_name'])
+        if not targets:
+            return
+        if self._container_active():
+            # Added to the container under their final paths, without a CSV row
+            writers = {str(final): self._container_writer(str(final), None)
+                       for final, _ in targets.values()}
+
+            def add_to_container(data, path):
+                writers[str(path)](data, path)
+            writer = add_to_container
+        else:
+            writer = None
+            targets = {name: (self._write_path(final), edge)
+                       for name, (final, edge) in targets.items()}
+        job['derivatives'] = self.derivative_pool.submit(frame, targets, writer)
+
+    def _submit_label_crops(self, job, frame):
+        """Queue the label crops of a capture from its in-memory frame.
+
+        Unlike the derivatives, nothing waits for them: each capture's crops
+        are recorded in the catalogue (and handed to the mover, when
+        staging) whenever they are done. A crop lost to a crash is made
+        again by `python -m scripts.labelcrop`.
+        """
+        if self.crop_pool is None:
+            return
+        file_name = job['file_name']
+        output_location = self.output_location
+        location = self.derivative_settings['location']
+        staging = self._staging_active()
+
+        def final(i):
+            return derivatives.derivative_path(file_name, f"crop{i}", output_location, location)
+
+        if self._container_active():
+            if self.container is None:
+                self.open_container()
+            session = self.container
+
+            def add_to_container(data, path):
+                self._add_to_container(session, output_location, path, data)
+            writer = add_to_container
+            path_for = final
+        else:
+            # A retake may find fewer labels: drop the earlier crops and their
+            # rows first, so none of them outlives the new master
+            writer = None
+            removed = labelcrop.remove_crops(final)
+            if self.catalogue is not None and removed:
+                self.catalogue.set_label_crops(output_location, file_name, [])
+            if staging:
+                def path_for(i):
+                    return self.mover.staged_path(final(i), output_location)
+            else:
+                path_for = final
+        self.crop_pool.submit(frame, path_for, writer).add_done_callback(
+            lambda future: self._label_crops_done(future, file_name, output_location,
+                                                  final, staging and writer is None))
+
+    def _label_crops_done(self, future, file_name, output_location, final, staged):
+        """Record a capture's label crops; runs on the crop pool."""
+        name = os.path.basename(file_name)
+        try:
+            result = future.result()
+        except Exception as e:
+            log.error(f"Error cropping the labels of {file_name}: {e}")
+            self.log_info(f"Label crops of {name} failed: {e}")
+            return
+        crops = result['crops']
+        log.debug(f"{len(crops)} label crop(s) of {file_name} made in {result['ms']:.0f} ms")
+        try:
+            if staged and crops:
+                self.mover.enqueue([{'src': crop['path'], 'dst': str(final(i))}
+                                    for i, crop in enumerate(crops, 1)])
+            if self.catalogue is not None:
+                self.catalogue.set_label_crops(
+                    output_location, file_name,
+                    [dict(crop, path=str(final(i))) for i, crop in enumerate(crops, 1)])
+        except Exception as e:
+            log.error(f"Error recording the label crops of {file_name}: {e}")
+
+    def _submit_ocr(self, job, frame):
+        """Queue a capture to be read by OCR. Like the label crops, nothing
+        waits for it; the sidecar is written when the text comes back."""
+        if self.ocr_pool is None:
+            return
+        file_name = job['file_name']
+        output_location = self.output_location
+        final = ocr.sidecar_path(file_name, output_location, self.derivative_settings['location'])
+        session = None
+        if self._container_active():
+            if self.container is None:
+                self.open_container()
+            session = self.container
+        staged = self.mover.staged_path(final, output_location) if self._staging_active() else None
+        try:
+            future = self.ocr_pool.submit(frame)
+        except Exception as e:
+            log.error(f"Error queueing {file_name} for OCR: {e}")
+            self.log_info(f"OCR of {os.path.basename(file_name)} could not be queued: {e}")
+            return
+        future.add_done_callback(
+            lambda f: self._ocr_done(f, file_name, output_location, final, staged, session))
+
+    def _ocr_done(self, future, file_name, output_location, final, staged, session):
+        """Write a capture's OCR sidecar; runs on the OCR pool's thread."""
+        if future.cancelled():
+            return
+        name = os.path.basename(file_name)
+        try:
+            result = future.result()
+            data = ocr.sidecar_json(file_name, result)
+            if session is not None:
+                self._add_to_container(session, output_location, final, data)
+            else:
+                path = staged or final
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                journal.write_atomic(path, data, self._fsync())
+                if staged is not None:
+                    self.mover.enqueue([{'src': staged, 'dst': final}])
+        except Exception as e:
+            log.error(f"Error reading {file_name} by OCR: {e}")
+            self.log_info(f"OCR of {name} failed: {e}")
+            return
+        first = result['text'].split("\n", 1)[0]
+        self.log_info(
+            f"OCR {name}: {len(result['lines'])} line(s), confidence {result['confidence']:.0f}"
+            + (" (cached)" if result['cached'] else f", {result['ms'] / 1000:.1f} s")
+            + (f" — “{first[:40]}”" if first else ""))
+
+    def _container_writer(self, file_name, csv_data):
+        """In container mode, a writer for EncoderPool.submit() that appends
+        the encoded image to the session container; otherwise None."""
+        if not self._container_active():
+            return None
+        if self.container is None:
+            self.open_container()
+        session = self.container
+        output_location = self.output_location
+        return lambda data, path: self._add_to_container(
+            session, output_location, file_name, data, csv_data)
+
+    def _add_to_container(self, session, output_location, final, data, csv_data=None):
+        """Add the file `final` (in `output_location`) to the container
+        `session` it was queued for; runs on the pool that made it.
+
+        If that session was closed in the meantime (a config loaded, the
+        output folder changed), the file goes to the current session when
+        that writes to the same folder, else it is written loose at `final`
+        with its CSV row, so no chunk is left unfinished.
+        """
+        member = Path(final).relative_to(output_location).as_posix()
+        for candidate in dict.fromkeys((session, self.container)):
+            if candidate is None or candidate.folder != session.folder:
+                continue
+            try:
+                candidate.add(member, data, csv_data)
+                return
+            except ValueError:
+                continue    # closed while we were getting to it
+        log.info(f"Container closed — writing {final} as a file")
+        Path(final).parent.mkdir(parents=True, exist_ok=True)
+        journal.write_atomic(final, data, self._fsync())
+        if csv_data:
+            ok, msg = FileManager.append_csv_rows(output_location, csv_data['taxon_name'],
+                                                  [csv_data], fsync=self._fsync())
+            if not ok:
+                log.error(msg)
+
+    def _finish_capture(self, job):
+        """Wait for a queued capture to reach disk and log it. Returns its
+        catalogue row, or None if it failed — a row is never recorded for an
+        image that was not written."""
+        slot = job['slot']
+        name = os.path.basename(job['file_name'])
+        row = dict(job['csv_data'], image_path=job['file_name'], write_path=job['write_name'])
+        try:
+            if 'future' in job:
+                result = job['future'].result()
+                row['bytes'] = result['bytes']
+                synced = f", synced in {result['sync_ms']:.0f} ms" if result['sync_ms'] else ""
+                self.log_info(
+                    f"Camera {slot.slot_index + 1}: {name} saved "
+                    f"({result['bytes'] / 1e6:.1f} MB, encoded in {result['encode_ms']:.0f} ms"
+                    f"{synced})."
+                )
+            else:
+                self.log_info(f"Camera {slot.slot_index + 1}: {name} saved.")
+            if job.get('meta_msg'):
+                self.log_info(job['meta_msg'])
+            if 'derivatives' in job:
+                row['derivatives'] = self._finish_derivatives(job)
+            self._flash_capture_feedback(success=True)
+            return row
 
         except Exception as e:
-            print(f"Error capturing from slot {slot.slot_index}: {e}")
+            log.error(f"Error saving {name}: {e}")
             self.log_info(f"Camera {slot.slot_index + 1}: capture failed! {e}")
             self._flash_capture_feedback(success=False)
+            return None
+
+    def _finish_derivatives(self, job):
+        """Wait for a capture's derivatives. Returns their (final, write)
+        path pairs; a failure is logged but does not fail the capture."""
+        try:
+            result = job['derivatives'].result()
+        except Exception as e:
+            log.error(f"Error making derivatives of {job['file_name']}: {e}")
+            self.log_info(f"Derivatives of {os.path.basename(job['file_name'])} failed: {e}")
+            return []
+        log.debug(f"Derivatives of {job['file_name']} made in {result['ms']:.0f} ms")
+        if self._container_active():
+            return []
+        return [(str(final), str(self._write_path(final)))
+                for final, _ in self._derivative_targets(job['file_name']).values()]
+
+    def _record_capture_set(self, rows, entry=None, output_location=None):
+        """Add a capture set's rows to the catalogue in one transaction and
+        bring the taxon CSV up to date.
+
+        With the journal, `entry` is marked written once the images are in
+        place and removed once the rows are recorded; a set interrupted in
+        between is finished by _recover_journal() at the next start, with
+        the set's own `output_location`.
+        """
+        output_location = output_location or self.output_location
+        if rows and self._review_loaded and output_location == self.output_location:
+            self.review_panel.model.add_set(review.capture_set(rows))
+        if self._container_active() and entry is None:
+            # Container sets are not journaled: the container index is their
+            # record. The CSV is written when the container is exported.
+            if rows:
+                self._add_to_catalogue(output_location, rows)
+                session = self.container
+                where = session.chunks[-1].name if session and session.chunks else "the container"
+                self.log_info(f"Added {len(rows)} image(s) to {where}.")
+            return
+
+        if entry is not None and entry['state'] == 'begun':
+            self.journal.written(entry, rows)
+        recorded = True
+        if rows:
+            taxon = rows[0]['taxon_name']
+            if entry is None or entry['state'] != 'catalogued':
+                if self._add_to_catalogue(output_location, rows) and entry is not None:
+                    self.journal.catalogued(entry)
+            staged = any(row['write_path'] != row['image_path'] for row in rows)
+            write_csv = not (self.catalogue is not None
+                             and self.catalogue_settings['csv'] == 'on_exit')
+            if not write_csv:
+                self._csv_pending.add((output_location, taxon))
+            if staged:
+                recorded = self._queue_for_output(output_location, taxon, rows, write_csv)
+            elif write_csv:
+                recorded, csv_msg = FileManager.append_csv_rows(
+                    output_location, taxon, rows, fsync=self._fsync())
+                self.log_info(csv_msg)
+        if entry is not None and recorded:
+            self.journal.finish(entry)
+
+    def _add_to_catalogue(self, output_location, rows):
+        if self.catalogue is None:
+            return False
+        try:
+            self.catalogue.add_capture_set(output_location, rows)
+            return True
+        except Exception as e:
+            log.error(f"Error writing to the catalogue: {e}")
+            self.log_info(f"Catalogue update failed: {e}")
+            return False
+
+    def _queue_for_output(self, output_location, taxon, rows, write_csv=True):
+        """Hand a staged capture set to the mover, CSV rows included."""
+        csv_path = catalogue.csv_path(output_location, taxon)
+        try:
+            self.mover.enqueue([
+                {
+                    'src': row['write_path'],
+                    'dst': row['image_path'],
+                    'csv_path': csv_path,
+                    'csv_row': {c: row.get(c, '') for c in FileManager.CSV_HEADERS} if write_csv else None,
+                }
+                for row in rows
+            ] + [
+                {'src': write, 'dst': final}
+                for row in rows for final, write in row.get('derivatives', [])
+            ])
+            self.log_info(f"Queued {len(rows)} image(s) for {output_location}.")
+            return True
+        except Exception as e:
+            log.error(f"Error queueing staged files: {e}")
+            self.log_info(f"Could not queue the images for the output folder: {e} — "
+                          f"they are kept in {self.mover.staging_dir}.")
+            return False
 
     def create_output_folders(self):
         try:
+            if self._container_active():
+                return
+            if self._staging_active():
+                # The mover creates the output folders as files arrive
+                self._write_path(self.output_location_folder).mkdir(parents=True, exist_ok=True)
+                return
             created, msg = FileManager.create_folders(self.output_location_folder)
             if created:
                 self.log_info(msg)
         except Exception as e:
-            print(f"Error creating output folders: {e}")
+            log.error(f"Error creating output folders: {e}")
+
+    # ── Auto capture ───────────────────────────────────────────────────────────
+
+    def setup_autocapture(self):
+        """Add the *Auto capture* toggle and the specimens-per-hour readout
+        to the status bar (once) and apply the current settings."""
+        if not hasattr(self, 'autocapture_action'):
+            self.autocapture_action = QAction("Auto capture", self)
+            self.autocapture_action.setCheckable(True)
+            self.autocapture_action.setToolTip(
+                "Capture automatically when a new accession is read and the label views are still")
+            self.autocapture_action.toggled.connect(self.toggle_autocapture)
+            button = QToolButton()
+            button.setDefaultAction(self.autocapture_action)
+            self.throughput_label = QLabel()
+            self.statusBar().addPermanentWidget(self.throughput_label)
+            self.statusBar().addPermanentWidget(button)
+        if self.accession_trigger is None:
+            self.accession_trigger = autocapture.AccessionTrigger()
+        self.accession_trigger.stable_reads = max(1, int(self.autocapture_settings['stable_reads']))
+        self.autocapture_action.setChecked(bool(self.autocapture_settings['enabled']))
+        self.update_throughput_status()
+
+    def setup_calibration(self):
+        """Open the calibration store at the configured path."""
+        self.calibrations = calibration.CalibrationStore(self.calibration_settings['path'])
+        if self.calibrations.calibrations:
+            log.info(f"Lens calibrations loaded for: {', '.join(self.calibrations.calibrations)}")
+
+    def calibrate_slot(self, slot):
+        """Open the checkerboard calibration dialog for `slot`'s camera."""
+        CalibrationDialog(slot, self.calibrations, self).exec_()
+
+    def setup_colour(self):
+        """Open the colour profile store at the configured path."""
+        self.colour_profiles = colourprofile.ProfileStore(self.colour_settings['path'])
+        if self.colour_profiles.profiles:
+            log.info(f"Colour profiles loaded for: {', '.join(self.colour_profiles.profiles)}")
+
+    def profile_slot_colour(self, slot):
+        """Open the ColorChecker profiling dialog for `slot`'s camera, at the
+        bit depth the output format captures."""
+        fmt = encoders.OUTPUT_FORMATS[self.output_format] if ENCODERS_AVAILABLE else None
+        ColourProfileDialog(slot, self.colour_profiles, bool(fmt and fmt['high_bit']), self).exec_()
+
+    def setup_focus_stack(self):
+        """Add the *Focus stack* toggle to the status bar (once) and start
+        (or restart) the fusion pool with the current settings."""
+        if not hasattr(self, 'focus_stack_action'):
+            self.focus_stack_action = QAction("Focus stack", self)
+            self.focus_stack_action.setCheckable(True)
+            self.focus_stack_action.setToolTip(
+                "Capture a focus stack per camera and save the fused image")
+            self.focus_stack_action.toggled.connect(self.toggle_focus_stack)
+            button = QToolButton()
+            button.setDefaultAction(self.focus_stack_action)
+            self.statusBar().addPermanentWidget(button)
+        if self.stack_pool is not None:
+            self.stack_pool.shutdown(wait=True)
+        settings = self.focus_stack_settings
+        self.stack_pool = focusstack.StackPool(
+            settings['threads'], int(settings['tile']), int(settings['levels']))
+        self.focus_stack_action.setChecked(bool(settings['enabled']))
+
+    def toggle_focus_stack(self, on):
+        self.focus_stack_settings['enabled'] = on
+        if on:
+            how = ("stepping focus" if self.focus_stack_settings['focus_range']
+                   else "step the stage between frames")
+            self.log_info(f"Focus stacking on — {self.focus_stack_settings['frames']} "
+                          f"frames per camera ({how}).")
+        else:
+            self.log_info("Focus stacking off.")
+
+    def setup_multicode(self):
+        """Add the *Tray* toggle to the status bar (once) and start (or
+        restart) the code reading pool with the current settings."""
+        if not hasattr(self, 'multicode_action'):
+            self.multicode_action = QAction("Tray", self)
+            self.multicode_action.setCheckable(True)
+            self.multicode_action.setToolTip(
+                "Read every DataMatrix in each capture and save each specimen's label "
+                "as its own image")
+            self.multicode_action.toggled.connect(self.toggle_multicode)
+            button = QToolButton()
+            button.setDefaultAction(self.multicode_action)
+            self.statusBar().addPermanentWidget(button)
+        if self.multicode_pool is not None:
+            self.multicode_pool.shutdown(wait=True)
+        settings = self.multicode_settings
+        self.multicode_pool = multicode.DecodePool(
+            settings['threads'], settings['max_count'], settings['tile'], settings['overlap'],
+            settings['timeout_ms'], settings['context'], settings['min_label_area'])
+        self.multicode_action.setChecked(bool(settings['enabled']))
+
+    def toggle_multicode(self, on):
+        self.multicode_settings['enabled'] = on
+        if on:
+            self.log_info("Tray capture on — each DataMatrix read in a capture is saved "
+                          "as its own specimen.")
+        else:
+            self.log_info("Tray capture off.")
+
+    def toggle_autocapture(self, on):
+        self.autocapture_settings['enabled'] = on
+        if on:
+            # What is under the camera now was placed before auto capture
+            # was switched on — wait for the next specimen
+            accession = self.ui.lineEdit_accession.text()
+            if accession:
+                self.accession_trigger.captured(accession)
+            self.log_info("Auto capture on — place the next specimen.")
+        else:
+            self.log_info("Auto capture off.")
+
+    def _on_accession_read(self, text):
+        """Slot for every decoded accession: capture once it is stable,
+        new and the label views have stopped moving."""
+        if not self.autocapture_settings['enabled']:
+            return
+        try:
+            accession = self.accession_trigger.read(text)
+            if (accession is None or not self.ui.pushButton_capture.isEnabled()
+                    or self.ui.lineEdit_accession.text() != accession):
+                return
+            if not self._labels_settled():
+                log.debug(f"Auto capture: {accession} waiting for the label views to settle")
+                return
+            if self._already_imaged():
+                self.accession_trigger.captured(accession)
+                self.log_info(f"Auto capture: {accession} has already been imaged — "
+                              f"press Capture to image it again.")
+                return
+            # _do_capture() marks it captured once its rows are recorded, so
+            # a failed or discarded capture is triggered again
+            self._do_capture(auto=True)
+        except Exception as e:
+            log.error(f"Error in auto capture: {e}")
+            self.log_info(f"Auto capture failed: {e}")
+
+    def update_throughput_status(self):
+        t = self.throughput
+        if not t.total:
+            self.throughput_label.setText("")
+            return
+        rate = t.per_hour()
+        text = f"{t.total} specimen(s)"
+        if t.auto:
+            text += f" ({t.auto} auto)"
+        if rate:
+            text += f" — {rate:.0f}/h"
+        self.throughput_label.setText(text)
+
+    # ── Review pane ────────────────────────────────────────────────────────────
+
+    def setup_review(self):
+        """Dock the review pane, hidden until *Review* in the status bar is
+        clicked, and fill it when it is first shown."""
+        self._review_loaded = False
+        self.review_panel = review.ReviewPanel(self)
+        self.review_panel.refresh_requested.connect(self.load_review)
+        self.review_dock = QDockWidget("Review", self)
+        self.review_dock.setObjectName("review_dock")
+        self.review_dock.setWidget(self.review_panel)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.review_dock)
+        self.review_dock.hide()
+        self.review_dock.visibilityChanged.connect(
+            lambda visible: visible and not self._review_loaded and self.load_review())
+        review_button = QToolButton()
+        review_button.setDefaultAction(self.review_dock.toggleViewAction())
+        self.statusBar().addPermanentWidget(review_button)
+
+    def load_review(self):
+        """Show today's capture sets in the output folder: from the
+        catalogue, or without one from the current taxon's CSV."""
+        try:
+            if self.catalogue is not None:
+                rows = self.catalogue.captured_on(output_location=self.output_location)
+            else:
+                rows = self._csv_rows_today(self.ui.lineEdit_taxon.text())
+            self.review_panel.model.reset(review.group_sets(rows))
+            self._review_loaded = True
+        except Exception as e:
+            log.error(f"Error loading the review pane: {e}")
+            self.log_info(f"Could not list today's captures: {e}")
+
+    def _csv_rows_today(self, taxon):
+        path = catalogue.csv_path(self.output_location, taxon)
+        if not path.is_file():
+            return []
+        today = datetime.date.today().isoformat()
+        with open(path, newline='', encoding='utf-8') as f:
+            return [
+                dict(row, image_path=str(path.parent / row['accession_number'] / row['image_filename']))
+                for row in csv.DictReader(f) if row.get('date_captured', '').startswith(today)
+            ]
+
+    # ── Capture journal ────────────────────────────────────────────────────────
+
+    def _fsync(self):
+        return self.journal_settings['enabled'] and self.journal_settings['fsync']
+
+    def setup_journal(self):
+        """Open the capture journal and finish or roll back any capture set a
+        crash interrupted."""
+        try:
+            if ENCODERS_AVAILABLE:
+                self.encoder_pool.fsync = self._fsync()
+            if not self.journal_settings['enabled']:
+                self.journal = None
+                return
+            if self.journal is None:
+                self.journal = journal.CaptureJournal(fsync=self.journal_settings['fsync'])
+            self.journal.fsync = self.journal_settings['fsync']
+            self._recover_journal()
+        except Exception as e:
+            log.error(f"Error setting up capture journal: {e}")
+            self.log_info(f"Capture journal unavailable: {e}")
+            self.journal = None
+
+    def setup_derivatives(self):
+        """Start (or restart) the derivative pool if derivatives are enabled."""
+        if self.derivative_pool is not None:
+            self.derivative_pool.shutdown(wait=True)
+            self.derivative_pool = None
+        settings = self.derivative_settings
+        if settings['enabled'] and settings['sizes']:
+            self.derivative_pool = derivatives.DerivativePool(
+                settings['threads'], settings['quality'], fsync=self._fsync())
+            log.info("Derivatives: " + ", ".join(
+                f"{name} {edge}px" for name, edge in settings['sizes'].items()))
+
+    def setup_label_crops(self):
+        """Start (or restart) the label crop pool if label crops are enabled."""
+        if self.crop_pool is not None:
+            self.crop_pool.shutdown(wait=True)
+            self.crop_pool = None
+        settings = self.label_crop_settings
+        if settings['enabled']:
+            self.crop_pool = labelcrop.CropPool(
+                settings['threads'], settings['quality'], int(settings['max_labels']),
+                float(settings['min_area']), fsync=self._fsync())
+            log.info(f"Label crops: up to {settings['max_labels']} per image")
+
+    def setup_ocr(self):
+        """Start (or restart) the OCR worker processes if OCR is enabled and
+        Tesseract can be run."""
+        if self.ocr_pool is not None:
+            self.ocr_pool.shutdown(wait=True, cancel=True)
+            self.ocr_pool = None
+        settings = self.ocr_settings
+        if not settings['enabled']:
+            return
+        ok, engine = ocr.available()
+        if not ok:
+            self.log_info(f"OCR is enabled but {engine} — captures will not be read.")
+            return
+        self.ocr_pool = ocr.OcrPool(settings['processes'], settings['lang'], settings['psm'],
+                                    settings['cache'])
+        log.info(f"OCR: {engine}, {settings['lang']}, {settings['processes']} process(es)")
+
+    def _recover_journal(self):
+        for entry in self.journal.pending():
+            accession = entry.get('accession', '?')
+            if entry['state'] == 'begun':
+                removed = journal.CaptureJournal.roll_back(entry)
+                self.journal.finish(entry)
+                self.log_info(f"Capture of {accession} was interrupted before its images were "
+                              f"saved — rolled back ({len(removed)} file(s) removed). "
+                              f"Capture it again.")
+                continue
+            rows = entry['rows']
+            if self.mover is None and any(r['write_path'] != r['image_path'] for r in rows):
+                self.setup_staging(force=True)
+            self._record_capture_set(rows, entry, output_location=entry['output_location'])
+            self.log_info(f"Capture of {accession} was interrupted after its images were "
+                          f"saved — recorded {len(rows)} image(s).")
+
+    # ── Container output ───────────────────────────────────────────────────────
+
+    def _container_active(self):
+        return self.container_settings['enabled'] and ENCODERS_AVAILABLE
+
+    def open_container(self):
+        """Start a session container in the current output folder. Closed
+        chunks are handed to the mover when staging."""
+        self.close_container()
+        final_folder = Path(self.output_location) / container.CONTAINER_DIR
+
+        def on_chunk_closed(chunk, index):
+            log.info(f"Container chunk finished: {chunk}")
+            if self._staging_active():
+                self.mover.enqueue([
+                    {'src': chunk, 'dst': final_folder / chunk.name},
+                    {'src': index, 'dst': final_folder / index.name},
+                ])
+
+        self.container = container.SessionContainer(
+            self._write_path(final_folder),
+            chunk_mb=self.container_settings['chunk_mb'],
+            on_chunk_closed=on_chunk_closed,
+        )
+
+    def close_container(self):
+        if self.container is not None:
+            try:
+                self.container.close()
+            except Exception as e:
+                log.error(f"Error closing container: {e}")
+            self.container = None
+
+    # ── Staging ────────────────────────────────────────────────────────────────
+
+    def setup_staging(self, force=False):
+        """Start the mover if staging is enabled (or `force`) or a previous
+        session left files waiting, and show the backlog in the status bar."""
+        try:
+            if not hasattr(self, 'staging_label'):
+                self.staging_label = QLabel()
+                self.statusBar().addPermanentWidget(self.staging_label)
+                self._staging_timer = QtCore.QTimer(self)
+                self._staging_timer.timeout.connect(self.update_staging_status)
+                self._staging_timer.start(1000)
+            path = Path(self.staging_settings.get('path') or staging.STAGING_DIR).expanduser()
+            if self.mover is not None and self.mover.staging_dir != path:
+                self.mover.stop()
+                self.mover = None
+            if self.mover is None and (self.staging_settings['enabled'] or force
+                                       or staging.has_backlog(path)):
+                self.mover = staging.Mover(
+                    path,
+                    streams=self.staging_settings['streams'],
+                    retries=self.staging_settings['retries'],
+                    verify=self.staging_settings['verify'],
+                )
+                log.info(f"Staging folder: {path}")
+            self.update_staging_status()
+        except Exception as e:
+            log.error(f"Error setting up staging: {e}")
+            self.log_info(f"Staging unavailable ({e}) — saving straight to the output folder.")
+            self.mover = None
+
+    def _staging_active(self):
+        return self.mover is not None and self.staging_settings['enabled']
+
+    def _write_path(self, path):
+        """Where a file for the output folder is written: its staging path
+        while staging, else `path` itself."""
+        if self._staging_active():
+            return self.mover.staged_path(path, self.output_location)
+        return Path(path)
+
+    def update_staging_status(self):
+        if self.mover is None:
+            self.staging_label.setText("")
+            return
+        backlog = self.mover.backlog()
+        text = f"Staged: {backlog['files']} file(s), {backlog['bytes'] / 1e6:.1f} MB to move"
+        if backlog['failed']:
+            text += f" — {backlog['failed']} failed, see log"
+        elif not backlog['files']:
+            text = "Staged: all files moved" if self.staging_settings['enabled'] else ""
+        self.staging_label.setText(text)
+        self.staging_label.setStyleSheet("color: #d32f2f;" if backlog['failed'] else "")
 
     # ── File system & config ───────────────────────────────────────────────────
 
@@ -1737,23 +4422,24 @@ class UI(QMainWindow):
             if new_location:
                 self.output_location = new_location
                 self.log_info("Output location updated.")
+                self.close_container()
+                self._import_existing_csvs()
+                self._review_loaded = False
+                if self.review_dock.isVisible():
+                    self.load_review()
             self.update_output_location()
         except Exception as e:
-            print(f"Error setting output location: {e}")
+            log.error(f"Error setting output location: {e}")
 
     def update_output_location(self):
         try:
             self.ui.display_path.setText(self.output_location)
         except Exception as e:
-            print(f"Error updating output location: {e}")
+            log.error(f"Error updating output location: {e}")
 
     def log_info(self, info):
-        try:
-            now = datetime.datetime.now()
-            self.ui.listWidget_log.addItem(now.strftime("%H:%M:%S") + " " + info)
-            self.ui.listWidget_log.sortItems(QtCore.Qt.DescendingOrder)
-        except Exception as e:
-            print(f"Error logging info: {e}")
+        """Show `info` in the log panel (and the session log). Thread-safe."""
+        ui_log.info(info)
 
     def loadConfig(self):
         try:
@@ -1768,10 +4454,59 @@ class UI(QMainWindow):
                 self.ui.lineEdit_creator.setText(self.config["general"]["creator"])
                 self.ui.lineEdit_institution.setText(self.config["general"].get("institution", ""))
                 self.ui.lineEdit_taxon.setText(self.config["general"]["taxon_name"])
+                if ENCODERS_AVAILABLE:
+                    self._apply_output_settings(self.config.get("output"))
+                # Update in place — the slots share this dict
+                self.replay_settings.update(self.config.get("replay") or {})
+                # Takes effect for live views started from now on
+                self.acquisition_settings.update(self.config.get("acquisition") or {})
+                self.catalogue_settings.update(self.config.get("catalogue") or {})
+                self.open_catalogue()
+                self.staging_settings.update(self.config.get("staging") or {})
+                self.setup_staging()
+                self.journal_settings.update(self.config.get("journal") or {})
+                self.setup_journal()
+                self.derivative_settings.update(self.config.get("derivatives") or {})
+                self.setup_derivatives()
+                self.label_crop_settings.update(self.config.get("label_crops") or {})
+                self.setup_label_crops()
+                self.ocr_settings.update(self.config.get("ocr") or {})
+                self.setup_ocr()
+                # Update in place — the slots share this dict
+                self.stability_settings.update(self.config.get("stability") or {})
+                self.burst_settings.update(self.config.get("burst") or {})
+                self.calibration_settings.update(self.config.get("calibration") or {})
+                self.setup_calibration()
+                self.colour_settings.update(self.config.get("colour") or {})
+                self.setup_colour()
+                self.focus_stack_settings.update(self.config.get("focus_stack") or {})
+                self.setup_focus_stack()
+                self.multicode_settings.update(self.config.get("multicode") or {})
+                self.setup_multicode()
+                self.quality_settings.update(self.config.get("quality") or {})
+                self.autocapture_settings.update(self.config.get("autocapture") or {})
+                self.setup_autocapture()
+                # Captures from now on go to a new container, if enabled
+                self.container_settings.update(self.config.get("container") or {})
+                self.close_container()
+
+                # Restore per-camera ROIs keyed by serial / webcam name. Slots
+                # already showing one of these cameras pick it up now; others
+                # pick it up when the camera is selected.
+                for device_id, roi in (self.config.get("roi_profiles") or {}).items():
+                    if roi:
+                        self.roi_profiles[str(device_id)] = list(roi)
+                for settings in (self.config.get("camera_settings") or {}).values():
+                    device_id = settings.get("serial")
+                    if device_id and settings.get("roi"):
+                        self.roi_profiles[str(device_id)] = list(settings["roi"])
+                for slot in self.label_slots:
+                    slot.restore_roi()
+
                 self.loadedConfig = True
                 self.log_info("Loaded config file successfully!")
         except Exception as e:
-            print(f"Error loading config: {e}")
+            log.error(f"Error loading config: {e}")
             self.log_info(f"Error loading config file: {e}")
 
     def writeConfig(self):
@@ -1794,6 +4529,8 @@ class UI(QMainWindow):
                     'exposure_ms': slot.exposure_spinbox.value(),
                     'gain_level': slot.gain_spinbox.value(),
                     'gamma': slot.gamma_spinbox.value() / 100.0,
+                    'serial': slot.get_device_id(),
+                    'roi': list(slot.roi) if slot.roi else None,
                 }
 
             config = {
@@ -1805,13 +4542,46 @@ class UI(QMainWindow):
                     'num_label_cameras': len(self.label_slots),
                 },
                 'camera_settings': camera_settings,
+                # Every camera's ROI, including cameras not plugged in now
+                # and so in no slot
+                'roi_profiles': {device_id: list(roi)
+                                 for device_id, roi in self.roi_profiles.items()},
             }
+            if ENCODERS_AVAILABLE:
+                config['output'] = dict(self.encoder_settings, format=self.output_format)
+            config['replay'] = dict(self.replay_settings)
+            config['acquisition'] = dict(self.acquisition_settings)
+            config['catalogue'] = dict(self.catalogue_settings)
+            config['staging'] = dict(self.staging_settings)
+            config['container'] = dict(self.container_settings)
+            config['journal'] = dict(self.journal_settings)
+            config['derivatives'] = dict(self.derivative_settings)
+            config['label_crops'] = dict(self.label_crop_settings)
+            config['ocr'] = dict(self.ocr_settings)
+            config['stability'] = dict(self.stability_settings)
+            config['burst'] = dict(self.burst_settings)
+            config['calibration'] = dict(self.calibration_settings)
+            config['colour'] = dict(self.colour_settings)
+            config['focus_stack'] = dict(self.focus_stack_settings)
+            config['multicode'] = dict(self.multicode_settings)
+            config['quality'] = dict(self.quality_settings)
+            config['autocapture'] = dict(self.autocapture_settings)
             ymlRW.write_config_file(config, Path(self.output_location_folder))
             self.log_info("Exported config file successfully!")
         except Exception as e:
-            print(f"Error writing config: {e}")
+            log.error(f"Error writing config: {e}")
             self.log_info(f"Error saving config file: {e}")
 
+    def _apply_output_settings(self, output_config):
+        """Apply the config file's `output` section: format, encoder threads
+        and per-format encoder settings."""
+        settings = encoders.merge_settings(output_config)
+        if settings['threads'] != self.encoder_settings['threads']:
+            self.encoder_pool.shutdown(wait=True)
+            self.encoder_pool = encoders.EncoderPool(settings['threads'], fsync=self._fsync())
+        self.encoder_settings = settings
+        self.set_output_format(settings['format'])
+
     def get_default_values(self):
         return {
             'general': {
@@ -1843,13 +4613,51 @@ class UI(QMainWindow):
                 slot.cleanup()
 
             # Release barcode camera
+            if self.barcode_process:
+                self.barcode_process.close()
             if self.cap_barcode:
                 self.cap_barcode.release()
-
-            print("Application Closed!")
+            if self.barcode_recorder:
+                self.barcode_recorder.close()
+
+            if ENCODERS_AVAILABLE:
+                self.encoder_pool.shutdown(wait=True)
+            self.review_panel.model.shutdown()
+            if self.derivative_pool is not None:
+                self.derivative_pool.shutdown(wait=True)
+            if self.crop_pool is not None:
+                self.crop_pool.shutdown(wait=True)
+            if self.ocr_pool is not None:
+                # Images not started yet are left to `python -m scripts.ocr`
+                self.ocr_pool.shutdown(wait=True, cancel=True)
+            self.stack_pool.shutdown(wait=True)
+            self.multicode_pool.shutdown(wait=True)
+
+            self.close_container()
+
+            if self.catalogue is not None:
+                self._export_pending_csvs()
+                self.catalogue.close()
+
+            if self.mover is not None:
+                self._staging_timer.stop()
+                backlog = self.mover.backlog()
+                self.mover.stop()
+                if backlog['files'] or backlog['failed']:
+                    log.info(f"{backlog['files'] + backlog['failed']} staged file(s) "
+                             f"left to move at next start")
+
+            if self.throughput.total:
+                rate = self.throughput.session_per_hour()
+                log.info(f"Session: {self.throughput.total} specimen(s), "
+                         f"{self.throughput.auto} by auto capture"
+                         + (f", {rate:.0f} per hour" if rate else ""))
+
+            log.info("Application Closed!")
+            ui_log.removeHandler(self._panel_handler)
             event.accept()
         except Exception as e:
-            print(f"Error during close: {e}")
+            log.error(f"Error during close: {e}")
             event.accept()
 
 
@@ -1858,6 +4666,9 @@ class UI(QMainWindow):
 # ──────────────────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
+    # Camera worker processes of a frozen build re-launch this executable
+    import multiprocessing
+    multiprocessing.freeze_support()
     try:
         # Set the Windows AppUserModelID before creating QApplication so the
         # taskbar and Start Menu use the app's own icon rather than Python's.
@@ -1867,7 +4678,32 @@ if __name__ == "__main__":
                 "ManaakiWhenua.RAPIID.4"
             )
 
-        app = QApplication(sys.argv)
+        # Replay options; anything unrecognised is left for Qt
+        import argparse
+        parser = argparse.ArgumentParser(description="RAPIID specimen imaging")
+        parser.add_argument("--replay", action="append", default=[], metavar="PATH",
+                            help="play a recording, video or image folder as a label "
+                                 "camera (repeat for more cameras)")
+        parser.add_argument("--barcode-replay", metavar="PATH",
+                            help="play a recording, video or image folder as the barcode camera")
+        parser.add_argument("--replay-speed", choices=("real", "max"),
+                            help="replay at the recorded frame rate or as fast as possible")
+        parser.add_argument("--engine", choices=("threads", "processes"),
+                            help="run each camera on a thread (default) or in its own process")
+        parser.add_argument("--log-dir", metavar="PATH", default=str(applog.LOG_DIR),
+                            help=f"folder for session log files (default {applog.LOG_DIR})")
+        parser.add_argument("--debug", action="store_true",
+                            help="write debug messages to the log file")
+        args, qt_args = parser.parse_known_args()
+
+        log_listener = applog.setup_logging(
+            args.log_dir, logging.DEBUG if args.debug else logging.INFO)
+        log.info(f"RAPIID starting — log file {Path(args.log_dir) / applog.LOG_FILE}")
+        log.info(f"Optional features: config={YML_AVAILABLE} exif={EXIF_AVAILABLE} "
+                 f"encoders={ENCODERS_AVAILABLE} replay={REPLAY_AVAILABLE} "
+                 f"processes={MP_ENGINE_AVAILABLE} flir={FLIR_AVAILABLE}")
+
+        app = QApplication(sys.argv[:1] + qt_args)
 
         # Set the application icon early so the taskbar uses it from launch.
         # This must be set on the QApplication object, not just the window.
@@ -1889,13 +4725,17 @@ if __name__ == "__main__":
         app_font.setPointSize(10)
         app.setFont(app_font)
 
-        UIWindow = UI()
+        UIWindow = UI(replay_sources=args.replay,
+                      barcode_replay=args.barcode_replay,
+                      replay_speed=args.replay_speed,
+                      engine=args.engine)
         if QT_MATERIAL_AVAILABLE:
             apply_stylesheet(app, theme='light_blue.xml')
         else:
-            print("Using default Qt theme")
-        sys.exit(app.exec_())
+            log.info("Using default Qt theme")
+        exit_code = app.exec_()
+        log_listener.stop()
+        sys.exit(exit_code)
     except Exception as e:
-        print(f"Critical error starting application: {e}")
-        traceback.print_exc()
+        log.exception(f"Critical error starting application: {e}")
         sys.exit(1)
\ No newline at end of file
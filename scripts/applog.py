@@ -0,0 +1,138 @@
+"""Application logging: session log files and the in-app log panel.
+
+setup_logging() sends every record from the "rapiid" loggers through a
+QueueHandler, so the thread that logs never waits on the disk; a
+QueueListener thread writes them to a rotating log file (one per session)
+and, when there is a console, to stderr. The installed app is built with
+base="Win32GUI" and has no console, so the log file is where diagnostics
+end up.
+
+LogListModel backs the log panel: a capped deque, newest first, filled in
+batches by a timer so a burst of messages costs one view update. Messages
+reach it through PanelHandler on the "rapiid.ui" logger, from any thread.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from collections import deque
+from pathlib import Path
+
+from PyQt5 import QtCore
+
+LOG_DIR = Path.home() / ".rapiid" / "logs"
+LOG_FILE = "rapiid.log"
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(threadName)s %(name)s: %(message)s"
+MAX_LOG_BYTES = 5 * 1024 * 1024
+SESSION_BACKUPS = 10            # previous sessions kept as rapiid.log.1 … .10
+PANEL_MAX_ENTRIES = 2000
+
+
+def setup_logging(log_dir=LOG_DIR, level=logging.INFO):
+    """Start asynchronous logging for the "rapiid" logger tree.
+
+    Each call starts a new session file; the previous one is rolled over to
+    rapiid.log.1. Returns the QueueListener — call stop() at exit to flush.
+    """
+    log_dir = Path(log_dir)
+    handlers = []
+    try:
+        log_dir.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_dir / LOG_FILE, maxBytes=MAX_LOG_BYTES,
+            backupCount=SESSION_BACKUPS, encoding="utf-8", delay=True,
+        )
+        if (log_dir / LOG_FILE).exists() and (log_dir / LOG_FILE).stat().st_size:
+            file_handler.doRollover()
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(file_handler)
+    except OSError as e:
+        if sys.stderr is not None:
+            sys.stderr.write(f"Cannot write log files to {log_dir}: {e}\n")
+    if sys.stderr is not None:
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+        handlers.append(console)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    logger = logging.getLogger("rapiid")
+    logger.setLevel(level)
+    for handler in list(logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return listener
+
+
+class LogListModel(QtCore.QAbstractListModel):
+    """Newest-first list of log lines, capped at `max_entries`.
+
+    append() is thread-safe and O(1); queued lines are inserted by a timer
+    on the GUI thread every `flush_ms`, in one beginInsertRows() per batch.
+    """
+
+    def __init__(self, max_entries=PANEL_MAX_ENTRIES, flush_ms=100, parent=None):
+        super().__init__(parent)
+        self.max_entries = max_entries
+        self._rows = deque()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(flush_ms)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole):
+            return self._rows[index.row()]
+        return None
+
+    def append(self, text):
+        with self._lock:
+            self._pending.append(text)
+
+    def flush(self):
+        """Insert queued lines at the top, dropping the oldest over the cap."""
+        with self._lock:
+            batch, self._pending = self._pending[-self.max_entries:], []
+        if not batch:
+            return
+        overflow = len(self._rows) + len(batch) - self.max_entries
+        if overflow > 0:
+            first = len(self._rows) - overflow
+            self.beginRemoveRows(QtCore.QModelIndex(), first, len(self._rows) - 1)
+            for _ in range(overflow):
+                self._rows.pop()
+            self.endRemoveRows()
+        self.beginInsertRows(QtCore.QModelIndex(), 0, len(batch) - 1)
+        self._rows.extendleft(batch)    # extendleft reverses: newest ends up first
+        self.endInsertRows()
+
+    def lines(self):
+        """All lines currently held, newest first (flushes pending ones)."""
+        self.flush()
+        return list(self._rows)
+
+
+class PanelHandler(logging.Handler):
+    """Logging handler that shows records in a LogListModel as "HH:MM:SS text"."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.setFormatter(logging.Formatter("%(asctime)s %(message)s", datefmt="%H:%M:%S"))
+
+    def emit(self, record):
+        try:
+            self.model.append(self.format(record))
+        except Exception:
+            self.handleError(record)
@@ -0,0 +1,82 @@
+"""Hands-free capture: fire a capture when a new accession has been read.
+
+The barcode camera decodes a DataMatrix every few frames. AccessionTrigger
+watches those reads and reports an accession once it has been read
+`stable_reads` times in a row (a single misread never triggers) and has not
+been captured this session. The app then checks that the label views have
+settled (scripts.stability) and captures, so the operator only places
+specimens.
+
+Throughput counts the specimens of capture sets, manual or automatic (a
+tray set holds one per code read), and reports specimens per hour over the
+most recent sets, to compare the two ways of working.
+"""
+import time
+from collections import deque
+
+
+class AccessionTrigger:
+    """Decide when a stream of decoded accessions should trigger a capture."""
+
+    def __init__(self, stable_reads=3):
+        self.stable_reads = max(1, int(stable_reads))
+        self.current = None
+        self.count = 0
+        self.done = set()
+
+    def read(self, accession):
+        """Record a decoded read. Returns the accession to capture, or None
+        while it is not yet stable or has been captured already."""
+        if accession != self.current:
+            self.current = accession
+            self.count = 0
+        self.count += 1
+        if self.count >= self.stable_reads and accession not in self.done:
+            return accession
+        return None
+
+    def captured(self, accession):
+        """Never trigger `accession` again this session. Also used for an
+        accession that should be skipped, e.g. one already imaged."""
+        self.done.add(accession)
+
+    def reset(self):
+        self.current = None
+        self.count = 0
+        self.done.clear()
+
+
+class Throughput:
+    """Capture sets of this session and the specimens-per-hour rate."""
+
+    def __init__(self, window=20):
+        self.recent = deque(maxlen=max(2, window))   # (time, specimens)
+        self.total = 0
+        self.auto = 0
+        self.started = None
+        self._first = 0
+
+    def add(self, auto=False, specimens=1, now=None):
+        """Record a capture set of `specimens` specimens."""
+        now = time.monotonic() if now is None else now
+        if self.started is None:
+            self.started = now
+            self._first = specimens
+        self.recent.append((now, specimens))
+        self.total += specimens
+        self.auto += specimens if auto else 0
+
+    def per_hour(self):
+        """Specimens per hour over the last `window` sets, or None until
+        there are two. The oldest set only starts the clock."""
+        if len(self.recent) < 2:
+            return None
+        span = self.recent[-1][0] - self.recent[0][0]
+        count = sum(n for _, n in list(self.recent)[1:])
+        return count * 3600 / span if span > 0 else None
+
+    def session_per_hour(self):
+        if len(self.recent) < 2:
+            return None
+        span = self.recent[-1][0] - self.started
+        return (self.total - self._first) * 3600 / span if span > 0 else None
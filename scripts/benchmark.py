@@ -0,0 +1,477 @@
+"""Benchmark the frame pipeline stages and track the results over time.
+
+Times every hot stage of the app on synthetic label frames at 720p, 1080p,
+4K and Blackfly S resolution, and on recorded frames (see scripts.replay):
+
+  display          live view path: resize + flip + cvtColor + QImage + QPixmap
+  display_fullres  the old path (convert at full res, then scale the QImage),
+                   kept as a yardstick for the resize-first pipeline
+  decode_miss      UI.decode_datamatrix on a frame with no DataMatrix
+  decode_hit       UI.decode_datamatrix on a frame with one (synthetic frames
+                   need pylibdmtx's encoder; recorded frames report a hit rate)
+  multicode        every DataMatrix in a full-resolution frame, read in
+                   overlapping tiles on a thread pool (scripts.multicode)
+  debayer8         8-bit Bayer demosaic (edge-aware, as HQ_LINEAR is)
+  debayer16        12p unpack + 16-bit demosaic (scripts.highbit)
+  save_<fmt>       encode with EXIF embedded + write to disk, per format
+  csv_append       FileManager.create_or_update_csv
+  write_plain      write an encoded JPEG straight to its file
+  write_atomic     the same via scripts.journal.write_atomic, no fsync
+  write_fsync      write_atomic with fsync, as the capture journal does
+  journal          one capture journal entry: begin, written, finish
+  derivatives      thumbnail + web JPEGs from the frame (scripts.derivatives)
+  stability        live view motion check on the display frame (scripts.stability)
+  sharpness        burst frame sharpness score (scripts.sharpness)
+  calibration      lens and perspective correction of a capture frame with
+                   cached fixed-point maps (scripts.calibration)
+  preview_correct  the same on a live view tile, nearest-neighbour
+  label_crop       find the labels in a capture frame, crop and deskew them
+                   (scripts.labelcrop)
+  ocr_hash         greyscale conversion and hash of a capture frame, what
+                   an OCR cache hit costs (scripts.ocr)
+  colour           colour profile lookup tables and matrix on a capture
+                   frame (scripts.colourprofile)
+  focus_stack      fuse a 3-frame focus stack (scripts.focusstack)
+  quality          capture quality check: exposure and clipping (scripts.quality)
+
+The stages call the app's own functions, so a change to them shows up here.
+Each run is appended to a JSON Lines history file; `compare` diffs two runs
+and exits non-zero if any stage got slower than the threshold.
+
+    python -m scripts.benchmark run --sizes 1080p,bfs --replay rec/label_1
+    python -m scripts.benchmark list
+    python -m scripts.benchmark compare            # last two runs
+    python -m scripts.benchmark compare before after --threshold 15
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PyQt5 import QtGui
+from PyQt5.QtCore import Qt
+
+from rapiid import (DEFAULT_QUALITY_SETTINGS, ExifManager, FileManager, UI, dmtx,
+                    frame_to_display_rgb)
+from scripts import (calibration, colourprofile, derivatives, encoders, focusstack, highbit,
+                     journal, labelcrop, multicode, ocr, quality, replay, sharpness,
+                     stability)
+
+SIZES = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "bfs": (2448, 2048),     # FLIR Blackfly S 5 MP
+}
+STAGES = ("display", "display_fullres", "decode_miss", "decode_hit", "multicode",
+          "debayer8", "debayer16", "save_jpg", "save_png", "save_tiff",
+          "save_webp", "csv_append", "write_plain", "write_atomic", "write_fsync",
+          "journal", "derivatives", "stability", "sharpness",
+          "calibration", "preview_correct", "colour", "label_crop", "ocr_hash", "focus_stack", "quality")
+DEFAULT_HISTORY = Path.home() / ".rapiid" / "benchmark_history.jsonl"
+DEFAULT_DISPLAY = (960, 540)   # a label camera tile on a 1080p screen
+ACCESSION = "NZAC04012345"
+
+
+# ── Frames ─────────────────────────────────────────────────────────────────────
+
+def add_datamatrix(frame, text=ACCESSION):
+    """Return a copy of `frame` with a DataMatrix of `text` in the top-left,
+    or None if pylibdmtx cannot encode here."""
+    try:
+        encoded = dmtx.encode(text.encode("utf-8"))
+    except Exception:
+        return None
+    symbol = np.frombuffer(encoded.pixels, np.uint8).reshape(encoded.height, encoded.width, 3)
+    symbol = cv2.cvtColor(symbol, cv2.COLOR_RGB2BGR)
+    # Roughly the size of a code on a specimen label, relative to the frame
+    side = max(symbol.shape[0], frame.shape[1] // 8)
+    symbol = cv2.resize(symbol, (side, side), interpolation=cv2.INTER_NEAREST)
+    out = frame.copy()
+    out[20:20 + side, 20:20 + side] = symbol
+    return out
+
+
+def to_bayer(frame):
+    """Sample a BGR frame into an RGGB mosaic, as a Bayer sensor sees it."""
+    h, w = frame.shape[0] & ~1, frame.shape[1] & ~1
+    mosaic = np.empty((h, w), np.uint8)
+    mosaic[0::2, 0::2] = frame[0:h:2, 0:w:2, 2]   # R
+    mosaic[0::2, 1::2] = frame[0:h:2, 1:w:2, 1]   # G
+    mosaic[1::2, 0::2] = frame[1:h:2, 0:w:2, 1]   # G
+    mosaic[1::2, 1::2] = frame[1:h:2, 1:w:2, 0]   # B
+    return mosaic
+
+
+def pack_12p(mosaic16):
+    """Pack 12-bit samples as GenICam 12p, the inverse of highbit.unpack_12p."""
+    pairs = mosaic16.reshape(-1, 2)
+    packed = np.empty((pairs.shape[0], 3), np.uint8)
+    packed[:, 0] = pairs[:, 0] & 0xFF
+    packed[:, 1] = (pairs[:, 0] >> 8) | ((pairs[:, 1] & 0x0F) << 4)
+    packed[:, 2] = pairs[:, 1] >> 4
+    return packed.tobytes()
+
+
+def load_sources(sizes, replays, frame_count):
+    """Return {source name: [BGR frames]} for the synthetic sizes and replays."""
+    sources = {}
+    for name in sizes:
+        w, h = SIZES[name]
+        sources[name] = [encoders.synthetic_label_frame(w, h, seed=i) for i in range(frame_count)]
+    for path in replays:
+        cam = replay.ReplayCamera(path, speed="max", loop=False)
+        frames = []
+        ret, frame = cam.read()
+        while ret:
+            frames.append(frame)
+            ret, frame = cam.read()
+        cam.release()
+        if len(frames) > frame_count:
+            # Spread the sample over the whole recording
+            step = len(frames) / frame_count
+            frames = [frames[int(i * step)] for i in range(frame_count)]
+        sources["replay:" + cam.source.name] = frames
+    return sources
+
+
+# ── Stages ─────────────────────────────────────────────────────────────────────
+
+def _display(frame, size):
+    rgb = frame_to_display_rgb(frame, size[0], size[1], flip=True)
+    h, w, ch = rgb.shape
+    qimg = QtGui.QImage(rgb.data, w, h, ch * w, QtGui.QImage.Format_RGB888)
+    return QtGui.QPixmap.fromImage(qimg)
+
+
+def _display_fullres(frame, size):
+    rgb = np.ascontiguousarray(cv2.cvtColor(cv2.flip(frame, -1), cv2.COLOR_BGR2RGB))
+    h, w, ch = rgb.shape
+    qimg = QtGui.QImage(rgb.data, w, h, ch * w, QtGui.QImage.Format_RGB888)
+    return QtGui.QPixmap.fromImage(qimg.scaled(size[0], size[1], Qt.KeepAspectRatio,
+                                               Qt.SmoothTransformation))
+
+
+def build_stages(frames, display_size, workdir, is_replay):
+    """Return {stage: (callable(frame), inputs)} for one frame source.
+
+    Inputs are prepared here so only the stage itself is timed.
+    """
+    stages = {
+        "display": (lambda f: _display(f, display_size), frames),
+        "display_fullres": (lambda f: _display_fullres(f, display_size), frames),
+    }
+
+    frames_with_codes = frames
+    if is_replay:
+        # Recorded frames may or may not show a code — time them as they come
+        stages["decode_hit"] = (UI.decode_datamatrix, frames)
+    else:
+        stages["decode_miss"] = (UI.decode_datamatrix, frames)
+        coded = [add_datamatrix(f) for f in frames]
+        if all(c is not None for c in coded):
+            stages["decode_hit"] = (UI.decode_datamatrix, coded)
+            frames_with_codes = coded
+    stages["multicode"] = (multicode.decode, frames_with_codes)
+
+    mosaics = [to_bayer(f) for f in frames]
+    stages["debayer8"] = (lambda m: cv2.cvtColor(m, cv2.COLOR_BayerBG2BGR_EA), mosaics)
+    packed = [(pack_12p(m.astype(np.uint16) << 4), m.shape) for m in mosaics]
+    stages["debayer16"] = (lambda p: highbit.raw_to_image16(p[0], "BayerRG12p", p[1][1], p[1][0]),
+                           packed)
+
+    exif_bytes = ExifManager.get_exif_bytes("Benchmark", "Aenetus virescens", ACCESSION,
+                                            "Benchmark camera")
+    tiff_tags = ExifManager.get_tiff_tags("Benchmark", "Aenetus virescens", ACCESSION,
+                                          "Benchmark camera")
+    settings = encoders.merge_settings()
+    for fmt in ("jpg", "png", "tiff", "webp"):
+        path = Path(workdir) / f"bench{encoders.OUTPUT_FORMATS[fmt]['ext']}"
+
+        def save(frame, fmt=fmt, path=path):
+            data = encoders.encode(frame, fmt, settings, exif_bytes, tiff_tags)
+            with open(path, "wb") as f:
+                f.write(data)
+            return data
+        stages[f"save_{fmt}"] = (save, frames)
+
+    csv_data = ExifManager.get_csv_data("Benchmark", "bench", ACCESSION, ".jpg", "Benchmark camera")
+    stages["csv_append"] = (lambda _: FileManager.create_or_update_csv(workdir, "bench", csv_data),
+                            [None])
+
+    # What crash safety costs: the same encoded image written three ways
+    jpegs = [encoders.encode(f, "jpg", settings, exif_bytes, tiff_tags) for f in frames]
+    target = Path(workdir) / "write.jpg"
+
+    def write_plain(data):
+        with open(target, "wb") as f:
+            f.write(data)
+    stages["write_plain"] = (write_plain, jpegs)
+    stages["write_atomic"] = (lambda d: journal.write_atomic(target, d, fsync=False), jpegs)
+    stages["write_fsync"] = (lambda d: journal.write_atomic(target, d, fsync=True), jpegs)
+
+    capture_journal = journal.CaptureJournal(Path(workdir) / "journal")
+    files = [{"final": target, "write": target}]
+    row = dict(csv_data, image_path=str(target), write_path=str(target))
+
+    def journal_entry(_):
+        entry = capture_journal.begin(workdir, files, accession=ACCESSION)
+        capture_journal.written(entry, [row])
+        capture_journal.finish(entry)
+    stages["journal"] = (journal_entry, [None])
+
+    stages["derivatives"] = (
+        lambda f: [derivatives.encode_jpeg(img)
+                   for img in derivatives.pyramid(f, derivatives.DEFAULT_SIZES).values()],
+        frames)
+
+    detector = stability.StabilityDetector()
+    rgbs = [frame_to_display_rgb(f, display_size[0], display_size[1]) for f in frames]
+    stages["stability"] = (detector.update, rgbs)
+    stages["sharpness"] = (sharpness.score, frames)
+    # A moderate lens and a camera tilted by about 10 degrees
+    h, w = frames[0].shape[:2]
+    store = calibration.CalibrationStore(Path(workdir) / "calibration.json")
+    store.set("bench", {
+        'size': [w, h],
+        'camera_matrix': [[w, 0, w / 2], [0, w, h / 2], [0, 0, 1]],
+        'dist_coeffs': [-0.1, 0.02, 0, 0, 0],
+        'homography': [[1, 0.05, 0], [0, 1.1, 0], [0, 1.5e-4 * 2048 / h, 1]],
+    })
+    stages["calibration"] = (lambda f: store.correct("bench", f), frames)
+    stages["preview_correct"] = (
+        lambda small: store.preview("bench", small, (w, h)),
+        [cv2.resize(f, display_size, interpolation=cv2.INTER_LINEAR) for f in frames])
+    stages["label_crop"] = (
+        lambda f: [labelcrop.crop(f, rect) for rect in labelcrop.detect(f)], frames)
+    stages["ocr_hash"] = (lambda f: ocr.image_hash(ocr.to_grey(f)), frames)
+    # A camera with a slightly steep tone curve and a green cast
+    profiles = colourprofile.ProfileStore(Path(workdir) / "colour.json")
+    profiles.set("bench", colourprofile.fit(colourprofile.REFERENCE ** 1.1 * (0.9, 1.0, 0.85)))
+    stages["colour"] = (lambda f: profiles.correct("bench", f), frames)
+    # Sharp, defocused, sharp: the fusion costs the same whatever the content
+    stacks = [[f, cv2.GaussianBlur(f, (0, 0), 3), f] for f in frames]
+    stages["focus_stack"] = (focusstack.fuse, stacks)
+    stages["quality"] = (
+        lambda f: quality.check(quality.measure(f), DEFAULT_QUALITY_SETTINGS),
+        frames)
+    return stages
+
+
+def time_stage(fn, inputs, repeats):
+    """Call fn over `inputs` round-robin `repeats` times, after one warm-up.
+
+    Returns summary statistics in milliseconds, plus the hit rate when fn
+    returns decoded text.
+    """
+    results = [fn(x) for x in inputs]   # warm-up
+    times = []
+    for i in range(repeats):
+        x = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        fn(x)
+        times.append((time.perf_counter() - start) * 1000)
+    times = np.array(times)
+    stats = {
+        "median_ms": round(float(np.median(times)), 3),
+        "p95_ms": round(float(np.percentile(times, 95)), 3),
+        "mean_ms": round(float(times.mean()), 3),
+        "min_ms": round(float(times.min()), 3),
+        "n": repeats,
+    }
+    if fn is UI.decode_datamatrix:
+        stats["hit_rate"] = round(sum(r is not None for r in results) / len(results), 3)
+    return stats
+
+
+# ── History ────────────────────────────────────────────────────────────────────
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+        "turbojpeg": encoders.TURBOJPEG_AVAILABLE,
+        "tifffile": highbit.TIFFFILE_AVAILABLE,
+    }
+
+
+def load_history(path):
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path, run):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+
+
+def find_run(runs, ref):
+    """A run by id, by label (latest wins) or by index such as -1."""
+    for run in reversed(runs):
+        if ref in (run["id"], run.get("label")):
+            return run
+    try:
+        return runs[int(ref)]
+    except (ValueError, IndexError):
+        raise SystemExit(f"No benchmark run '{ref}' in the history")
+
+
+def compare_runs(base, new, threshold=10.0, min_ms=0.1):
+    """Compare median times. Returns rows of (key, base ms, new ms, change %,
+    flag) where flag is "REGRESSION", "faster" or ""."""
+    rows = []
+    for key in sorted(set(base["results"]) & set(new["results"])):
+        a = base["results"][key]["median_ms"]
+        b = new["results"][key]["median_ms"]
+        change = (b - a) / a * 100 if a else 0.0
+        flag = ""
+        # Ignore sub-`min_ms` differences — timer noise on the fastest stages
+        if abs(b - a) >= min_ms:
+            if change > threshold:
+                flag = "REGRESSION"
+            elif change < -threshold:
+                flag = "faster"
+        rows.append((key, a, b, change, flag))
+    return rows
+
+
+# ── CLI ────────────────────────────────────────────────────────────────────────
+
+def cmd_run(args):
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        raise SystemExit(f"Unknown size(s) {', '.join(unknown)}; choose from {', '.join(SIZES)}")
+    stages = set()
+    for name in (args.stages.split(",") if args.stages else STAGES):
+        stages |= {s for s in STAGES if s.startswith("save_")} if name == "save" else {name}
+    display_size = tuple(int(v) for v in args.display.lower().split("x"))
+
+    # QPixmap needs a GUI application; offscreen keeps this usable over SSH
+    app = QtGui.QGuiApplication.instance() or QtGui.QGuiApplication(
+        [sys.argv[0], "-platform", "offscreen"])
+
+    run = {
+        "id": datetime.datetime.now().strftime("%Y%m%d-%H%M%S"),
+        "label": args.label,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "display_size": list(display_size),
+        "results": {},
+    }
+    print(f"Run {run['id']}  OpenCV {cv2.__version__}, {os.cpu_count()} CPUs, "
+          f"display {display_size[0]}x{display_size[1]}, {args.repeats} repeats")
+    print(f"{'source / stage':<32}{'median':>9}{'p95':>9}{'min':>9}  ms")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for source, frames in load_sources(sizes, args.replay, args.frames).items():
+            for stage, (fn, inputs) in build_stages(frames, display_size, workdir,
+                                                    source.startswith("replay:")).items():
+                if stage not in stages:
+                    continue
+                stats = time_stage(fn, inputs, args.repeats)
+                key = f"{source}/{stage}"
+                run["results"][key] = stats
+                hits = f"  hit rate {stats['hit_rate']:.0%}" if "hit_rate" in stats else ""
+                print(f"{key:<32}{stats['median_ms']:9.2f}{stats['p95_ms']:9.2f}"
+                      f"{stats['min_ms']:9.2f}{hits}")
+
+    if not args.no_save:
+        append_history(args.history, run)
+        print(f"Saved to {args.history}")
+    app.quit()
+
+
+def cmd_list(args):
+    for i, run in enumerate(load_history(args.history)):
+        env = run.get("environment", {})
+        print(f"{i:>3}  {run['id']}  {run.get('label') or '':<16}{env.get('commit') or '':<10}"
+              f"{env.get('host', '')}  {len(run['results'])} results")
+
+
+def cmd_compare(args):
+    runs = load_history(args.history)
+    if len(runs) < 2 and not (args.base and args.new):
+        raise SystemExit("Need at least two runs in the history to compare")
+    base = find_run(runs, args.base or "-2")
+    new = find_run(runs, args.new or "-1")
+    print(f"base {base['id']} {base.get('label') or ''}  →  new {new['id']} {new.get('label') or ''}")
+    print(f"{'source / stage':<32}{'base':>9}{'new':>9}{'change':>9}")
+    regressions = 0
+    for key, a, b, change, flag in compare_runs(base, new, args.threshold, args.min_ms):
+        print(f"{key:<32}{a:9.2f}{b:9.2f}{change:+8.1f}%  {flag}")
+        regressions += flag == "REGRESSION"
+    if regressions:
+        print(f"{regressions} regression(s) over {args.threshold:g}%")
+        return 1
+    print("No regressions.")
+    return 0
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--history", default=DEFAULT_HISTORY,
+                        help=f"JSON Lines results file (default: {DEFAULT_HISTORY})")
+    parser = argparse.ArgumentParser(description="Benchmark the RAPIID frame pipeline.")
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", parents=[common],
+                              help="run the benchmarks and record the results")
+    run.add_argument("--sizes", default=",".join(SIZES),
+                     help=f"synthetic frame sizes, comma-separated, from {', '.join(SIZES)} "
+                          "(empty for replays only)")
+    run.add_argument("--replay", action="append", default=[], metavar="PATH",
+                     help="also benchmark a recording, video or image folder (repeatable)")
+    run.add_argument("--stages", help=f"comma-separated subset of: {', '.join(STAGES)} "
+                                      "(save selects every save_ stage)")
+    run.add_argument("--frames", type=int, default=3, help="distinct frames per source")
+    run.add_argument("--repeats", type=int, default=20, help="timed calls per stage")
+    run.add_argument("--display", default="x".join(map(str, DEFAULT_DISPLAY)),
+                     help="live view widget size, WxH")
+    run.add_argument("--label", help="name for this run, usable in compare")
+    run.add_argument("--no-save", action="store_true", help="do not add to the history")
+
+    commands.add_parser("list", parents=[common], help="list the recorded runs")
+
+    compare = commands.add_parser("compare", parents=[common],
+                                  help="compare two runs (default: the last two)")
+    compare.add_argument("base", nargs="?", help="run id, label or index (default: -2)")
+    compare.add_argument("new", nargs="?", help="run id, label or index (default: -1)")
+    compare.add_argument("--threshold", type=float, default=10.0,
+                         help="percent slowdown of the median that counts as a regression")
+    compare.add_argument("--min-ms", type=float, default=0.1,
+                         help="ignore differences smaller than this")
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # "run" is the default command
+    if not argv or argv[0] not in ("run", "list", "compare", "-h", "--help"):
+        argv.insert(0, "run")
+    args = parser.parse_args(argv)
+    return {"run": cmd_run, "list": cmd_list, "compare": cmd_compare}[args.command](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""Lens distortion and perspective correction for label cameras.
+
+Label cameras look down at an angle, so their images are keystoned as well
+as barrel-distorted. A camera is calibrated once from checkerboard views:
+
+  * views at several angles give the intrinsics (camera matrix and
+    distortion coefficients, cv2.calibrateCamera);
+  * the last view, with the board lying flat where the labels go, gives a
+    homography from the undistorted image to a square-on view of that
+    plane, scaled so the board keeps about the resolution it had.
+
+Calibrations are stored per device id (FLIR serial or webcam name) in
+~/.rapiid/calibration.json. Correcting a frame is one cv2.remap: the
+undistortion and the homography are folded into a single pair of
+fixed-point maps (CV_16SC2), built the first time a camera's frames of a
+given size are corrected and cached, so correcting a 5 MP frame costs
+about 50 ms (the benchmark's `calibration` stage), against seconds to
+build the maps. Maps for a live view tile are built the same way at
+display size, for a nearest-neighbour preview of about 4 ms
+(`preview_correct`).
+
+Frames cropped to an ROI are corrected with the ROI's offset, so the ROI
+can change after calibrating; the full frame must stay the size it was
+calibrated at.
+"""
+import json
+import math
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+CALIBRATION_PATH = Path.home() / ".rapiid" / "calibration.json"
+PATTERN = (9, 6)            # inner corners of the default checkerboard
+DETECT_EDGE = 1280          # corners are found on a copy this size, then refined
+MAX_GROWTH = 1.5           # most pixels a corrected frame has, relative to the frame
+MAX_CACHED_MAPS = 8         # a 5 MP frame's maps take about 30 MB
+
+
+def find_corners(frame, pattern=PATTERN):
+    """Inner corners of a checkerboard with `pattern` (columns, rows) inner
+    corners in `frame`, as an (n, 1, 2) float32 array in frame pixels, or
+    None if the board is not found."""
+    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    if grey.dtype != np.uint8:
+        grey = (grey >> 8).astype(np.uint8)
+    scale = min(1.0, DETECT_EDGE / max(grey.shape))
+    small = cv2.resize(grey, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) \
+        if scale < 1 else grey
+    found, corners = cv2.findChessboardCornersSB(small, tuple(pattern))
+    if not found:
+        return None
+    corners = (corners / scale).astype(np.float32)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+    return cv2.cornerSubPix(grey, corners, (11, 11), (-1, -1), criteria)
+
+
+def _orient(h, size):
+    """Turn homography `h` by a multiple of 90° (mirroring first if needed)
+    so the image's x axis still points roughly right in the output."""
+    centre = np.array([[[size[0] / 2, size[1] / 2], [size[0] / 2 + 1, size[1] / 2],
+                        [size[0] / 2, size[1] / 2 + 1]]], np.float64)
+    p = cv2.perspectiveTransform(centre, h)[0]
+    jacobian = np.column_stack([p[1] - p[0], p[2] - p[0]])
+    if np.linalg.det(jacobian) < 0:
+        h = np.diag([-1.0, 1.0, 1.0]) @ h
+        jacobian[0] *= -1
+    quarter = round(math.atan2(jacobian[1, 0], jacobian[0, 0]) / (math.pi / 2))
+    c, s = round(math.cos(-quarter * math.pi / 2)), round(math.sin(-quarter * math.pi / 2))
+    return np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]], np.float64) @ h
+
+
+def calibrate(views, size, pattern=PATTERN):
+    """Calibrate from checkerboard `views` (corner arrays from
+    find_corners(), the last one lying in the label plane) of full frames of
+    `size` (width, height). Returns a calibration dict (JSON-ready) with the
+    RMS reprojection error in pixels as 'error'. Raises ValueError if the
+    lens model does not hold up to the edges of the frame, which happens
+    when the views are too few or too alike."""
+    cols, rows = pattern
+    grid = np.zeros((cols * rows, 3), np.float32)
+    grid[:, :2] = np.mgrid[0:cols, 0:rows].T.reshape(-1, 2)
+    # k3 only helps wide-angle lenses and overfits easily
+    flags = cv2.CALIB_FIX_K3
+    if len(views) < 3:
+        # Too few views to separate everything — keep the model simple
+        flags |= (cv2.CALIB_ZERO_TANGENT_DIST | cv2.CALIB_FIX_PRINCIPAL_POINT |
+                  cv2.CALIB_FIX_ASPECT_RATIO)
+    error, matrix, dist, _, _ = cv2.calibrateCamera(
+        [grid] * len(views), list(views), tuple(size), None, None, flags=flags)
+
+    # The model must invert cleanly out to the frame edges, where there were
+    # no corners to fit
+    edge = _border(0, 0, size[0], size[1]).reshape(-1, 1, 2)
+    normalised = cv2.undistortPoints(edge, matrix, dist)
+    points = np.concatenate([normalised, np.ones((len(edge), 1, 1))], axis=2)
+    back, _ = cv2.projectPoints(points, np.zeros(3), np.zeros(3), matrix, dist)
+    if np.abs(back - edge).max() > 1.0:
+        raise ValueError("the lens model does not fit the edges of the frame — "
+                         "add views with the board at more angles and positions")
+
+    # Label plane: the last view, undistorted, onto a square grid with the
+    # board's mean corner spacing
+    plane = cv2.undistortPoints(views[-1], matrix, dist, P=matrix).reshape(-1, 2)
+    spacing = np.mean(np.linalg.norm(np.diff(plane.reshape(rows, cols, 2), axis=1), axis=2))
+    h, _ = cv2.findHomography(plane, grid[:, :2] * spacing)
+    h = _orient(h, size)
+    return {
+        'size': [int(size[0]), int(size[1])],
+        'camera_matrix': matrix.tolist(),
+        'dist_coeffs': dist.ravel().tolist(),
+        'homography': (h / h[2, 2]).tolist(),
+        'pattern': [cols, rows],
+        'views': len(views),
+        'error': float(error),
+    }
+
+
+def _border(x, y, w, h, steps=16):
+    """Points along the edge of a rectangle."""
+    t = np.linspace(0, 1, steps)
+    return np.concatenate([
+        np.column_stack([x + t * w, np.full(steps, y)]),
+        np.column_stack([x + t * w, np.full(steps, y + h)]),
+        np.column_stack([np.full(steps, x), y + t * h]),
+        np.column_stack([np.full(steps, x + w), y + t * h]),
+    ]).astype(np.float64)
+
+
+def build_maps(calibration, roi=None, out_size=None, src_scale=(1.0, 1.0)):
+    """Fixed-point remap tables correcting frames cropped to `roi` (x, y,
+    w, h) of the calibrated full frame, or full frames.
+
+    Returns (map1, map2, output size). The output is the corrected frame's
+    bounding box at the homography's scale, shrunk if needed to at most
+    MAX_GROWTH times the frame's pixels (a steep view stretches its far
+    side), or stretched to `out_size`.
+    `src_scale` (sx, sy) is the frames' scale relative to the ROI, for
+    display-size frames.
+    """
+    k = np.array(calibration['camera_matrix'], np.float64)
+    dist = np.array(calibration['dist_coeffs'], np.float64)
+    h = np.array(calibration['homography'], np.float64)
+    x, y = (roi[0], roi[1]) if roi else (0, 0)
+    w, hh = (roi[2], roi[3]) if roi else calibration['size']
+    offset = np.array([[1, 0, x], [0, 1, y], [0, 0, 1]], np.float64)
+    k_roi = np.linalg.inv(offset) @ k
+
+    # Where the frame's edges land, to size the output
+    edge = _border(x, y, w, hh).reshape(-1, 1, 2)
+    undistorted = cv2.undistortPoints(edge, k, dist, P=k)
+    warped = cv2.perspectiveTransform(undistorted, h).reshape(-1, 2)
+    x0, y0 = warped.min(axis=0)
+    x1, y1 = warped.max(axis=0)
+    box = (x1 - x0, y1 - y0)
+    shrink = min(1.0, math.sqrt(MAX_GROWTH * w * hh / (box[0] * box[1])))
+    size = tuple(out_size) if out_size else (max(1, int(math.ceil(box[0] * shrink))),
+                                             max(1, int(math.ceil(box[1] * shrink))))
+    fit = np.diag([size[0] / box[0], size[1] / box[1], 1.0])
+    shift = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], np.float64)
+
+    # initUndistortRectifyMap inverts newCameraMatrix @ R to go from output
+    # pixels to normalised camera coordinates, so the whole chain goes in R
+    rectify = fit @ shift @ h @ offset @ k_roi
+    k_src = np.diag([src_scale[0], src_scale[1], 1.0]) @ k_roi
+    map1, map2 = cv2.initUndistortRectifyMap(
+        k_src, dist, rectify, np.eye(3), size, cv2.CV_16SC2)
+    return map1, map2, size
+
+
+class CalibrationStore:
+    """Calibrations by device id, saved to a JSON file, and the remap
+    tables built from them, cached by device, frame size, ROI and output
+    size (the last MAX_CACHED_MAPS used). Safe to use from the live view
+    threads."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else CALIBRATION_PATH
+        self._maps = {}
+        self._lock = threading.Lock()
+        try:
+            self.calibrations = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.calibrations = {}
+
+    def get(self, device_id):
+        return self.calibrations.get(str(device_id)) if device_id else None
+
+    def set(self, device_id, calibration):
+        """Store (or with None remove) the calibration of `device_id`."""
+        with self._lock:
+            if calibration is None:
+                self.calibrations.pop(str(device_id), None)
+            else:
+                self.calibrations[str(device_id)] = calibration
+            self._maps = {key: maps for key, maps in self._maps.items()
+                          if key[0] != str(device_id)}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.calibrations, indent=1))
+
+    def maps(self, device_id, frame_size, roi=None, out_size=None):
+        """Cached build_maps() for a device's frames of `frame_size`, or None
+        if the device is not calibrated or the frames do not match its
+        calibration."""
+        calibration = self.get(device_id)
+        if calibration is None:
+            return None
+        full = tuple(calibration['size'])
+        region = tuple(roi) if roi else None
+        key = (str(device_id), tuple(frame_size), region, tuple(out_size) if out_size else None)
+        maps = self._maps.get(key)
+        if maps is None:
+            source = region[2:] if region else full
+            if region and (region[0] + region[2] > full[0] or region[1] + region[3] > full[1]):
+                return None
+            if out_size is None and tuple(frame_size) != source:
+                return None
+            scale = (frame_size[0] / source[0], frame_size[1] / source[1])
+            maps = build_maps(calibration, region, out_size, scale)
+            with self._lock:
+                while len(self._maps) >= MAX_CACHED_MAPS:
+                    del self._maps[next(iter(self._maps))]
+                self._maps[key] = maps
+        return maps
+
+    def preview(self, device_id, image, frame_size, roi=None):
+        """A live view tile `image`, resized from frames of `frame_size`,
+        corrected with nearest-neighbour sampling at its own size, or
+        `image` itself if the device is not calibrated."""
+        calibration = self.get(device_id)
+        if calibration is None:
+            return image
+        source = tuple(roi[2:]) if roi else tuple(calibration['size'])
+        if tuple(frame_size) != source:
+            return image
+        size = (image.shape[1], image.shape[0])
+        maps = self.maps(device_id, size, roi, out_size=size)
+        if maps is None:
+            return image
+        return cv2.remap(image, maps[0], maps[1], cv2.INTER_NEAREST)
+
+    def correct(self, device_id, frame, roi=None):
+        """`frame` corrected for its device, or `frame` itself if the device
+        is not calibrated."""
+        maps = self.maps(device_id, (frame.shape[1], frame.shape[0]), roi)
+        if maps is None:
+            return frame
+        return cv2.remap(frame, maps[0], maps[1], cv2.INTER_LINEAR)
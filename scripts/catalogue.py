@@ -0,0 +1,415 @@
+"""SQLite catalogue of every capture.
+
+The catalogue is the record of what has been imaged: one row per saved
+image, holding the same fields as the per-taxon CSV plus the image path and
+the output folder it was saved under. It lives on the local disk
+(~/.rapiid/catalogue.sqlite by default) in WAL mode, so lookups by
+accession, taxon, date or device stay fast at hundreds of thousands of rows
+and reading never blocks a capture being written.
+
+The per-taxon `<taxon>_captures.csv` files are generated from it — appended
+to once per capture set (a retaken image's row replaced), or rewritten in
+full by export_csv(). Catalogues
+started on an output folder with existing CSVs import them once, so
+duplicate checks cover captures made before the catalogue existed.
+
+Command line, from the repository root:
+
+    python -m scripts.catalogue find ACCESSION
+    python -m scripts.catalogue today [--day YYYY-MM-DD]
+    python -m scripts.catalogue export OUTPUT_FOLDER [--taxon NAME]
+    python -m scripts.catalogue import OUTPUT_FOLDER
+    python -m scripts.catalogue stats
+"""
+import argparse
+import csv
+import datetime
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+CATALOGUE_PATH = Path.home() / ".rapiid" / "catalogue.sqlite"
+
+# Column order of the per-taxon CSV files. New columns go at the end;
+# open_csv_append() upgrades CSVs written before they were added.
+CSV_COLUMNS = [
+    'image_filename', 'accession_number', 'taxon_name', 'image_format',
+    'copyright_type', 'rights_owner', 'creator', 'date_captured',
+    'capture_device', 'caption', 'title', 'sharpness',
+    'luminance', 'clipped_low', 'clipped_high', 'quality',
+    'source_image', 'source_region',
+]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS capture_sets (
+    id INTEGER PRIMARY KEY,
+    output_location TEXT NOT NULL,
+    created TEXT NOT NULL,
+    images INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    set_id INTEGER REFERENCES capture_sets(id),
+    output_location TEXT NOT NULL,
+    image_path TEXT NOT NULL UNIQUE,
+    bytes INTEGER,
+    {", ".join(f"{c} TEXT" for c in CSV_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS captures_accession ON captures(accession_number);
+CREATE INDEX IF NOT EXISTS captures_taxon ON captures(output_location, taxon_name);
+CREATE INDEX IF NOT EXISTS captures_date ON captures(date_captured);
+CREATE INDEX IF NOT EXISTS captures_device ON captures(capture_device);
+CREATE TABLE IF NOT EXISTS label_crops (
+    id INTEGER PRIMARY KEY,
+    output_location TEXT NOT NULL,
+    image_path TEXT NOT NULL,
+    crop_path TEXT NOT NULL UNIQUE,
+    x INTEGER, y INTEGER, w INTEGER, h INTEGER,
+    angle REAL
+);
+CREATE INDEX IF NOT EXISTS label_crops_image ON label_crops(image_path);
+CREATE TABLE IF NOT EXISTS imported_folders (
+    output_location TEXT PRIMARY KEY,
+    imported TEXT NOT NULL,
+    rows INTEGER NOT NULL
+);
+"""
+
+
+def csv_path(output_location, taxon):
+    """Where the CSV for `taxon` lives: <output>/<taxon>/<taxon>_captures.csv."""
+    return Path(output_location) / taxon / f"{taxon}_captures.csv"
+
+
+def open_csv_append(path):
+    """Open a per-taxon CSV to append rows (dicts) to. Returns (file,
+    csv.DictWriter); the caller closes the file.
+
+    A new file gets the CSV_COLUMNS header. A file written before columns
+    were added to CSV_COLUMNS is first rewritten with the current header,
+    the new columns left empty; a file with columns of its own is appended
+    to in its own layout.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = None
+    if path.exists():
+        with open(path, newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f), None)
+    if header and header != CSV_COLUMNS and set(header) < set(CSV_COLUMNS):
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        tmp.replace(path)
+        header = CSV_COLUMNS
+    f = open(path, 'a', newline='', encoding='utf-8')
+    writer = csv.DictWriter(f, fieldnames=header or CSV_COLUMNS, extrasaction='ignore')
+    if not header:
+        writer.writeheader()
+    return f, writer
+
+
+def replace_csv_rows(path, rows, fsync=False):
+    """Add `rows` to a per-taxon CSV, replacing any earlier row for the
+    same image (accession and file name) rather than adding a second one,
+    as the catalogue does. A CSV with no such row is only appended to."""
+    def image(row):
+        return row.get('accession_number'), row.get('image_filename')
+
+    path = Path(path)
+    new = {image(row) for row in rows}
+    header = None
+    retaken = False
+    if path.exists():
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            retaken = any(image(row) in new for row in reader)
+            header = reader.fieldnames
+    if not retaken:
+        f, writer = open_csv_append(path)
+        with f:
+            writer.writerows(rows)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        return
+    with open(path, newline='', encoding='utf-8') as f:
+        old = [row for row in csv.DictReader(f) if image(row) not in new]
+    if not header or set(header) < set(CSV_COLUMNS):
+        header = CSV_COLUMNS
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=header, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(old + list(rows))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    tmp.replace(path)
+
+
+def _key(output_location):
+    # One spelling per folder, whatever the user picked it as
+    return str(Path(output_location).resolve())
+
+
+def _path(image_path):
+    # Likewise one spelling per image, so a retake or an imported CSV row
+    # replaces the row of the same file
+    return str(Path(image_path).resolve())
+
+
+class Catalogue:
+    """Connection to the capture catalogue; safe to share between threads."""
+
+    def __init__(self, path=CATALOGUE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL only syncs at checkpoints: a power cut can lose the
+        # last transactions, never corrupt the database
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            # Catalogues made before a column was added to CSV_COLUMNS
+            existing = {r[1] for r in self._conn.execute("PRAGMA table_info(captures)")}
+            for column in CSV_COLUMNS:
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE captures ADD COLUMN {column} TEXT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add_capture_set(self, output_location, rows):
+        """Record the images of one capture set in a single transaction.
+
+        Each row holds the CSV_COLUMNS fields plus 'image_path' and
+        optionally 'bytes'. An image saved over an earlier one replaces its
+        row. Returns the set id.
+        """
+        key = _key(output_location)
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            set_id = self._conn.execute(
+                "INSERT INTO capture_sets (output_location, created, images) VALUES (?, ?, ?)",
+                (key, now, len(rows)),
+            ).lastrowid
+            self._insert(key, rows, set_id)
+        return set_id
+
+    def _insert(self, key, rows, set_id=None):
+        columns = ["set_id", "output_location", "image_path", "bytes"] + CSV_COLUMNS
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO captures ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            [(set_id, key, _path(row['image_path']), row.get('bytes'))
+             + tuple(row.get(c, '') for c in CSV_COLUMNS) for row in rows],
+        )
+
+    def update_metadata(self, output_location, rows):
+        """Overwrite the CSV_COLUMNS fields of existing captures with `rows`,
+        matched on taxon, accession and file name, in one transaction.
+        Fields missing from a row keep their value. Returns the number of
+        captures updated."""
+        key = _key(output_location)
+        columns = [c for c in CSV_COLUMNS
+                   if c not in ('image_filename', 'accession_number', 'taxon_name')]
+        sql = (f"UPDATE captures SET {', '.join(f'{c} = COALESCE(?, {c})' for c in columns)} "
+               "WHERE output_location = ? AND taxon_name = ? AND accession_number = ? "
+               "AND image_filename = ?")
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(sql, [
+                tuple(row.get(c) for c in columns)
+                + (key, row['taxon_name'], row['accession_number'], row['image_filename'])
+                for row in rows])
+            return cursor.rowcount
+
+    def set_label_crops(self, output_location, image_path, crops):
+        """Record the label crops of `image_path` (scripts.labelcrop), each
+        a dict with 'path', 'bbox' (x, y, w, h in the image) and 'angle',
+        replacing any it had."""
+        key = _key(output_location)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM label_crops WHERE image_path = ?", (_path(image_path),))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO label_crops "
+                "(output_location, image_path, crop_path, x, y, w, h, angle) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key, _path(image_path), str(c['path'])) + tuple(int(v) for v in c['bbox'])
+                 + (c['angle'],) for c in crops])
+
+    def label_crops(self, image_path):
+        """The label crops of `image_path` as dicts, largest first."""
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(
+                "SELECT * FROM label_crops WHERE image_path = ? ORDER BY id", (_path(image_path),))]
+
+    def find_accession(self, accession, output_location=None):
+        """Where `accession` has been imaged: a list of dicts with
+        output_location, taxon_name, images and last_captured."""
+        sql = ("SELECT output_location, taxon_name, COUNT(*) AS images, "
+               "MAX(date_captured) AS last_captured FROM captures "
+               "WHERE accession_number = ?")
+        params = [accession]
+        if output_location is not None:
+            sql += " AND output_location = ?"
+            params.append(_key(output_location))
+        sql += " GROUP BY output_location, taxon_name"
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def captured_on(self, day=None, output_location=None):
+        """Rows captured on `day` (a date, default today), oldest first."""
+        day = day or datetime.date.today()
+        sql = "SELECT * FROM captures WHERE date_captured >= ? AND date_captured < ?"
+        params = [day.isoformat(), (day + datetime.timedelta(days=1)).isoformat()]
+        if output_location is not None:
+            sql += " AND output_location = ?"
+            params.append(_key(output_location))
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql + " ORDER BY id", params)]
+
+    def iter_captures(self, output_location=None, order_by="id", batch=1000):
+        """Yield every capture row as a dict, `batch` at a time, from a
+        separate connection so a long export does not hold the lock."""
+        sql = "SELECT * FROM captures"
+        params = []
+        if output_location is not None:
+            sql += " WHERE output_location = ?"
+            params.append(_key(output_location))
+        conn = sqlite3.connect(str(self.path), timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(f"{sql} ORDER BY {order_by}", params)
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(row)
+        finally:
+            conn.close()
+
+    def taxa(self, output_location):
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                "SELECT DISTINCT taxon_name FROM captures WHERE output_location = ?",
+                (_key(output_location),))]
+
+    def stats(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT accession_number), "
+                "COUNT(DISTINCT taxon_name), MIN(date_captured), MAX(date_captured) "
+                "FROM captures").fetchone()
+        return dict(zip(("images", "accessions", "taxa", "first", "last"), row))
+
+    def export_csv(self, output_location, taxon, path=None):
+        """Rewrite the CSV for `taxon` from the catalogue. Returns (path, rows)."""
+        path = Path(path) if path else csv_path(output_location, taxon)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT {', '.join(CSV_COLUMNS)} FROM captures "
+                "WHERE output_location = ? AND taxon_name = ? ORDER BY id",
+                (_key(output_location), taxon))
+            count = 0
+            with open(tmp, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(CSV_COLUMNS)
+                for row in cursor:
+                    writer.writerow(row)
+                    count += 1
+        tmp.replace(path)
+        return path, count
+
+    def import_csvs(self, output_location):
+        """Import the existing <taxon>_captures.csv files under
+        `output_location`, once per folder. Returns the number of rows
+        imported, or None if the folder was imported before."""
+        key = _key(output_location)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM imported_folders WHERE output_location = ?",
+                                  (key,)).fetchone():
+                return None
+        rows = []
+        folders = sorted(Path(output_location).iterdir()) if Path(output_location).is_dir() else []
+        for taxon_folder in folders:
+            path = csv_path(output_location, taxon_folder.name)
+            if not taxon_folder.is_dir() or not path.is_file():
+                continue
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    accession = row.get('accession_number', '')
+                    # Where the app saved it, relative to the CSV's folder
+                    row['image_path'] = _path(path.parent / accession / row.get('image_filename', ''))
+                    rows.append(row)
+        with self._lock, self._conn:
+            # Rows the app has already recorded win over the CSV copies
+            existing = {r[0] for r in self._conn.execute(
+                "SELECT image_path FROM captures WHERE output_location = ?", (key,))}
+            self._insert(key, [r for r in rows if r['image_path'] not in existing])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO imported_folders VALUES (?, ?, ?)",
+                (key, datetime.datetime.now().isoformat(timespec="seconds"), len(rows)))
+        return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and export the RAPIID capture catalogue")
+    parser.add_argument("--db", default=str(CATALOGUE_PATH), help="catalogue file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("find", help="where an accession number has been imaged")
+    p.add_argument("accession")
+    p = sub.add_parser("today", help="images captured today (or on --day)")
+    p.add_argument("--day", type=datetime.date.fromisoformat)
+    p = sub.add_parser("export", help="rewrite the per-taxon CSV files of an output folder")
+    p.add_argument("output")
+    p.add_argument("--taxon", help="only this taxon")
+    p = sub.add_parser("import", help="import the CSV files of an output folder")
+    p.add_argument("output")
+    sub.add_parser("stats", help="catalogue totals")
+    args = parser.parse_args(argv)
+
+    cat = Catalogue(args.db)
+    try:
+        if args.command == "find":
+            found = cat.find_accession(args.accession)
+            for r in found:
+                print(f"{r['images']:4d} image(s)  {r['taxon_name']}  "
+                      f"last {r['last_captured']}  in {r['output_location']}")
+            if not found:
+                print(f"{args.accession} is not in the catalogue")
+        elif args.command == "today":
+            rows = cat.captured_on(args.day)
+            for r in rows:
+                print(f"{r['date_captured']}  {r['accession_number']:<16} {r['taxon_name']:<28} "
+                      f"{r['image_filename']}")
+            print(f"{len(rows)} image(s), "
+                  f"{len({r['accession_number'] for r in rows})} accession(s)")
+        elif args.command == "export":
+            for taxon in [args.taxon] if args.taxon else cat.taxa(args.output):
+                path, count = cat.export_csv(args.output, taxon)
+                print(f"{path}: {count} row(s)")
+        elif args.command == "import":
+            count = cat.import_csvs(args.output)
+            print("Already imported" if count is None else f"Imported {count} row(s)")
+        elif args.command == "stats":
+            for name, value in cat.stats().items():
+                print(f"{name:<12}{value}")
+    finally:
+        cat.close()
+
+
+if __name__ == '__main__':
+    main()
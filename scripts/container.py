@@ -0,0 +1,248 @@
+"""Session containers: a session's captures in a few large files.
+
+In container mode each capture is appended to an uncompressed ZIP in
+`<output>/_containers/` instead of being written as its own file in its own
+accession folder. A session writes one chunk at a time, rolling over to a
+new one at `chunk_mb`, so network shares and backup tools see a handful of
+large files rather than thousands of small ones.
+
+Each record is a ZIP member named with its normal relative path
+(`<taxon>/<accession>/<accession>_label.jpg`), stored as encoded. Its
+metadata (the CSV row) goes to an index beside the chunk,
+`<chunk>.index.jsonl`, written as each record is added, and the index is
+copied into the chunk as `index.jsonl` when it is closed. A closed chunk is
+a normal ZIP that any archive tool can open. A chunk left unclosed by a
+crash can still be exported from its index.
+
+    python -m scripts.container list CONTAINER_OR_FOLDER...
+    python -m scripts.container export CONTAINER_OR_FOLDER... --to OUTPUT_FOLDER
+
+export recreates the `<taxon>/<accession>/` layout and `<taxon>_captures.csv`
+files, streaming each image so memory use does not depend on chunk size.
+"""
+import argparse
+import datetime
+import io
+import json
+import struct
+import threading
+import time
+import warnings
+import zipfile
+import zlib
+from pathlib import Path
+
+from scripts import catalogue
+
+CONTAINER_DIR = "_containers"
+INDEX_SUFFIX = ".index.jsonl"
+INDEX_MEMBER = "index.jsonl"
+COPY_BYTES = 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct("<4s5H3I2H")   # ZIP local file header, 30 bytes
+
+# A retake appends a second record under the same name; export keeps the last
+warnings.filterwarnings("ignore", "Duplicate name", UserWarning, "zipfile")
+
+
+def index_path(chunk_path):
+    chunk_path = Path(chunk_path)
+    return chunk_path.with_name(chunk_path.name + INDEX_SUFFIX)
+
+
+class SessionContainer:
+    """Appends records to chunked ZIP files in `folder`; thread-safe.
+
+    `on_chunk_closed(chunk_path, index_path)` is called after each chunk is
+    finished, from the thread that closed it. Once close() has run, add()
+    raises ValueError rather than start a chunk nothing would finish.
+    """
+
+    def __init__(self, folder, chunk_mb=1024, prefix=None, on_chunk_closed=None):
+        self.folder = Path(folder)
+        self.chunk_bytes = int(chunk_mb * 1024 * 1024)
+        self.prefix = prefix or datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.on_chunk_closed = on_chunk_closed
+        self.records = 0
+        self.chunks = []
+        self.closed = False
+        self._lock = threading.Lock()
+        self._zip = None
+        self._index = None
+
+    def _open_chunk(self):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        path = self.folder / f"{self.prefix}_{len(self.chunks) + 1:03d}.zip"
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True)
+        self._index = open(index_path(path), "a", encoding="utf-8")
+        self.chunks.append(path)
+
+    def _close_chunk(self):
+        path = self.chunks[-1]
+        self._index.close()
+        self._zip.write(index_path(path), INDEX_MEMBER)
+        self._zip.close()
+        self._zip = self._index = None
+        if self.on_chunk_closed is not None:
+            self.on_chunk_closed(path, index_path(path))
+
+    def add(self, name, data, metadata=None):
+        """Append one record. `name` is its relative path, e.g.
+        "Taxon/ACC1/ACC1_label.jpg". Returns the chunk it was written to."""
+        with self._lock:
+            if self.closed:
+                raise ValueError(f"Container {self.folder / self.prefix} is closed")
+            if self._zip is not None and self._zip.fp.tell() >= self.chunk_bytes:
+                self._close_chunk()
+            if self._zip is None:
+                self._open_chunk()
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            self._zip.writestr(info, data)
+            self._zip.fp.flush()
+            self._index.write(json.dumps({
+                "name": name,
+                "offset": info.header_offset,
+                "size": info.file_size,
+                "crc": info.CRC,
+                "metadata": metadata or {},
+            }) + "\n")
+            self._index.flush()
+            self.records += 1
+            return self.chunks[-1]
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            if self._zip is not None:
+                self._close_chunk()
+
+
+# ── Reading and export ─────────────────────────────────────────────────────────
+
+def find_chunks(paths):
+    """Expand folders to the chunks inside them, oldest first."""
+    chunks = []
+    for path in map(Path, paths):
+        chunks.extend(sorted(path.glob("*.zip")) if path.is_dir() else [path])
+    return chunks
+
+
+def read_index(chunk_path):
+    """The index entries of a chunk: from the sidecar file if present, else
+    from the copy inside the (closed) chunk."""
+    sidecar = index_path(chunk_path)
+    if sidecar.exists():
+        text = sidecar.read_text(encoding="utf-8")
+    else:
+        with zipfile.ZipFile(chunk_path) as zf:
+            text = zf.read(INDEX_MEMBER).decode("utf-8")
+    entries = []
+    for line in text.splitlines():
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            break           # last line cut short by a crash
+    return entries
+
+
+def copy_record(f, entry, out):
+    """Stream one stored record from the open chunk `f` to `out`, checking
+    its CRC. Works without the ZIP central directory."""
+    f.seek(entry["offset"])
+    header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+    if header[0] != b"PK\x03\x04":
+        raise ValueError(f"bad record header for {entry['name']}")
+    f.seek(header[9] + header[10], io.SEEK_CUR)    # file name, extra field
+    remaining, crc = entry["size"], 0
+    while remaining:
+        chunk = f.read(min(COPY_BYTES, remaining))
+        if not chunk:
+            raise ValueError(f"{entry['name']} is truncated")
+        crc = zlib.crc32(chunk, crc)
+        out.write(chunk)
+        remaining -= len(chunk)
+    if crc != entry["crc"]:
+        raise ValueError(f"CRC mismatch for {entry['name']}")
+
+
+def export(paths, output_location, overwrite=False, progress=None):
+    """Explode containers into `output_location`. Returns (files, skipped).
+
+    Existing files are kept unless `overwrite`; a record repeated within the
+    export (a retake) replaces the earlier one. CSV rows are added to each
+    taxon's `<taxon>_captures.csv`, one per image: a retake's row replaces
+    the earlier row of that image, in the export and in the CSV.
+    """
+    output_location = Path(output_location)
+    written, skipped = set(), 0
+    rows = {}                   # taxon → {record name: CSV row}, last wins
+    for chunk in find_chunks(paths):
+        with open(chunk, "rb") as f:
+            for entry in read_index(chunk):
+                dest = output_location / entry["name"]
+                if dest.exists() and not overwrite and dest not in written:
+                    skipped += 1
+                    continue
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                part = dest.with_name(dest.name + ".part")
+                with open(part, "wb") as out:
+                    copy_record(f, entry, out)
+                part.replace(dest)
+                written.add(dest)
+
+                row = entry.get("metadata") or {}
+                taxon = row.get("taxon_name")
+                if taxon:
+                    rows.setdefault(taxon, {})[entry["name"]] = row
+                if progress:
+                    progress(entry["name"])
+    for taxon, taxon_rows in rows.items():
+        catalogue.replace_csv_rows(catalogue.csv_path(output_location, taxon),
+                                   list(taxon_rows.values()))
+    return len(written), skipped
+
+
+def find_records(folder, prefix):
+    """Index entries of the chunks in `folder` whose name starts with
+    `prefix` (e.g. "Taxon/ACC1/"), oldest first."""
+    folder = Path(folder)
+    if not folder.is_dir():
+        return []
+    found = []
+    for chunk in find_chunks([folder]):
+        try:
+            entries = read_index(chunk)
+        except (OSError, KeyError, zipfile.BadZipFile):
+            continue        # unclosed and its index sidecar gone
+        found.extend(entry for entry in entries if entry["name"].startswith(prefix))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or export RAPIID session containers")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("list", help="list the records in containers")
+    p.add_argument("paths", nargs="+", help="container files or folders of them")
+    p = sub.add_parser("export", help="write the records out as normal files")
+    p.add_argument("paths", nargs="+", help="container files or folders of them")
+    p.add_argument("--to", required=True, help="output folder")
+    p.add_argument("--overwrite", action="store_true", help="replace existing files")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for chunk in find_chunks(args.paths):
+            entries = read_index(chunk)
+            size = sum(e["size"] for e in entries)
+            print(f"{chunk}: {len(entries)} record(s), {size / 1e6:.1f} MB")
+            for e in entries:
+                print(f"  {e['name']}  {e['size']} bytes")
+    else:
+        files, skipped = export(args.paths, args.to, overwrite=args.overwrite)
+        print(f"Exported {files} file(s) to {args.to}"
+              + (f"; {skipped} already there (use --overwrite to replace)" if skipped else ""))
+
+
+if __name__ == '__main__':
+    main()
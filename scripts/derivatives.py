@@ -0,0 +1,170 @@
+"""Thumbnails and web-size JPEGs made at capture time.
+
+Review tools, web portals and apps all want small versions of each capture.
+Rather than have each of them decode the full-size master again, the app
+makes them from the frame it already holds in memory, on a background pool,
+while the master is being encoded.
+
+Sizes are given as {name: longest edge in pixels}. The frame is halved with
+cv2.pyrDown (a Gaussian blur and decimation in one fast pass) until the next
+halving would drop below the target, then resized to the exact size with
+INTER_LINEAR: at a scale between 1/2 and 1 that needs no further low-pass
+and costs a sixth of INTER_AREA, which is slow at fractional scales. Sizes
+are made largest first, each from the one before, so the full-resolution
+frame is only read once. 16-bit frames are reduced to 8 bits after
+downscaling.
+
+A derivative of `ACC1_label.jpg` is `ACC1_label_<name>.jpg`, written beside
+the master ("alongside") or under `<output>/_derivatives/` in the same
+layout ("sidecar").
+
+    python -m scripts.derivatives OUTPUT_FOLDER [--sizes thumb=256,web=1600]
+
+makes the missing derivatives of an existing output folder.
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from scripts.journal import write_atomic
+
+SIDECAR_DIR = "_derivatives"
+DEFAULT_SIZES = {"thumb": 256, "web": 1600}
+MASTER_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp"}
+CROP_NAME = re.compile(r"_crop\d+$")      # label crops (scripts.labelcrop)
+
+
+def derivative_path(master, name, output_location=None, location="alongside"):
+    """Path of derivative `name` of `master`."""
+    master = Path(master)
+    file_name = f"{master.stem}_{name}.jpg"
+    if location == "sidecar":
+        rel = master.parent.relative_to(output_location)
+        return Path(output_location) / SIDECAR_DIR / rel / file_name
+    return master.with_name(file_name)
+
+
+def pyramid(frame, sizes):
+    """Downscale `frame` to each {name: longest edge} in `sizes`. Returns
+    {name: 8-bit image}; a frame already smaller than a size is used as is."""
+    out = {}
+    current = frame
+    for name, edge in sorted(sizes.items(), key=lambda item: -item[1]):
+        while max(current.shape[:2]) >= 2 * edge:
+            current = cv2.pyrDown(current)
+        h, w = current.shape[:2]
+        scale = edge / max(h, w)
+        if scale < 1:
+            current = cv2.resize(current, (max(1, round(w * scale)), max(1, round(h * scale))),
+                                 interpolation=cv2.INTER_LINEAR)
+        out[name] = current if current.dtype == np.uint8 else (current >> 8).astype(np.uint8)
+    return out
+
+
+def encode_jpeg(image, quality=85):
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise IOError("JPEG encoding failed")
+    return buf.tobytes()
+
+
+class DerivativePool:
+    """Make derivatives on a small thread pool (OpenCV releases the GIL).
+
+    submit() returns a Future resolving to a dict with the paths written and
+    the time taken in milliseconds.
+    """
+
+    def __init__(self, threads=2, quality=85, fsync=False):
+        self.quality = quality
+        self.fsync = fsync
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(threads)),
+                                            thread_name_prefix="derivatives")
+
+    def submit(self, frame, targets, writer=None):
+        """Queue derivatives of `frame`. `targets` is {name: (path, longest
+        edge)}. The JPEGs are written to their paths, or handed to
+        `writer(data, path)` when one is given."""
+        return self._executor.submit(self._make, frame, targets, writer)
+
+    def _make(self, frame, targets, writer):
+        t0 = time.perf_counter()
+        images = pyramid(frame, {name: edge for name, (_, edge) in targets.items()})
+        paths = []
+        for name, image in images.items():
+            path = targets[name][0]
+            data = encode_jpeg(image, self.quality)
+            if writer is not None:
+                writer(data, path)
+            else:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(path, data, self.fsync)
+            paths.append(str(path))
+        return {"paths": paths, "ms": (time.perf_counter() - t0) * 1000}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def find_masters(output_location, names=DEFAULT_SIZES):
+    """Master images under `<taxon>/<accession>/`, skipping derivatives
+    (`names`, and label crops) and folders starting with "_" or "."."""
+    root = Path(output_location)
+    suffixes = tuple(f"_{name}" for name in names)
+    for taxon in sorted(p for p in root.iterdir() if p.is_dir() and p.name[0] not in "_."):
+        for path in sorted(taxon.glob("*/*")):
+            if (path.suffix.lower() in MASTER_EXTENSIONS and "_label" in path.stem
+                    and not path.stem.endswith(suffixes) and not CROP_NAME.search(path.stem)):
+                yield path
+
+
+def _parse_sizes(text):
+    sizes = {}
+    for part in text.split(","):
+        name, _, edge = part.partition("=")
+        sizes[name.strip()] = int(edge)
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Make missing derivatives of an output folder")
+    parser.add_argument("output", help="output folder")
+    parser.add_argument("--sizes", type=_parse_sizes, default=DEFAULT_SIZES,
+                        help="name=longest edge, comma-separated (default: thumb=256,web=1600)")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG quality")
+    parser.add_argument("--location", choices=("alongside", "sidecar"), default="alongside")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args(argv)
+
+    pool = DerivativePool(args.threads, args.quality)
+    futures = []
+    made = 0
+    started = time.monotonic()
+    for master in find_masters(args.output, args.sizes):
+        targets = {name: (derivative_path(master, name, args.output, args.location), edge)
+                   for name, edge in args.sizes.items()}
+        targets = {name: t for name, t in targets.items() if not t[0].exists()}
+        if not targets:
+            continue
+        frame = cv2.imread(str(master), cv2.IMREAD_UNCHANGED)
+        if frame is None:
+            print(f"Cannot read {master}")
+            continue
+        futures.append(pool.submit(frame, targets))
+        if len(futures) >= 4 * args.threads:
+            # Bounded queue: decoded masters are large
+            made += len(futures.pop(0).result()["paths"])
+    for future in futures:
+        made += len(future.result()["paths"])
+    pool.shutdown()
+    print(f"Made {made} derivative(s) in {time.monotonic() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""Export capture records as a Darwin Core Archive or JSON Lines.
+
+Streams every capture in the catalogue (or one output folder's captures)
+into Audubon Core multimedia records, one per image, linked to a Darwin
+Core occurrence per accession number:
+
+    python -m scripts.dwc_export captures.zip
+    python -m scripts.dwc_export captures.jsonl --format jsonl --output-folder /path/to/output
+    python -m scripts.dwc_export captures.zip --base-url https://images.example.org/rapiid/
+
+A Darwin Core Archive is a ZIP holding meta.xml, occurrence.txt (the core)
+and multimedia.txt (the Audubon Core extension), tab-separated. JSON Lines
+writes one object per image with the same terms.
+
+Pixel dimensions and SHA-256 checksums are computed on a process pool and
+kept in a cache (~/.rapiid/media_cache.sqlite) keyed on path, modification
+time and size, so a re-export only reads images that are new or changed.
+Records are read from the catalogue in batches, so memory use does not
+grow with the number of captures.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from xml.sax.saxutils import quoteattr
+
+from scripts import catalogue
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+CACHE_PATH = Path.home() / ".rapiid" / "media_cache.sqlite"
+CHUNK_BYTES = 1024 * 1024
+BATCH = 500
+BASIS_OF_RECORD = "PreservedSpecimen"
+
+log = logging.getLogger("rapiid.dwc_export")
+
+DWC = "http://rs.tdwg.org/dwc/terms/"
+AC = "http://rs.tdwg.org/ac/terms/"
+DCTERMS = "http://purl.org/dc/terms/"
+DC = "http://purl.org/dc/elements/1.1/"
+XMP = "http://ns.adobe.com/xap/1.0/"
+XMP_RIGHTS = "http://ns.adobe.com/xap/1.0/rights/"
+EXIF = "http://ns.adobe.com/exif/1.0/"
+
+# (column, term URI) of each file, in order. Multimedia values come from
+# multimedia_record().
+OCCURRENCE_TERMS = [
+    ("occurrenceID", DWC + "occurrenceID"),
+    ("catalogNumber", DWC + "catalogNumber"),
+    ("scientificName", DWC + "scientificName"),
+    ("basisOfRecord", DWC + "basisOfRecord"),
+]
+MULTIMEDIA_TERMS = [
+    ("coreid", None),
+    ("identifier", DCTERMS + "identifier"),
+    ("type", DCTERMS + "type"),
+    ("format", DCTERMS + "format"),
+    ("title", DCTERMS + "title"),
+    ("description", DCTERMS + "description"),
+    ("subjectPart", AC + "subjectPart"),
+    ("creator", DC + "creator"),
+    ("rightsHolder", XMP_RIGHTS + "Owner"),
+    ("rights", DCTERMS + "rights"),
+    ("CreateDate", XMP + "CreateDate"),
+    ("captureDevice", AC + "captureDevice"),
+    ("accessURI", AC + "accessURI"),
+    ("PixelXDimension", EXIF + "PixelXDimension"),
+    ("PixelYDimension", EXIF + "PixelYDimension"),
+    ("hashFunction", AC + "hashFunction"),
+    ("hashValue", AC + "hashValue"),
+]
+
+
+# ── Media information ─────────────────────────────────────────────────────────
+
+def media_info(path):
+    """(width, height, sha256 hex) of an image file. Runs in a worker
+    process. Dimensions are read from the header where possible."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            h.update(chunk)
+    width = height = None
+    try:
+        if not PIL_AVAILABLE:
+            raise ImportError
+        with Image.open(path) as img:
+            width, height = img.size
+    except Exception:
+        # 48-bit TIFFs, or no Pillow: decode it
+        import cv2
+        image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+        if image is not None:
+            height, width = image.shape[:2]
+    return width, height, h.hexdigest()
+
+
+def _media_info_or_none(path):
+    # One unreadable or truncated image must not end the export; it is
+    # counted as missing instead
+    try:
+        return media_info(path)
+    except Exception:
+        return None
+
+
+class MediaCache:
+    """Dimensions and checksums of image files, valid while the file's
+    modification time and size are unchanged."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS media (path TEXT PRIMARY KEY, mtime_ns INTEGER, "
+                "size INTEGER, width INTEGER, height INTEGER, sha256 TEXT)")
+
+    def lookup(self, paths):
+        """{path: (width, height, sha256)} for the paths whose entry is
+        current, and {path: (mtime_ns, size)} for those to (re)compute.
+        Missing files are in neither."""
+        found, todo = {}, {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            row = self._conn.execute(
+                "SELECT width, height, sha256 FROM media WHERE path = ? AND mtime_ns = ? "
+                "AND size = ?", (path, st.st_mtime_ns, st.st_size)).fetchone()
+            if row:
+                found[path] = row
+            else:
+                todo[path] = (st.st_mtime_ns, st.st_size)
+        return found, todo
+
+    def store(self, entries):
+        """entries: (path, mtime_ns, size, width, height, sha256)."""
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?)",
+                                   entries)
+
+    def close(self):
+        self._conn.close()
+
+
+def with_media(rows, cache, pool, stats):
+    """Yield (row, (width, height, sha256) or None) for `rows`, BATCH at a
+    time: cached entries are used as they are, the rest computed on `pool`."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            yield from _media_batch(batch, cache, pool, stats)
+            batch = []
+    if batch:
+        yield from _media_batch(batch, cache, pool, stats)
+
+
+def _media_batch(batch, cache, pool, stats):
+    found, todo = cache.lookup([row["image_path"] for row in batch])
+    cached = len(found)
+    if todo:
+        paths = list(todo)
+        results = list(pool.map(_media_info_or_none, paths, chunksize=8))
+        for p, info in zip(paths, results):
+            if info is None:
+                log.warning(f"Cannot read {p} — exported without dimensions or checksum")
+        done = [(p, info) for p, info in zip(paths, results) if info is not None]
+        cache.store([(p, *todo[p], *info) for p, info in done])
+        found.update(done)
+    stats["computed"] += len(found) - cached
+    stats["cached"] += cached
+    for row in batch:
+        info = found.get(row["image_path"])
+        if info is None:
+            stats["missing"] += 1
+        yield row, info
+
+
+# ── Records ────────────────────────────────────────────────────────────────────
+
+def occurrence_record(row):
+    return {
+        "occurrenceID": row["accession_number"],
+        "catalogNumber": row["accession_number"],
+        "scientificName": row["taxon_name"],
+        "basisOfRecord": BASIS_OF_RECORD,
+    }
+
+
+def access_uri(row, base_url=None):
+    """The image's path relative to its output folder, under `base_url` if
+    given, else as a file: URI."""
+    path = Path(row["image_path"])
+    if base_url:
+        try:
+            rel = path.resolve().relative_to(Path(row["output_location"]))
+        except ValueError:
+            rel = Path(row["taxon_name"], row["accession_number"], row["image_filename"])
+        return base_url.rstrip("/") + "/" + rel.as_posix()
+    return path.resolve().as_uri()
+
+
+def multimedia_record(row, info, base_url=None):
+    width, height, sha256 = info or (None, None, None)
+    date = (row.get("date_captured") or "").replace(" ", "T")
+    return {
+        "coreid": row["accession_number"],
+        "identifier": f"{row['accession_number']}/{row['image_filename']}",
+        "type": "StillImage",
+        "format": mimetypes.guess_type(row["image_filename"])[0] or "",
+        "title": row.get("title") or "",
+        "description": row.get("caption") or "",
+        "subjectPart": "label",
+        "creator": row.get("creator") or "",
+        "rightsHolder": row.get("rights_owner") or "",
+        "rights": row.get("copyright_type") or "",
+        "CreateDate": date,
+        "captureDevice": row.get("capture_device") or "",
+        "accessURI": access_uri(row, base_url),
+        "PixelXDimension": width or "",
+        "PixelYDimension": height or "",
+        "hashFunction": "SHA-256" if sha256 else "",
+        "hashValue": sha256 or "",
+    }
+
+
+# ── Writers ────────────────────────────────────────────────────────────────────
+
+def meta_xml():
+    def fields(terms):
+        return "\n".join(
+            f'    <field index="{i}" term={quoteattr(uri)}/>'
+            for i, (_, uri) in enumerate(terms) if uri)
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<archive xmlns="http://rs.tdwg.org/dwc/text/" metadata="">
+  <core encoding="UTF-8" fieldsTerminatedBy="\\t" linesTerminatedBy="\\n" fieldsEnclosedBy=""
+        ignoreHeaderLines="1" rowType="{DWC}Occurrence">
+    <files><location>occurrence.txt</location></files>
+    <id index="0"/>
+{fields(OCCURRENCE_TERMS)}
+  </core>
+  <extension encoding="UTF-8" fieldsTerminatedBy="\\t" linesTerminatedBy="\\n"
+             fieldsEnclosedBy="" ignoreHeaderLines="1" rowType="{AC}Multimedia">
+    <files><location>multimedia.txt</location></files>
+    <coreid index="0"/>
+{fields(MULTIMEDIA_TERMS)}
+  </extension>
+</archive>
+"""
+
+
+def _tsv(f):
+    # DwC-A text: no quoting, so tabs and newlines in values become spaces
+    class Writer:
+        def writerow(self, values):
+            f.write("\t".join(str(v).replace("\t", " ").replace("\n", " ")
+                              .replace("\r", " ") for v in values) + "\n")
+    return Writer()
+
+
+def write_dwca(records, path):
+    """Write (occurrence, multimedia) pairs to a DwC-A ZIP at `path`.
+    Occurrences must arrive grouped by occurrenceID."""
+    path = Path(path)
+    workdir = Path(tempfile.mkdtemp(prefix="dwca_", dir=path.parent))
+    try:
+        occurrences = multimedia = 0
+        last_id = None
+        with open(workdir / "occurrence.txt", "w", encoding="utf-8", newline="") as occ_f, \
+                open(workdir / "multimedia.txt", "w", encoding="utf-8", newline="") as mm_f:
+            occ, mm = _tsv(occ_f), _tsv(mm_f)
+            occ.writerow(name for name, _ in OCCURRENCE_TERMS)
+            mm.writerow(name for name, _ in MULTIMEDIA_TERMS)
+            for occurrence, media in records:
+                if occurrence["occurrenceID"] != last_id:
+                    occ.writerow(occurrence[name] for name, _ in OCCURRENCE_TERMS)
+                    last_id = occurrence["occurrenceID"]
+                    occurrences += 1
+                mm.writerow(media[name] for name, _ in MULTIMEDIA_TERMS)
+                multimedia += 1
+        (workdir / "meta.xml").write_text(meta_xml(), encoding="utf-8")
+        tmp = path.with_name(path.name + ".part")
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name in ("meta.xml", "occurrence.txt", "multimedia.txt"):
+                zf.write(workdir / name, name)
+        tmp.replace(path)
+        return occurrences, multimedia
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def write_jsonl(records, path):
+    """Write one JSON object per image: the multimedia terms plus the
+    occurrence under "occurrence"."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".part")
+    ids, multimedia = set(), 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for occurrence, media in records:
+            f.write(json.dumps(dict(media, occurrence=occurrence), ensure_ascii=False) + "\n")
+            ids.add(occurrence["occurrenceID"])
+            multimedia += 1
+    tmp.replace(path)
+    return len(ids), multimedia
+
+
+WRITERS = {"dwca": write_dwca, "jsonl": write_jsonl}
+
+
+def export(path, fmt="dwca", output_location=None, base_url=None, workers=None,
+           db=catalogue.CATALOGUE_PATH, cache_path=CACHE_PATH):
+    """Export the catalogue's captures (or those of `output_location`) to
+    `path`. Returns a dict of counts."""
+    cat = catalogue.Catalogue(db)
+    cache = MediaCache(cache_path)
+    stats = {"computed": 0, "cached": 0, "missing": 0}
+    try:
+        rows = cat.iter_captures(output_location, order_by="accession_number, id")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            records = ((occurrence_record(row), multimedia_record(row, info, base_url))
+                       for row, info in with_media(rows, cache, pool, stats))
+            stats["occurrences"], stats["images"] = WRITERS[fmt](records, path)
+    finally:
+        cache.close()
+        cat.close()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export capture records as a Darwin Core Archive or JSON Lines")
+    parser.add_argument("path", help="file to write (.zip for dwca, .jsonl for jsonl)")
+    parser.add_argument("--format", choices=sorted(WRITERS),
+                        help="default: from the file extension")
+    parser.add_argument("--output-folder", help="only the captures of this output folder")
+    parser.add_argument("--base-url", help="accessURI prefix for the images' relative paths "
+                                           "(default: file: URIs)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--db", default=str(catalogue.CATALOGUE_PATH), help="catalogue file")
+    parser.add_argument("--cache", default=str(CACHE_PATH), help="media cache file")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("jsonl" if args.path.endswith((".jsonl", ".json")) else "dwca")
+    if not Path(args.db).exists():
+        parser.error(f"no catalogue at {args.db}")
+    started = time.monotonic()
+    stats = export(args.path, fmt, args.output_folder, args.base_url, args.workers,
+                   args.db, args.cache)
+    print(f"Wrote {stats['images']} image record(s) for {stats['occurrences']} occurrence(s) "
+          f"to {args.path} in {time.monotonic() - started:.1f} s")
+    print(f"Checksums: {stats['computed']} computed, {stats['cached']} from the cache"
+          + (f", {stats['missing']} image(s) missing or unreadable" if stats["missing"] else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""Image encoders for saved captures.
+
+Every output format is encoded to bytes in memory with its metadata already
+embedded, so a capture is written to disk once — there is no second pass to
+add EXIF. Encoding runs on a thread pool: OpenCV and libjpeg-turbo release
+the GIL, so several cameras' images encode in parallel.
+
+Per-format settings come from the `output` section of the config file; any
+key left out falls back to DEFAULT_SETTINGS.
+
+Run `python -m scripts.encoders [image ...]` from the repository root to
+benchmark every format and setting on your own frames (or synthetic ones).
+"""
+import argparse
+import copy
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from scripts import highbit
+from scripts.journal import write_atomic
+
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420, TJSAMP_422, TJSAMP_444
+    _turbo = TurboJPEG()   # raises if the libjpeg-turbo library is missing
+    _TURBO_SUBSAMPLING = {"420": TJSAMP_420, "422": TJSAMP_422, "444": TJSAMP_444}
+    TURBOJPEG_AVAILABLE = True
+except Exception:
+    _turbo = None
+    TURBOJPEG_AVAILABLE = False
+
+# Output format key → display name, extension, codec and whether FLIR frames
+# are captured at the sensor's full bit depth.
+OUTPUT_FORMATS = {
+    "jpg": {"name": "JPEG (8-bit)", "ext": ".jpg", "codec": "jpeg", "high_bit": False},
+    "png": {"name": "PNG (8-bit)", "ext": ".png", "codec": "png", "high_bit": False},
+    "tiff": {"name": "TIFF (8-bit)", "ext": ".tif", "codec": "tiff", "high_bit": False},
+    "webp": {"name": "WebP", "ext": ".webp", "codec": "webp", "high_bit": False},
+    "tiff16": {"name": "TIFF (16-bit)", "ext": ".tif", "codec": "tiff", "high_bit": True},
+    "png16": {"name": "PNG (16-bit)", "ext": ".png", "codec": "png", "high_bit": True},
+}
+
+DEFAULT_SETTINGS = {
+    "format": "jpg",
+    "threads": 4,
+    # subsampling: 444 keeps full colour resolution (best for small label
+    # text), 420 is the smallest. fast selects libjpeg-turbo when installed.
+    "jpeg": {"quality": 95, "subsampling": "444", "fast": True},
+    "png": {"compression": 3},
+    # compression: none, lzw, deflate or packbits
+    "tiff": {"compression": "deflate"},
+    # quality above 100 selects lossless WebP
+    "webp": {"quality": 90},
+}
+
+
+def merge_settings(output_config=None):
+    """Overlay the config file's `output` section on DEFAULT_SETTINGS."""
+    settings = copy.deepcopy(DEFAULT_SETTINGS)
+    for key, value in (output_config or {}).items():
+        if isinstance(value, dict) and isinstance(settings.get(key), dict):
+            settings[key].update(value)
+        else:
+            settings[key] = value
+    return settings
+
+
+def insert_jpeg_exif(jpeg, exif_bytes):
+    """Return `jpeg` with `exif_bytes` (piexif.dump() output) as an APP1
+    segment after SOI, or after the JFIF APP0 segment that has to come
+    first when there is one. The compressed image data is not touched."""
+    if not exif_bytes.startswith(b"Exif\x00\x00"):
+        exif_bytes = b"Exif\x00\x00" + exif_bytes
+    at = 2
+    if jpeg[2:4] == b"\xff\xe0":
+        at += 2 + struct.unpack(">H", jpeg[4:6])[0]
+    app1 = b"\xff\xe1" + struct.pack(">H", len(exif_bytes) + 2) + exif_bytes
+    return jpeg[:at] + app1 + jpeg[at:]
+
+
+def insert_webp_exif(webp, exif_bytes, width, height):
+    """Return `webp` with an EXIF chunk, converting it to the extended
+    (VP8X) layout if needed. The compressed image data is not touched."""
+    if exif_bytes.startswith(b"Exif\x00\x00"):
+        exif_bytes = exif_bytes[6:]
+    body = webp[12:]
+    if body[:4] == b"VP8X":
+        flags = body[8] | 0x08
+        body = body[:8] + bytes([flags]) + body[9:]
+    else:
+        # Flags byte 0x08 = EXIF present; canvas size is stored minus one
+        vp8x = bytes([0x08, 0, 0, 0]) + (width - 1).to_bytes(3, "little") \
+            + (height - 1).to_bytes(3, "little")
+        body = b"VP8X" + struct.pack("<I", len(vp8x)) + vp8x + body
+    chunk = b"EXIF" + struct.pack("<I", len(exif_bytes)) + exif_bytes
+    if len(exif_bytes) % 2:
+        chunk += b"\x00"
+    body += chunk
+    return b"RIFF" + struct.pack("<I", len(body) + 4) + b"WEBP" + body
+
+
+def _encode_jpeg(frame, opts):
+    subsampling = str(opts.get("subsampling", "444"))
+    quality = int(opts.get("quality", 95))
+    if opts.get("fast", True) and TURBOJPEG_AVAILABLE and frame.ndim == 3:
+        return _turbo.encode(frame, quality=quality,
+                             jpeg_subsample=_TURBO_SUBSAMPLING.get(subsampling, TJSAMP_444))
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    # Sampling factor control needs OpenCV 4.7+; older builds always use 4:2:0
+    if hasattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR"):
+        factor = {"420": 0x221111, "422": 0x211111, "444": 0x111111}.get(subsampling)
+        if factor:
+            params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, factor]
+    ok, buf = cv2.imencode(".jpg", frame, params)
+    if not ok:
+        raise IOError("JPEG encoding failed")
+    return buf.tobytes()
+
+
+def encode(frame, fmt, settings=None, exif_bytes=None, tiff_tags=None):
+    """Encode `frame` as output format `fmt` and return the file bytes.
+
+    JPEG, PNG and WebP embed `exif_bytes`; TIFF embeds `tiff_tags` (see
+    highbit.encode_tiff). 16-bit frames are only valid for PNG and TIFF.
+    """
+    settings = settings or DEFAULT_SETTINGS
+    codec = OUTPUT_FORMATS[fmt]["codec"]
+    opts = settings.get(codec, {})
+    if frame.dtype != np.uint8 and codec not in ("png", "tiff"):
+        raise ValueError(f"{fmt} cannot store {frame.dtype} images")
+
+    if codec == "jpeg":
+        data = _encode_jpeg(frame, opts)
+        return insert_jpeg_exif(data, exif_bytes) if exif_bytes else data
+    if codec == "png":
+        return highbit.encode_png16(frame, exif_bytes, compression=opts.get("compression", 3))
+    if codec == "tiff":
+        return highbit.encode_tiff(frame, tiff_tags, compression=opts.get("compression", "deflate"))[0]
+    if codec == "webp":
+        ok, buf = cv2.imencode(".webp", frame, [cv2.IMWRITE_WEBP_QUALITY, int(opts.get("quality", 90))])
+        if not ok:
+            raise IOError("WebP encoding failed")
+        data = buf.tobytes()
+        if exif_bytes:
+            data = insert_webp_exif(data, exif_bytes, frame.shape[1], frame.shape[0])
+        return data
+    raise ValueError(f"Unknown output format: {fmt}")
+
+
+class EncoderPool:
+    """Encode and write captures on a small thread pool.
+
+    submit() returns a Future resolving to a dict with the written path,
+    size in bytes and encode/write/fsync times in milliseconds. Exceptions are
+    re-raised by Future.result().
+    """
+
+    def __init__(self, threads=4, fsync=False):
+        self.fsync = fsync      # flush each image to disk before it counts as saved
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(threads)),
+                                            thread_name_prefix="encoder")
+
+    def submit(self, frame, path, fmt, settings=None, exif_bytes=None, tiff_tags=None,
+               writer=None):
+        """Queue `frame` for encoding. The bytes are written to `path`, or
+        handed to `writer(data, path)` instead when one is given."""
+        return self._executor.submit(self._encode_and_write, frame, path, fmt,
+                                     settings, exif_bytes, tiff_tags, writer, self.fsync)
+
+    @staticmethod
+    def _encode_and_write(frame, path, fmt, settings, exif_bytes, tiff_tags, writer=None,
+                          fsync=False):
+        t0 = time.perf_counter()
+        data = encode(frame, fmt, settings, exif_bytes, tiff_tags)
+        t1 = time.perf_counter()
+        sync_s = 0.0
+        if writer is not None:
+            writer(data, path)
+        else:
+            # Renamed into place, so a crash never leaves half an image
+            sync_s = write_atomic(path, data, fsync)
+        t2 = time.perf_counter()
+        return {"path": str(path), "bytes": len(data),
+                "encode_ms": (t1 - t0) * 1000, "write_ms": (t2 - t1) * 1000,
+                "sync_ms": sync_s * 1000}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Benchmark
+# ──────────────────────────────────────────────────────────────────────────────
+
+BENCHMARK_CASES = [
+    ("jpg", {"jpeg": {"quality": 95, "subsampling": "444", "fast": True}}),
+    ("jpg", {"jpeg": {"quality": 95, "subsampling": "420", "fast": True}}),
+    ("jpg", {"jpeg": {"quality": 85, "subsampling": "420", "fast": True}}),
+    ("jpg", {"jpeg": {"quality": 95, "subsampling": "444", "fast": False}}),
+    ("png", {"png": {"compression": 1}}),
+    ("png", {"png": {"compression": 3}}),
+    ("png", {"png": {"compression": 6}}),
+    ("tiff", {"tiff": {"compression": "none"}}),
+    ("tiff", {"tiff": {"compression": "lzw"}}),
+    ("tiff", {"tiff": {"compression": "deflate"}}),
+    ("webp", {"webp": {"quality": 80}}),
+    ("webp", {"webp": {"quality": 90}}),
+    ("webp", {"webp": {"quality": 101}}),
+]
+
+
+def synthetic_label_frame(width, height, seed=0):
+    """A label-like test frame: smooth paper background, dark text blocks and
+    sensor noise. Pure noise would make every codec look unrealistically bad."""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), (214, 222, 228), dtype=np.uint8)
+    shade = cv2.resize(rng.integers(0, 30, (8, 8, 1), dtype=np.uint8), (width, height))
+    frame = cv2.subtract(frame, cv2.merge([shade, shade, shade]))
+    scale = width / 1280
+    for line in range(max(1, height // int(40 * scale))):
+        y = int((30 + line * 40) * scale)
+        cv2.putText(frame, "NZAC 04012345 Aenetus virescens  leg. J. Smith 1978",
+                    (int(20 * scale), y), cv2.FONT_HERSHEY_SIMPLEX, 0.9 * scale,
+                    (40, 40, 40), max(1, int(2 * scale)), cv2.LINE_AA)
+    noise = rng.normal(0, 3, frame.shape)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+
+def _describe(fmt, overrides):
+    opts = next(iter(overrides.values()))
+    return fmt + " " + " ".join(f"{k}={v}" for k, v in opts.items())
+
+
+def run_benchmark(frames, repeats=3, threads=4):
+    """Time every BENCHMARK_CASES entry on `frames`. Returns result dicts."""
+    results = []
+    raw_mb = sum(f.nbytes for f in frames) / 1e6
+    for fmt, overrides in BENCHMARK_CASES:
+        if fmt == "jpg" and overrides["jpeg"]["fast"] and not TURBOJPEG_AVAILABLE:
+            continue
+        settings = merge_settings(overrides)
+        out_bytes = sum(len(encode(f, fmt, settings)) for f in frames)   # warm-up + size
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for f in frames:
+                encode(f, fmt, settings)
+        serial_s = (time.perf_counter() - start) / repeats
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                list(pool.map(lambda f: encode(f, fmt, settings), frames))
+            parallel_s = (time.perf_counter() - start) / repeats
+
+        results.append({
+            "case": _describe(fmt, overrides),
+            "ms_per_frame": serial_s * 1000 / len(frames),
+            "mb_per_s": raw_mb / serial_s,
+            "parallel_mb_per_s": raw_mb / parallel_s,
+            "output_mb": out_bytes / 1e6 / len(frames),
+            "ratio": raw_mb * 1e6 / out_bytes,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RAPIID output encoders.")
+    parser.add_argument("images", nargs="*", help="frames to encode (default: synthetic)")
+    parser.add_argument("--size", default="2448x2048",
+                        help="synthetic frame size, WxH (default: Blackfly S 5 MP)")
+    parser.add_argument("--frames", type=int, default=4, help="synthetic frame count")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args(argv)
+
+    if args.images:
+        frames = [cv2.imread(p) for p in args.images]
+        missing = [p for p, f in zip(args.images, frames) if f is None]
+        if missing:
+            parser.error("could not read: " + ", ".join(missing))
+    else:
+        w, h = (int(v) for v in args.size.lower().split("x"))
+        frames = [synthetic_label_frame(w, h, seed=i) for i in range(args.frames)]
+
+    print(f"{len(frames)} frame(s), {frames[0].shape[1]}x{frames[0].shape[0]}, "
+          f"{args.threads} threads, libjpeg-turbo {'yes' if TURBOJPEG_AVAILABLE else 'no'}")
+    print(f"{'format / settings':<44}{'ms/frame':>9}{'MB/s':>8}{'MB/s ∥':>9}{'MB out':>8}{'ratio':>7}")
+    for r in run_benchmark(frames, args.repeats, args.threads):
+        print(f"{r['case']:<44}{r['ms_per_frame']:9.1f}{r['mb_per_s']:8.1f}"
+              f"{r['parallel_mb_per_s']:9.1f}{r['output_mb']:8.2f}{r['ratio']:7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,368 @@
+"""Rewrite the creator, rights owner or licence of an existing output tree.
+
+When an institution name, creator or licence changes, the images already
+captured still carry the old values in their EXIF, and so do their rows in
+the per-taxon `<taxon>_captures.csv` files and the catalogue. This tool
+walks an output folder and updates all three:
+
+- Only the Artist and Copyright tags change. JPEG and WebP get a new EXIF
+  segment, PNG a new eXIf chunk and TIFF its tags rewritten; the compressed
+  pixels are copied byte for byte, never decoded or re-encoded. Each file is
+  written to a temporary file and renamed into place (scripts.journal).
+- Files are processed on a process pool, so the walk runs at disk speed
+  rather than at the speed of one Python interpreter.
+- Finished files are listed in `<output>/.exif_rewrite.jsonl`, so an
+  interrupted run picks up where it stopped. A file that already carries the
+  new values is left alone, so re-running is always safe.
+- The CSV rows are updated to match, each CSV rewritten atomically, and the
+  catalogue rows of the folder updated in one transaction.
+
+    python -m scripts.exif_rewrite OUTPUT_FOLDER --institution "New name" --dry-run
+    python -m scripts.exif_rewrite OUTPUT_FOLDER --creator "A. Person" --licence "CC-BY 4.0"
+
+The copyright reads "<licence> <year> <rights owner>", as written by
+ExifManager; the year of each image is kept. Needs piexif (and tifffile for
+TIFF files).
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from scripts import catalogue, journal
+
+try:
+    import piexif
+    PIEXIF_AVAILABLE = True
+except ImportError:
+    PIEXIF_AVAILABLE = False
+
+try:
+    import tifffile
+    TIFFFILE_AVAILABLE = True
+except ImportError:
+    TIFFFILE_AVAILABLE = False
+
+PROGRESS_FILE = ".exif_rewrite.jsonl"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff"}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+_COPYRIGHT = re.compile(r"^(?P<licence>.*?) ?(?P<year>\d{4}) (?P<rights>.*)$")
+
+
+# ── Field changes ──────────────────────────────────────────────────────────────
+
+def new_copyright(old, changes, year=None):
+    """`old` ("<licence> <year> <rights>") with the licence and rights owner
+    in `changes` applied, or `old` itself if it does not parse and there is
+    no `year` to build a new one from."""
+    m = _COPYRIGHT.match(old or "")
+    if m:
+        licence, year, rights = m.group("licence"), m.group("year"), m.group("rights")
+    elif year and changes.get("licence") and changes.get("institution"):
+        licence = rights = ""
+    else:
+        return old
+    licence = changes.get("licence") or licence
+    rights = changes.get("institution") or rights
+    return f"{licence} {year} {rights}".strip()
+
+
+def update_row(row, changes):
+    """Apply `changes` to a CSV row in place. Returns True if it changed."""
+    before = dict(row)
+    if changes.get("creator"):
+        row["creator"] = changes["creator"]
+    if changes.get("institution"):
+        row["rights_owner"] = changes["institution"]
+    if changes.get("licence"):
+        # copyright_type is "<licence> <year>"
+        year = (row.get("copyright_type") or "").rpartition(" ")[2]
+        if not year.isdigit():
+            year = (row.get("date_captured") or "")[:4]
+        row["copyright_type"] = f"{changes['licence']} {year}".strip()
+    return row != before
+
+
+def _update_exif(exif, changes):
+    """Apply `changes` to a piexif dict. Returns True if it changed."""
+    ifd = exif.setdefault("0th", {})
+    old_artist = ifd.get(piexif.ImageIFD.Artist, b"").decode("utf-8", "replace")
+    old_copyright = ifd.get(piexif.ImageIFD.Copyright, b"").decode("utf-8", "replace")
+    date = ifd.get(piexif.ImageIFD.DateTime, b"").decode("ascii", "replace")
+    artist = changes.get("creator") or old_artist
+    copyright_ = new_copyright(old_copyright, changes, year=date[:4] if date[:4].isdigit() else None)
+    if (artist, copyright_) == (old_artist, old_copyright):
+        return False
+    ifd[piexif.ImageIFD.Artist] = artist.encode("utf-8")
+    ifd[piexif.ImageIFD.Copyright] = copyright_.encode("utf-8")
+    return True
+
+
+# ── Per-format rewrites ────────────────────────────────────────────────────────
+
+def _png_chunks(data):
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        length = int.from_bytes(data[pos:pos + 4], "big")
+        yield pos, data[pos + 4:pos + 8], data[pos + 8:pos + 8 + length], pos + 12 + length
+        pos += 12 + length
+
+
+def _rewrite_png(data, changes):
+    for start, kind, body, end in _png_chunks(data):
+        if kind == b"eXIf":
+            exif = piexif.load(body)
+            if not _update_exif(exif, changes):
+                return None
+            new = piexif.dump(exif)[6:]
+            chunk = (len(new).to_bytes(4, "big") + b"eXIf" + new
+                     + (zlib.crc32(b"eXIf" + new) & 0xFFFFFFFF).to_bytes(4, "big"))
+            return data[:start] + chunk + data[end:]
+        if kind == b"IDAT":
+            break
+    raise ValueError("no EXIF chunk")
+
+
+def _rewrite_jpeg_webp(data, changes):
+    exif = piexif.load(data)
+    if not exif.get("0th"):
+        raise ValueError("no EXIF block")
+    if not _update_exif(exif, changes):
+        return None
+    out = io.BytesIO()
+    piexif.insert(piexif.dump(exif), data, out)
+    return out.getvalue()
+
+
+def _rewrite_tiff(path, changes, dry_run, fsync):
+    if not TIFFFILE_AVAILABLE:
+        return "skipped", "TIFF needs tifffile"
+    with tifffile.TiffFile(path) as tif:
+        tags = tif.pages[0].tags
+        old_artist = tags["Artist"].value if "Artist" in tags else ""
+        old_copyright = tags["Copyright"].value if "Copyright" in tags else ""
+        date = tags["DateTime"].value if "DateTime" in tags else ""
+    if not (old_artist or old_copyright):
+        return "skipped", "no metadata tags"
+    artist = changes.get("creator") or old_artist
+    copyright_ = new_copyright(old_copyright, changes, year=date[:4] if date[:4].isdigit() else None)
+    if (artist, copyright_) == (old_artist, old_copyright):
+        return "unchanged", ""
+    if dry_run:
+        return "changed", ""
+    # Tags are overwritten on a copy; only the IFD entries and their values
+    # change, the strips are not touched
+    tmp = path.with_name(path.name + journal.TMP_SUFFIX)
+    shutil.copyfile(path, tmp)
+    try:
+        with tifffile.TiffFile(tmp, mode="r+b") as tif:
+            tags = tif.pages[0].tags
+            for name, value in (("Artist", artist), ("Copyright", copyright_)):
+                if name in tags:
+                    tags[name].overwrite(value)
+                elif value:
+                    raise ValueError(f"no {name} tag to overwrite")
+        if fsync:
+            with open(tmp, "rb+") as f:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink()
+        raise
+    return "changed", ""
+
+
+def rewrite_file(path, changes, dry_run=False, fsync=False):
+    """Rewrite one image's Artist/Copyright. Returns (status, message) with
+    status "changed", "unchanged", "skipped" or "error". Runs in a worker
+    process."""
+    path = Path(path)
+    try:
+        if path.suffix.lower() in (".tif", ".tiff"):
+            return _rewrite_tiff(path, changes, dry_run, fsync)
+        data = path.read_bytes()
+        if data.startswith(PNG_SIGNATURE):
+            new = _rewrite_png(data, changes)
+        elif data[:2] == b"\xff\xd8" or (data[:4] == b"RIFF" and data[8:12] == b"WEBP"):
+            new = _rewrite_jpeg_webp(data, changes)
+        else:
+            return "skipped", "unknown format"
+        if new is None:
+            return "unchanged", ""
+        if not dry_run:
+            journal.write_atomic(path, new, fsync)
+        return "changed", ""
+    except Exception as e:
+        return "error", str(e)
+
+
+def _rewrite_job(job):
+    rel, root, changes, dry_run, fsync = job
+    return (rel,) + rewrite_file(Path(root) / rel, changes, dry_run, fsync)
+
+
+# ── Walking the tree ───────────────────────────────────────────────────────────
+
+def find_images(output_location, taxa=None):
+    """Relative paths of the images under `output_location`, in
+    `<taxon>/<accession>/` folders. Folders starting with "_" or "."
+    (containers, recordings) are skipped."""
+    root = Path(output_location)
+    for taxon in sorted(os.scandir(root), key=lambda e: e.name):
+        if not taxon.is_dir() or taxon.name[0] in "_." or (taxa and taxon.name not in taxa):
+            continue
+        for accession in sorted(os.scandir(taxon.path), key=lambda e: e.name):
+            if not accession.is_dir():
+                continue
+            for entry in sorted(os.scandir(accession.path), key=lambda e: e.name):
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                    yield f"{taxon.name}/{accession.name}/{entry.name}"
+
+
+def _load_progress(path, changes):
+    """Paths already done by an earlier run with the same changes."""
+    try:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return set()
+    if not lines or json.loads(lines[0]).get("changes") != changes:
+        return set()
+    done = set()
+    for line in lines[1:]:
+        try:
+            done.add(json.loads(line)["path"])
+        except (ValueError, KeyError):
+            break       # last line cut short by a crash
+    return done
+
+
+def rewrite_csvs(output_location, changes, taxa=None, dry_run=False, fsync=False):
+    """Apply `changes` to the rows of every `<taxon>_captures.csv`. Returns
+    (updated rows, all rows)."""
+    root = Path(output_location)
+    updated_rows = []
+    total = 0
+    for taxon in sorted(p for p in root.iterdir() if p.is_dir()):
+        path = catalogue.csv_path(root, taxon.name)
+        if (taxa and taxon.name not in taxa) or not path.is_file():
+            continue
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fields = reader.fieldnames
+            rows = list(reader)
+        total += len(rows)
+        changed = [row for row in rows if update_row(row, changes)]
+        if not changed:
+            continue
+        updated_rows.extend(changed)
+        if dry_run:
+            continue
+        out = io.StringIO(newline="")
+        writer = csv.DictWriter(out, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+        journal.write_atomic(path, out.getvalue().encode("utf-8"), fsync)
+    return updated_rows, total
+
+
+def run(output_location, changes, workers=None, dry_run=False, fsync=False, taxa=None,
+        db=catalogue.CATALOGUE_PATH, progress=None):
+    """Rewrite images, CSVs and catalogue rows. Returns a dict of counts.
+
+    `progress(done, total, rel, status, message)` is called per image.
+    """
+    root = Path(output_location)
+    changes = {k: v for k, v in changes.items() if v}
+    progress_path = root / PROGRESS_FILE
+    done = set() if dry_run else _load_progress(progress_path, changes)
+    todo = [rel for rel in find_images(root, taxa) if rel not in done]
+    counts = {"changed": 0, "unchanged": 0, "skipped": 0, "error": 0, "resumed": len(done)}
+
+    log_file = None
+    if not dry_run:
+        # Rewritten rather than appended to, in case a crash cut its last line
+        log_file = open(progress_path, "w", encoding="utf-8")
+        log_file.write(json.dumps({"changes": changes}) + "\n")
+        log_file.writelines(json.dumps({"path": rel}) + "\n" for rel in sorted(done))
+    try:
+        jobs = ((rel, str(root), changes, dry_run, fsync) for rel in todo)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, (rel, status, message) in enumerate(
+                    pool.map(_rewrite_job, jobs, chunksize=32), 1):
+                counts[status] += 1
+                if log_file is not None and status != "error":
+                    log_file.write(json.dumps({"path": rel, "status": status}) + "\n")
+                if progress:
+                    progress(i, len(todo), rel, status, message)
+    finally:
+        if log_file is not None:
+            log_file.close()
+
+    rows, counts["csv_rows"] = rewrite_csvs(root, changes, taxa, dry_run, fsync)
+    counts["csv_updated"] = len(rows)
+    counts["catalogue_updated"] = 0
+    if rows and not dry_run and Path(db).exists():
+        cat = catalogue.Catalogue(db)
+        try:
+            counts["catalogue_updated"] = cat.update_metadata(root, rows)
+        finally:
+            cat.close()
+    if not dry_run and counts["error"] == 0:
+        progress_path.unlink()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rewrite the creator, rights owner or licence of captured images and CSVs")
+    parser.add_argument("output", help="output folder to rewrite")
+    parser.add_argument("--creator", help="new creator (EXIF Artist, CSV creator)")
+    parser.add_argument("--institution", help="new rights owner")
+    parser.add_argument("--licence", help='new licence, e.g. "CC-BY 4.0"')
+    parser.add_argument("--taxon", action="append", help="only this taxon folder (repeatable)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--fsync", action="store_true", help="flush each file to disk")
+    parser.add_argument("--db", default=str(catalogue.CATALOGUE_PATH), help="catalogue file")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list every changed file")
+    args = parser.parse_args(argv)
+
+    changes = {"creator": args.creator, "institution": args.institution, "licence": args.licence}
+    if not any(changes.values()):
+        parser.error("nothing to change: give --creator, --institution and/or --licence")
+    if not PIEXIF_AVAILABLE:
+        parser.error("piexif is not installed")
+
+    started = time.monotonic()
+
+    def report(i, total, rel, status, message):
+        if status == "error" or (args.verbose and status == "changed"):
+            print(f"{status:<9} {rel}  {message}".rstrip())
+        if i % 1000 == 0 or i == total:
+            rate = i / max(time.monotonic() - started, 1e-6)
+            print(f"{i}/{total} files, {rate:.0f}/s", file=sys.stderr)
+
+    counts = run(args.output, changes, workers=args.workers, dry_run=args.dry_run,
+                 fsync=args.fsync, taxa=args.taxon, db=args.db, progress=report)
+    verb = "Would change" if args.dry_run else "Changed"
+    print(f"{verb} {counts['changed']} image(s); {counts['unchanged']} already up to date, "
+          f"{counts['skipped']} skipped, {counts['error']} error(s)"
+          + (f", {counts['resumed']} done by an earlier run" if counts['resumed'] else ""))
+    print(f"{verb} {counts['csv_updated']} of {counts['csv_rows']} CSV row(s)"
+          + ("" if args.dry_run else f", {counts['catalogue_updated']} catalogue row(s)"))
+    if counts["error"]:
+        print("Run again to retry the files with errors.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Focus stacking: fuse frames focused at different depths into one image.
+
+A label on a pin sits at a different height from the specimen and from the
+labels below it, so one exposure rarely has them all sharp. grab() takes a
+stack of frames, either stepping a webcam's lens focus through a range
+(WebcamFocus, on cameras that support manual focus) or at intervals while
+the operator moves the stage. fuse() combines them.
+
+Fusion is Laplacian pyramid fusion: every frame is decomposed into a
+Laplacian pyramid, at each level each pixel takes the coefficient of the
+frame with the most local contrast there, the coarsest level is averaged,
+and the fused pyramid is collapsed. Contrast and selection are whole-array
+cv2/numpy operations, one per frame and level. The frame is fused in
+TILE-pixel tiles, each with a margin of overlap that is cropped afterwards,
+so a worker only holds the pyramids of one tile of each frame, and tiles run
+on a thread pool (cv2 and numpy release the GIL). The frames must be
+aligned: the camera is fixed, and focus or stage steps are small enough that
+nothing is registered.
+
+    python -m scripts.focusstack frame1.jpg frame2.jpg ... -o fused.tif
+
+fuses frames saved from elsewhere and reports the time taken.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+TILE = 512
+LEVELS = 5
+FOCUS_SETTLE_S = 0.3
+
+
+def _laplacian_pyramid(image, levels):
+    pyramid = []
+    current = image
+    for _ in range(levels):
+        down = cv2.pyrDown(current)
+        pyramid.append(current - cv2.pyrUp(down, dstsize=(current.shape[1], current.shape[0])))
+        current = down
+    pyramid.append(current)
+    return pyramid
+
+
+def _collapse(pyramid):
+    current = pyramid[-1]
+    for laplacian in reversed(pyramid[:-1]):
+        current = cv2.pyrUp(current, dstsize=(laplacian.shape[1], laplacian.shape[0])) + laplacian
+    return current
+
+
+def _contrast(laplacian):
+    """Local contrast of a pyramid level: absolute coefficients summed over
+    the channels and averaged over 5x5 pixels, so noise does not pick the
+    frame."""
+    energy = np.abs(laplacian)
+    if energy.ndim == 3:
+        energy = cv2.transform(energy, np.ones((1, energy.shape[2]), np.float32))
+    return cv2.boxFilter(energy, -1, (5, 5))
+
+
+def fuse_tile(tiles, levels=LEVELS):
+    """Fuse aligned `tiles` (same shape, any dtype) into one float32 image."""
+    levels = max(1, min(levels, int(np.log2(min(tiles[0].shape[:2])))))
+    pyramids = [_laplacian_pyramid(tile.astype(np.float32), levels) for tile in tiles]
+    fused = []
+    for level in range(levels):
+        # Keep each pixel's coefficient from the frame with the most
+        # contrast there, as a running maximum over the stack
+        out = pyramids[0][level].copy()
+        best = _contrast(out)
+        for pyramid in pyramids[1:]:
+            laplacian = pyramid[level]
+            contrast = _contrast(laplacian)
+            sharper = contrast > best
+            np.copyto(best, contrast, where=sharper)
+            np.copyto(out, laplacian, where=sharper[..., None] if out.ndim == 3 else sharper)
+        fused.append(out)
+    fused.append(np.mean([pyramid[-1] for pyramid in pyramids], axis=0))
+    return _collapse(fused)
+
+
+def fuse(frames, tile=TILE, levels=LEVELS, executor=None):
+    """Fuse aligned `frames` (8 or 16-bit, colour or mono, same shape) into
+    one frame of the same dtype. None entries are skipped; returns None if
+    there are no frames. Tiles are fused on `executor`, or on a pool of one
+    thread per core."""
+    frames = [frame for frame in frames if frame is not None]
+    if len(frames) < 2:
+        return frames[0] if frames else None
+    if any(frame.shape != frames[0].shape for frame in frames):
+        raise ValueError("focus stack frames differ in size")
+    h, w = frames[0].shape[:2]
+    # Tiles start on multiples of 2**levels, so every tile's pyramid lines
+    # up with the whole frame's; the margin covers the filters' reach
+    tile = max(1 << levels, tile >> levels << levels)
+    margin = 2 << levels
+    fused = np.empty_like(frames[0])
+    limit = np.iinfo(fused.dtype).max if fused.dtype.kind in "ui" else None
+
+    def fuse_one(y, x):
+        y0, x0 = max(0, y - margin), max(0, x - margin)
+        y1, x1 = min(h, y + tile + margin), min(w, x + tile + margin)
+        out = fuse_tile([frame[y0:y1, x0:x1] for frame in frames], levels)
+        out = out[y - y0:y - y0 + tile, x - x0:x - x0 + tile]
+        if limit is not None:
+            out = np.clip(out + 0.5, 0, limit)
+        fused[y:y + tile, x:x + tile] = out
+
+    origins = [(y, x) for y in range(0, h, tile) for x in range(0, w, tile)]
+    own = executor is None
+    if own:
+        executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2,
+                                      thread_name_prefix="focusstack")
+    try:
+        for future in [executor.submit(fuse_one, y, x) for y, x in origins]:
+            future.result()
+    finally:
+        if own:
+            executor.shutdown()
+    return fused
+
+
+class StackPool:
+    """Fuse stacks in the background.
+
+    submit() returns a Future resolving to a dict with the fused frame and
+    the time taken in milliseconds. Stacks are fused one at a time, each
+    across `threads` tile workers (0 = one per core).
+    """
+
+    def __init__(self, threads=0, tile=TILE, levels=LEVELS):
+        self.tile = tile
+        self.levels = levels
+        self._tiles = ThreadPoolExecutor(max_workers=int(threads) or os.cpu_count() or 2,
+                                         thread_name_prefix="focusstack")
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="focusstack-fuse")
+
+    def submit(self, frames):
+        return self._executor.submit(self._fuse, frames)
+
+    def _fuse(self, frames):
+        t0 = time.perf_counter()
+        frame = fuse(frames, self.tile, self.levels, self._tiles)
+        return {"frame": frame, "ms": (time.perf_counter() - t0) * 1000}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        self._tiles.shutdown(wait=wait)
+
+
+class WebcamFocus:
+    """Manual lens focus of a cv2.VideoCapture. `supported` is False when
+    the camera (or backend) has no focus control; restore() puts the focus
+    and autofocus back as they were."""
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.autofocus = cap.get(cv2.CAP_PROP_AUTOFOCUS)
+        self.focus = cap.get(cv2.CAP_PROP_FOCUS)
+        self.supported = bool(cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
+                              and cap.set(cv2.CAP_PROP_FOCUS, self.focus))
+
+    def set(self, value):
+        self.cap.set(cv2.CAP_PROP_FOCUS, float(value))
+
+    def restore(self):
+        self.cap.set(cv2.CAP_PROP_FOCUS, self.focus)
+        self.cap.set(cv2.CAP_PROP_AUTOFOCUS, self.autofocus)
+
+
+def grab(read, count, interval=0.0, focus=None, focus_range=None,
+         settle_s=FOCUS_SETTLE_S, wait=time.sleep):
+    """Grab a stack of `count` frames with read(), dropping None frames.
+
+    With a supported `focus` control and a `focus_range` (near, far) the
+    lens is stepped evenly through the range, allowing `settle_s` for it to
+    move before each frame. Otherwise frames are `interval` seconds apart,
+    for the operator to move the stage between them. `wait(seconds)` does
+    the waiting, so a GUI can keep its live views updating.
+    """
+    stepping = bool(focus is not None and focus.supported and focus_range)
+    steps = np.linspace(focus_range[0], focus_range[1], count) if stepping else [None] * count
+    frames = []
+    try:
+        for i, step in enumerate(steps):
+            if stepping:
+                focus.set(step)
+                wait(settle_s)
+            elif i and interval:
+                wait(interval)
+            frame = read()
+            if frame is not None:
+                frames.append(frame)
+    finally:
+        if focus is not None:
+            focus.restore()
+    return frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuse a focus stack")
+    parser.add_argument("frames", nargs="+", help="aligned frames, any order")
+    parser.add_argument("-o", "--output", required=True, help="fused image")
+    parser.add_argument("--tile", type=int, default=TILE)
+    parser.add_argument("--levels", type=int, default=LEVELS)
+    args = parser.parse_args(argv)
+
+    frames = [cv2.imread(path, cv2.IMREAD_UNCHANGED) for path in args.frames]
+    missing = [path for path, frame in zip(args.frames, frames) if frame is None]
+    if missing:
+        parser.error(f"cannot read {', '.join(missing)}")
+    t0 = time.perf_counter()
+    fused = fuse(frames, args.tile, args.levels)
+    ms = (time.perf_counter() - t0) * 1000
+    cv2.imwrite(args.output, fused)
+    print(f"Fused {len(frames)} frames of {fused.shape[1]}x{fused.shape[0]} in {ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""High-bit-depth capture helpers.
+
+Unpacks the GenICam packed pixel formats (Mono/Bayer 10p and 12p) with
+vectorized numpy, demosaics to 16-bit and encodes compressed TIFF or PNG
+with the capture metadata embedded. The encoders accept 8-bit frames too,
+and scripts.encoders uses them for every TIFF and PNG it writes.
+
+Run `python -m scripts.highbit` from the repository root to benchmark unpack,
+demosaic and encode throughput on synthetic Blackfly S sized frames.
+"""
+import io
+import struct
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+try:
+    import tifffile
+    TIFFFILE_AVAILABLE = True
+except ImportError:
+    TIFFFILE_AVAILABLE = False
+
+# PySpin pixel formats to try for a high-bit-depth capture, best first.
+# Packed formats halve the USB bandwidth of their 16-bit equivalents.
+HIGH_BIT_PIXEL_FORMATS = (
+    "BayerRG12p", "BayerRG16", "Mono12p", "Mono16",
+)
+
+# GenICam names a Bayer pattern by its first two pixels; OpenCV names it by
+# the second row. The codes below map a GenICam pattern to the OpenCV code
+# that reproduces it.
+_BAYER_TO_BGR = {
+    "BayerRG": cv2.COLOR_BayerBG2BGR_EA,
+    "BayerBG": cv2.COLOR_BayerRG2BGR_EA,
+    "BayerGR": cv2.COLOR_BayerGB2BGR_EA,
+    "BayerGB": cv2.COLOR_BayerGR2BGR_EA,
+}
+
+# TIFF compression names → OpenCV IMWRITE_TIFF_COMPRESSION codes, for the
+# fallback path when tifffile is not installed
+_CV2_TIFF_COMPRESSION = {None: 1, "none": 1, "lzw": 5, "zlib": 8, "deflate": 8, "packbits": 32773}
+
+
+def unpack_12p(raw, width, height):
+    """Unpack GenICam 12p (two pixels in three bytes, LSB first) to uint16."""
+    data = np.frombuffer(raw, dtype=np.uint8, count=width * height * 3 // 2)
+    data = data.reshape(-1, 3).astype(np.uint16)
+    out = np.empty((data.shape[0], 2), dtype=np.uint16)
+    out[:, 0] = data[:, 0] | ((data[:, 1] & 0x0F) << 8)
+    out[:, 1] = (data[:, 1] >> 4) | (data[:, 2] << 4)
+    return out.reshape(height, width)
+
+
+def unpack_10p(raw, width, height):
+    """Unpack GenICam 10p (four pixels in five bytes, LSB first) to uint16."""
+    data = np.frombuffer(raw, dtype=np.uint8, count=width * height * 5 // 4)
+    data = data.reshape(-1, 5).astype(np.uint16)
+    out = np.empty((data.shape[0], 4), dtype=np.uint16)
+    out[:, 0] = data[:, 0] | ((data[:, 1] & 0x03) << 8)
+    out[:, 1] = (data[:, 1] >> 2) | ((data[:, 2] & 0x0F) << 6)
+    out[:, 2] = (data[:, 2] >> 4) | ((data[:, 3] & 0x3F) << 4)
+    out[:, 3] = (data[:, 3] >> 6) | (data[:, 4] << 2)
+    return out.reshape(height, width)
+
+
+def raw_to_image16(raw, pixel_format, width, height):
+    """Convert a raw camera buffer to a full-range 16-bit BGR or mono image.
+
+    `pixel_format` is the GenICam name reported by the camera, e.g.
+    "BayerRG12p" or "Mono16". Samples are shifted up to use the full 16-bit
+    range so the files display correctly in ordinary viewers.
+    """
+    if pixel_format.endswith("12p"):
+        image, bits = unpack_12p(raw, width, height), 12
+    elif pixel_format.endswith("10p"):
+        image, bits = unpack_10p(raw, width, height), 10
+    elif pixel_format.endswith("16"):
+        image = np.frombuffer(raw, dtype="<u2", count=width * height).reshape(height, width)
+        bits = 16
+    else:
+        raise ValueError(f"Unsupported high-bit-depth pixel format: {pixel_format}")
+
+    if bits < 16:
+        image = image << (16 - bits)
+
+    pattern = pixel_format[:7]
+    if pattern in _BAYER_TO_BGR:
+        return cv2.cvtColor(image, _BAYER_TO_BGR[pattern])
+    return np.ascontiguousarray(image)
+
+
+def _png_chunk(chunk_type, data):
+    return (struct.pack(">I", len(data)) + chunk_type + data
+            + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF))
+
+
+def insert_png_exif(png, exif_bytes):
+    """Return `png` with `exif_bytes` (piexif.dump() output) in an eXIf chunk.
+
+    The chunk goes straight after IHDR, which satisfies the spec's "before
+    IDAT" rule. The image data is not touched.
+    """
+    if exif_bytes.startswith(b"Exif\x00\x00"):
+        exif_bytes = exif_bytes[6:]
+    ihdr_end = 8 + 4 + 4 + 13 + 4   # signature + IHDR length/type/data/crc
+    return png[:ihdr_end] + _png_chunk(b"eXIf", exif_bytes) + png[ihdr_end:]
+
+
+def encode_png16(image, exif_bytes=None, compression=3):
+    """Encode an 8- or 16-bit image as PNG, embedding EXIF if given."""
+    ok, buf = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, int(compression)])
+    if not ok:
+        raise IOError("PNG encoding failed")
+    png = buf.tobytes()
+    return insert_png_exif(png, exif_bytes) if exif_bytes else png
+
+
+def encode_tiff(image, tags=None, compression="zlib"):
+    """Encode an 8- or 16-bit BGR or mono image as a compressed TIFF.
+
+    `tags` holds the baseline TIFF text tags (artist, copyright, make, model,
+    software, description, datetime). These need tifffile; without it the
+    image is encoded by OpenCV and the tags are dropped.
+
+    Returns (tiff bytes, True if the tags were written).
+    """
+    tags = tags or {}
+    if compression == "deflate":
+        compression = "zlib"
+    if not TIFFFILE_AVAILABLE:
+        return _encode_tiff_cv2(image, compression), False
+
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB) if image.ndim == 3 else image
+    extratags = [
+        (code, "s", 0, tags[key], True)
+        for key, code in (("artist", 315), ("copyright", 33432),
+                          ("make", 271), ("model", 272))
+        if tags.get(key)
+    ]
+    out = io.BytesIO()
+    try:
+        tifffile.imwrite(
+            out, rgb,
+            photometric="rgb" if rgb.ndim == 3 else "minisblack",
+            compression=None if compression == "none" else compression,
+            # Horizontal differencing only pays off for deflate/LZW
+            predictor=compression in ("zlib", "lzw"),
+            description=tags.get("description"),
+            software=tags.get("software"),
+            datetime=tags.get("datetime"),
+            metadata=None,
+            extratags=extratags,
+        )
+    except KeyError:
+        # tifffile needs the imagecodecs package for everything but deflate
+        return _encode_tiff_cv2(image, compression), False
+    return out.getvalue(), True
+
+
+def _encode_tiff_cv2(image, compression):
+    code = _CV2_TIFF_COMPRESSION.get(compression, 8)
+    ok, buf = cv2.imencode(".tif", image, [cv2.IMWRITE_TIFF_COMPRESSION, code])
+    if not ok:
+        raise IOError("TIFF encoding failed")
+    return buf.tobytes()
+
+
+def _benchmark(width=2448, height=2048, repeats=5):
+    rng = np.random.default_rng(0)
+    # Smooth synthetic scene plus noise — pure noise compresses unrealistically badly
+    base = cv2.resize(rng.integers(0, 4096, (64, 64), dtype=np.uint16), (width, height),
+                      interpolation=cv2.INTER_CUBIC)
+    mosaic = np.clip(base + rng.integers(0, 64, (height, width), dtype=np.uint16), 0, 4095)
+    mosaic = mosaic.astype(np.uint16)
+
+    pairs = mosaic.reshape(-1, 2)
+    packed12 = np.empty((pairs.shape[0], 3), dtype=np.uint8)
+    packed12[:, 0] = pairs[:, 0] & 0xFF
+    packed12[:, 1] = (pairs[:, 0] >> 8) | ((pairs[:, 1] & 0x0F) << 4)
+    packed12[:, 2] = pairs[:, 1] >> 4
+    raw12 = packed12.tobytes()
+    assert np.array_equal(unpack_12p(raw12, width, height), mosaic)
+
+    raw10 = np.zeros(width * height * 5 // 4, dtype=np.uint8).tobytes()
+    image16 = raw_to_image16(raw12, "BayerRG12p", width, height)
+
+    def timed(label, fn, megapixels):
+        fn()   # warm-up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            result = fn()
+        ms = (time.perf_counter() - start) * 1000 / repeats
+        size = f"{len(result) / 1e6:7.2f} MB" if isinstance(result, bytes) else ""
+        print(f"{label:<28}{ms:9.1f} ms {megapixels / (ms / 1000):8.1f} MP/s  {size}")
+
+    mp = width * height / 1e6
+    print(f"Frame {width}x{height} ({mp:.1f} MP), mean of {repeats} runs")
+    timed("unpack 12p", lambda: unpack_12p(raw12, width, height), mp)
+    timed("unpack 10p", lambda: unpack_10p(raw10, width, height), mp)
+    timed("unpack + demosaic 12p", lambda: raw_to_image16(raw12, "BayerRG12p", width, height), mp)
+    for level in (1, 3, 6):
+        timed(f"encode PNG16 level {level}", lambda: encode_png16(image16, compression=level), mp)
+    timed("encode TIFF16 deflate", lambda: encode_tiff(image16)[0], mp)
+    if not TIFFFILE_AVAILABLE:
+        print("(tifffile not installed — TIFF encoded by OpenCV)")
+
+
+if __name__ == '__main__':
+    _benchmark()
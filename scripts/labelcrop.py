@@ -0,0 +1,219 @@
+"""Find the paper labels in a label capture, and crop and deskew each one.
+
+A `_label` image is mostly background: the foam, the pin and the stage
+around a few small labels. Cropping each label out, squared up, gives OCR
+and transcription much smaller images to read.
+
+detect() works on a copy at most DETECT_EDGE pixels on its longest edge.
+Labels are paper, lighter than what they sit on: the copy is blurred and
+thresholded with Otsu's method, closed so the label text does not break
+the paper up, and its outer contours are kept if they are big enough and
+nearly fill their minimum-area rotated rectangle. crop() then cuts each
+rectangle out of the full-resolution frame with one cv2.warpAffine that
+rotates it upright (by at most 45°, so a label lying sideways stays
+sideways) — only the crop's own pixels are computed, so a label costs
+about as much as copying it.
+
+Crops are derivatives: label `i` of `ACC1_label_1.jpg` is
+`ACC1_label_1_crop<i>.jpg`, numbered largest first, beside the master or
+under `_derivatives/` like the other derivatives. Each crop's axis-aligned
+bounding box in the master (x, y, w, h) and its deskew angle in degrees
+are returned, and recorded in the catalogue's `label_crops` table.
+
+    python -m scripts.labelcrop OUTPUT_FOLDER [--location sidecar]
+
+crops the labels of an existing output folder's masters that have no
+crops yet.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from scripts import catalogue, derivatives
+from scripts.journal import write_atomic
+
+DETECT_EDGE = 1024
+MIN_AREA = 0.005            # smallest label, as a fraction of the frame
+MAX_AREA = 0.8              # anything bigger is the background itself
+MIN_FILL = 0.8              # contour area / rotated rectangle area
+MAX_LABELS = 8
+MARGIN = 0.02               # added round each label, as a fraction of its size
+
+
+def detect(frame, max_labels=MAX_LABELS, min_area=MIN_AREA):
+    """Rotated rectangles ((cx, cy), (w, h), angle) of the labels in
+    `frame`, in full-resolution pixels, largest first."""
+    h, w = frame.shape[:2]
+    scale = min(1.0, DETECT_EDGE / max(h, w))
+    small = cv2.resize(frame, (max(1, round(w * scale)), max(1, round(h * scale))),
+                       interpolation=cv2.INTER_AREA)
+    if small.dtype != np.uint8:
+        small = (small >> 8).astype(np.uint8)
+    grey = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    grey = cv2.GaussianBlur(grey, (5, 5), 0)
+    _, mask = cv2.threshold(grey, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Close over the text and the pin hole so each label is one blob
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 9))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    total = mask.shape[0] * mask.shape[1]
+    labels = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if not min_area * total <= area <= MAX_AREA * total:
+            continue
+        rect = cv2.minAreaRect(contour)
+        if area < MIN_FILL * rect[1][0] * rect[1][1]:
+            continue
+        labels.append((area, rect))
+    labels.sort(key=lambda item: -item[0])
+    return [((cx / scale, cy / scale), (rw / scale, rh / scale), angle)
+            for _, ((cx, cy), (rw, rh), angle) in labels[:max_labels]]
+
+
+def upright(rect):
+    """(centre, (w, h), angle) of a rotated rectangle squared up: the size
+    it has once the image is rotated by `angle`, the smallest rotation
+    (-45° to 45°, counter-clockwise positive) that squares it up."""
+    centre, (w, h), direction = rect
+    # The rectangle's w side runs along `direction`; after turning by
+    # `angle` it runs along direction - angle, a multiple of 90°
+    angle = (direction + 45) % 90 - 45
+    if round((direction - angle) / 90) % 2:
+        w, h = h, w
+    return centre, (w, h), angle
+
+
+def crop(frame, rect, margin=MARGIN):
+    """The label `rect` (from detect()) cut out of `frame`, rotated upright,
+    with `margin` of its size added round it."""
+    (cx, cy), (w, h), angle = upright(rect)
+    pad = margin * max(w, h)
+    out_w, out_h = max(1, round(w + 2 * pad)), max(1, round(h + 2 * pad))
+    rotate = cv2.getRotationMatrix2D((cx, cy), angle, 1.0)
+    rotate[0, 2] += out_w / 2 - cx
+    rotate[1, 2] += out_h / 2 - cy
+    return cv2.warpAffine(frame, rotate, (out_w, out_h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_REPLICATE)
+
+
+def bounding_box(rect, size):
+    """Axis-aligned (x, y, w, h) of `rect` in a frame of `size` (w, h)."""
+    x, y, w, h = cv2.boundingRect(np.int32(np.round(cv2.boxPoints(rect))))
+    x0, y0 = max(0, x), max(0, y)
+    return x0, y0, min(size[0], x + w) - x0, min(size[1], y + h) - y0
+
+
+def remove_crops(path_for):
+    """Delete the crops of a master, path_for(i) being the path of crop
+    `i` (from 1), up to the first one missing. Returns the paths removed."""
+    removed = []
+    i = 1
+    while True:
+        path = Path(path_for(i))
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return removed
+        removed.append(path)
+        i += 1
+
+
+class CropPool:
+    """Find, crop and save labels on a small thread pool (OpenCV releases
+    the GIL).
+
+    submit() returns a Future resolving to a dict with the crops made, each
+    {'path', 'bbox', 'angle'}, and the time taken in milliseconds.
+    """
+
+    def __init__(self, threads=2, quality=90, max_labels=MAX_LABELS, min_area=MIN_AREA,
+                 fsync=False):
+        self.quality = quality
+        self.max_labels = max_labels
+        self.min_area = min_area
+        self.fsync = fsync
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(threads)),
+                                            thread_name_prefix="labelcrop")
+
+    def submit(self, frame, path_for, writer=None):
+        """Queue `frame` to be cropped. path_for(i) gives the path of crop
+        `i` (from 1); the JPEGs are written there, or handed to
+        `writer(data, path)` when one is given."""
+        return self._executor.submit(self._crop, frame, path_for, writer)
+
+    def _crop(self, frame, path_for, writer):
+        t0 = time.perf_counter()
+        size = (frame.shape[1], frame.shape[0])
+        crops = []
+        for i, rect in enumerate(detect(frame, self.max_labels, self.min_area), 1):
+            image = crop(frame, rect)
+            if image.dtype != np.uint8:
+                image = (image >> 8).astype(np.uint8)
+            data = derivatives.encode_jpeg(image, self.quality)
+            path = path_for(i)
+            if writer is not None:
+                writer(data, path)
+            else:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(path, data, self.fsync)
+            crops.append({'path': str(path), 'bbox': bounding_box(rect, size),
+                          'angle': round(upright(rect)[2], 2)})
+        return {"crops": crops, "ms": (time.perf_counter() - t0) * 1000}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crop the labels out of an output folder's captures")
+    parser.add_argument("output", help="output folder")
+    parser.add_argument("--location", choices=("alongside", "sidecar"), default="alongside")
+    parser.add_argument("--quality", type=int, default=90, help="JPEG quality")
+    parser.add_argument("--max-labels", type=int, default=MAX_LABELS)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--catalogue", default=str(catalogue.CATALOGUE_PATH),
+                        help="catalogue to record the bounding boxes in ('' for none)")
+    args = parser.parse_args(argv)
+
+    pool = CropPool(args.threads, args.quality, args.max_labels)
+    cat = catalogue.Catalogue(args.catalogue) if args.catalogue else None
+    pending = []
+    made = 0
+    started = time.monotonic()
+
+    def record(master, future):
+        crops = future.result()["crops"]
+        if cat is not None:
+            cat.set_label_crops(args.output, master, crops)
+        return len(crops)
+
+    for master in derivatives.find_masters(args.output):
+        def path_for(i, master=master):
+            return derivatives.derivative_path(master, f"crop{i}", args.output, args.location)
+        if path_for(1).exists():
+            continue
+        frame = cv2.imread(str(master), cv2.IMREAD_UNCHANGED)
+        if frame is None:
+            print(f"Cannot read {master}")
+            continue
+        pending.append((master, pool.submit(frame, path_for)))
+        if len(pending) >= 4 * args.threads:
+            # Bounded queue: decoded masters are large
+            made += record(*pending.pop(0))
+    for master, future in pending:
+        made += record(master, future)
+    pool.shutdown()
+    if cat is not None:
+        cat.close()
+    print(f"Cropped {made} label(s) in {time.monotonic() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,502 @@
+"""Run each camera in its own process and hand frames over in shared memory.
+
+In the default threaded engine every camera loop shares one interpreter —
+and one GIL — with the GUI, numpy glue and pylibdmtx. With the process
+engine each camera gets a worker process that grabs frames (and, for the
+barcode camera, decodes them) and writes them into a FrameRing in
+multiprocessing.shared_memory. The GUI maps the ring and reads the newest
+frame as a numpy view without copying it.
+
+The GUI talks to a worker with small control messages on a queue:
+
+    ("start",) / ("stop",)                  start or pause grabbing
+    ("settings", {"exposure": µs, ...})     passed to source.apply_settings
+    ("roi", (x, y, w, h) or None)           passed to source.set_roi
+    ("capture", request_id, high_bit, n)    grab a capture frame, best of n
+    ("stack", request_id, high_bit, n, options)
+                                            grab an n-frame focus stack
+    ("quit",)
+
+and the worker answers on an event queue with ("ready", ring name),
+("captured", request_id, shm name, shape, dtype, scores), ("roi", applied)
+(also sent when the source changes its `roi` itself, e.g. to fit a frame),
+("decoded", text) and ("error", message). A worker that dies or stops
+updating its heartbeat is reported by CameraProcess.health() and can be
+terminated without touching the GUI.
+
+The camera itself is opened in the worker by a picklable `factory(spec)`
+that returns a source with read(), capture(high_bit), apply_settings(dict),
+set_roi(roi), close() and optionally a `frame_interval` to throttle to and
+a `capture_burst(high_bit, n)` returning an iterator of n capture frames
+(or None for the default: the latest frame, then the next ones read). A
+`pick(frames)` callable returning (frame, scores) chooses the frame of a
+burst that is sent back; without one the first is. A focus stack comes
+from `capture_stack(high_bit, n, wait=..., **options)` if the source has
+one — wait(seconds) keeps the live view and heartbeat going between its
+frames — else from the burst frames, and is sent back as one
+(frames, h, w[, c]) array.
+"""
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# A frame is written to the next of RING_SLOTS buffers, so a reader can hold
+# the newest frame for RING_SLOTS - 1 frame times before it is overwritten.
+RING_SLOTS = 4
+HEARTBEAT_TIMEOUT_S = 5.0
+RELEASE_TIMEOUT_S = 1.0     # for the GUI to drop its views of a closing ring
+
+log = logging.getLogger("rapiid.mp_engine")
+
+# Header row 0: latest sequence number, heartbeat (µs since the epoch).
+# Rows 1..n, one per slot: begin seq, end seq, height, width, channels,
+# itemsize, timestamp (µs).
+_META_COLS = 7
+_DTYPES = {1: np.uint8, 2: np.uint16}
+
+
+def _attach(name):
+    # Camera workers are spawned children and share this process's resource
+    # tracker, so attaching must not unregister the block — its creator
+    # unlinks it, and the tracker cleans up after a worker that was killed.
+    return shared_memory.SharedMemory(name=name)
+
+
+class FrameRing:
+    """Single-writer, many-reader ring of frames in shared memory.
+
+    Each slot carries begin/end sequence numbers (a seqlock): a reader gets
+    a zero-copy view of the newest complete frame and can check with
+    is_current() that the writer has not started overwriting it since.
+    """
+
+    def __init__(self, shm, slots, slot_bytes, owner):
+        self.shm = shm
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = owner
+        self._header_bytes = (slots + 1) * _META_COLS * 8
+        self.meta = np.ndarray((slots + 1, _META_COLS), dtype=np.int64, buffer=shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @classmethod
+    def create(cls, slot_bytes, slots=RING_SLOTS):
+        header = (slots + 1) * _META_COLS * 8
+        shm = shared_memory.SharedMemory(create=True, size=header + slots * slot_bytes)
+        ring = cls(shm, slots, slot_bytes, owner=True)
+        ring.meta[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, slots=RING_SLOTS):
+        shm = _attach(name)
+        header = (slots + 1) * _META_COLS * 8
+        return cls(shm, slots, (shm.size - header) // slots, owner=False)
+
+    def fits(self, frame):
+        return frame.nbytes <= self.slot_bytes
+
+    def write(self, frame, timestamp=None):
+        seq = int(self.meta[0, 0]) + 1
+        row = 1 + seq % self.slots
+        self.meta[row, 0] = seq
+        offset = self._header_bytes + (row - 1) * self.slot_bytes
+        np.ndarray(frame.shape, frame.dtype, buffer=self.shm.buf, offset=offset)[...] = frame
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        ts = time.time() if timestamp is None else timestamp
+        self.meta[row, 2:7] = (h, w, c, frame.itemsize, int(ts * 1e6))
+        self.meta[row, 1] = seq
+        self.meta[0, 0] = seq
+        return seq
+
+    def latest_seq(self):
+        return int(self.meta[0, 0])
+
+    def read_latest(self):
+        """Return (seq, view) for the newest frame, or (0, None)."""
+        seq = int(self.meta[0, 0])
+        if seq == 0:
+            return 0, None
+        row = 1 + seq % self.slots
+        if self.meta[row, 1] != seq:
+            return 0, None
+        h, w, c, itemsize = (int(v) for v in self.meta[row, 2:6])
+        shape = (h, w, c) if c > 1 else (h, w)
+        offset = self._header_bytes + (row - 1) * self.slot_bytes
+        return seq, np.ndarray(shape, _DTYPES[itemsize], buffer=self.shm.buf, offset=offset)
+
+    def is_current(self, seq):
+        """True if the frame `seq` has not started being overwritten."""
+        return self.meta[1 + seq % self.slots, 0] == seq
+
+    def beat(self):
+        self.meta[0, 1] = int(time.time() * 1e6)
+
+    def heartbeat_age(self):
+        beat = int(self.meta[0, 1])
+        return time.time() - beat / 1e6 if beat else 0.0
+
+    def close(self):
+        """Unmap the ring (and with `owner`, free it). Raises BufferError
+        while a view of a frame is still alive; it can be called again once
+        the view is gone."""
+        if self.owner:
+            self.owner = False
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.meta = None
+        self.shm.close()
+
+
+def _close_ring(ring, timeout=0):
+    """Close `ring`, retrying for up to `timeout` seconds while a view of
+    one of its frames is still alive (the GUI's display thread finishing a
+    frame). Returns whether it was closed."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            ring.close()
+            return True
+        except BufferError:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+
+# ── Worker process ─────────────────────────────────────────────────────────────
+
+def _capture_frames(source, high_bit, count, last_frame):
+    """The frames of a capture burst: the source's own burst if it has one,
+    else its HQ captures or, for sources without those, the latest frame
+    and then the next ones read."""
+    burst = getattr(source, "capture_burst", None)
+    frames = burst(high_bit, count) if burst else None
+    if frames is not None:
+        yield from frames
+        return
+    for i in range(count):
+        frame = source.capture(high_bit)
+        if frame is None:
+            frame = last_frame if i == 0 else source.read()
+        yield frame
+
+
+def _send_capture(events, request_id, frame, scores, capture_shm):
+    """Copy `frame` into the capture block (growing it if needed) and tell
+    the GUI. Returns the block in use."""
+    if frame is None:
+        events.put(("captured", request_id, None, None, None, scores))
+        return capture_shm
+    if capture_shm is None or capture_shm.size < frame.nbytes:
+        if capture_shm is not None:
+            capture_shm.close()
+            capture_shm.unlink()
+        capture_shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+    np.ndarray(frame.shape, frame.dtype, buffer=capture_shm.buf)[...] = frame
+    events.put(("captured", request_id, capture_shm.name, frame.shape, frame.dtype.str, scores))
+    return capture_shm
+
+
+def camera_worker(factory, spec, ctrl, events, frame_ready, decoder=None, decode_every=5,
+                  pick=None):
+    """Process entry point: open the camera with factory(spec) and serve it."""
+    ring = None
+    capture_shm = None
+    source = None
+    try:
+        source = factory(spec)
+        roi = getattr(source, "roi", None)
+        interval = getattr(source, "frame_interval", 0) or 0
+        running = False
+        frame_count = 0
+        last_frame = None
+
+        def stream_for(seconds):
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                frame = source.read()
+                if ring is not None:
+                    ring.beat()
+                    if frame is not None and ring.fits(frame):
+                        ring.write(frame)
+                        frame_ready.set()
+                        continue
+                time.sleep(0.01)
+
+        while True:
+            # Control messages — block briefly while idle so a paused worker
+            # does not spin
+            try:
+                msg = ctrl.get(timeout=0 if running else 0.1)
+            except queue.Empty:
+                msg = None
+            if msg is not None:
+                cmd = msg[0]
+                if cmd == "quit":
+                    break
+                elif cmd == "start":
+                    running = source.start() if hasattr(source, "start") else True
+                elif cmd == "stop":
+                    running = False
+                    if hasattr(source, "stop"):
+                        source.stop()
+                elif cmd == "settings":
+                    source.apply_settings(msg[1])
+                elif cmd == "roi":
+                    roi = source.set_roi(msg[1])
+                    events.put(("roi", roi))
+                elif cmd == "capture":
+                    _, request_id, high_bit, count = msg
+                    frames = _capture_frames(source, high_bit, max(1, count), last_frame)
+                    if pick is not None:
+                        frame, scores = pick(frames)
+                    else:
+                        frame, scores = next(frames, None), []
+                        frames.close()
+                    capture_shm = _send_capture(events, request_id, frame, scores, capture_shm)
+                elif cmd == "stack":
+                    _, request_id, high_bit, count, options = msg
+                    stack = getattr(source, "capture_stack", None)
+                    if stack is not None:
+                        frames = stack(high_bit, max(1, count), wait=stream_for, **options)
+                    else:
+                        frames = list(_capture_frames(source, high_bit, max(1, count), last_frame))
+                    frames = [frame for frame in frames if frame is not None]
+                    capture_shm = _send_capture(events, request_id,
+                                                np.stack(frames) if frames else None, [],
+                                                capture_shm)
+                continue
+
+            if ring is not None:
+                ring.beat()
+            if not running:
+                continue
+
+            t_start = time.monotonic()
+            frame = source.read()
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            last_frame = frame
+            if getattr(source, "roi", None) != roi:
+                roi = source.roi
+                events.put(("roi", roi))
+
+            if ring is None or not ring.fits(frame):
+                # First frame, or the frame grew (ROI reset) — make a bigger ring
+                old = ring
+                ring = FrameRing.create(frame.nbytes)
+                ring.beat()
+                events.put(("ready", ring.name))
+                if old is not None:
+                    old.close()
+            ring.write(frame)
+            frame_ready.set()
+
+            frame_count += 1
+            if decoder is not None and frame_count % decode_every == 0:
+                text = decoder(frame)
+                if text:
+                    events.put(("decoded", text))
+
+            if interval:
+                sleep_time = interval - (time.monotonic() - t_start)
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+
+    except Exception:
+        events.put(("error", traceback.format_exc(limit=3)))
+    finally:
+        if source is not None:
+            try:
+                source.close()
+            except Exception:
+                pass
+        if capture_shm is not None:
+            capture_shm.close()
+            capture_shm.unlink()
+        if ring is not None:
+            # Give the GUI a moment to drop its views before the block goes
+            time.sleep(0.2)
+            ring.close()
+
+
+# ── GUI side ───────────────────────────────────────────────────────────────────
+
+class CameraProcess:
+    """GUI-side handle on one camera worker process."""
+
+    def __init__(self, factory, spec, decoder=None, decode_every=5, pick=None,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT_S):
+        # spawn on every platform: forking a process that runs Qt is unsafe
+        ctx = mp.get_context("spawn")
+        self.spec = spec
+        self.heartbeat_timeout = heartbeat_timeout
+        self.ctrl = ctx.Queue()
+        self.events = ctx.Queue()
+        self.frame_ready = ctx.Event()
+        self.ring = None
+        self._retired = []          # rings replaced by a bigger one, to close
+        self._lock = threading.Lock()
+        self._request_id = 0
+        self._captured = {}
+        self._pending = []          # events for the caller of poll_events()
+        self.last_error = None
+        self.process = ctx.Process(
+            target=camera_worker,
+            args=(factory, spec, self.ctrl, self.events, self.frame_ready, decoder, decode_every,
+                  pick),
+            daemon=True,
+            name=f"camera-{spec.get('name', '')}",
+        )
+        self.process.start()
+
+    def send(self, *msg):
+        self.ctrl.put(msg)
+
+    def start(self):
+        self.send("start")
+
+    def stop(self):
+        self.send("stop")
+
+    def _drain(self):
+        """Read the event queue; must hold self._lock."""
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                return
+            kind = event[0]
+            if kind == "ready":
+                old, self.ring = self.ring, FrameRing.attach(event[1])
+                if old is not None:
+                    # The reader may still hold a frame of it; wait_frame()
+                    # closes it once the reader asks for the next one
+                    self._retired.append(old)
+            elif kind == "captured":
+                self._captured[event[1]] = event[2:]
+            else:
+                if kind == "error":
+                    self.last_error = event[1]
+                self._pending.append(event)
+
+    def poll_events(self):
+        """Return events other than frames and captures since the last call."""
+        with self._lock:
+            self._drain()
+            events, self._pending = self._pending, []
+        return events
+
+    def wait_frame(self, timeout=0.5):
+        """Wait for a new frame; returns (seq, view) or (0, None).
+
+        The view points into shared memory and is overwritten after
+        RING_SLOTS - 1 more frames — copy it, or check ring.is_current(seq)
+        after using it. Drop it before the next call, which closes the rings
+        the worker has replaced, and before close().
+        """
+        if not self.frame_ready.wait(timeout):
+            with self._lock:
+                self._drain()
+                self._close_retired()
+            return 0, None
+        self.frame_ready.clear()
+        with self._lock:
+            self._drain()
+            self._close_retired()
+            if self.ring is None:
+                return 0, None
+            return self.ring.read_latest()
+
+    def _close_retired(self, timeout=0):
+        """Close the replaced rings, waiting up to `timeout` for views of
+        them to go; must hold self._lock."""
+        for ring in list(self._retired):
+            if _close_ring(ring, timeout):
+                self._retired.remove(ring)
+
+    def capture(self, high_bit=False, timeout=10.0):
+        """Ask the worker for a capture frame and return a private copy."""
+        return self.capture_burst(1, high_bit, timeout)[0]
+
+    def capture_burst(self, count, high_bit=False, timeout=10.0):
+        """Ask the worker for the best of a `count`-frame burst. Returns (a
+        private copy of the frame or None, the burst's scores from `pick`)."""
+        with self._lock:
+            self._request_id += 1
+            request_id = self._request_id
+        self.send("capture", request_id, high_bit, count)
+        return self._wait_captured(request_id, timeout)
+
+    def capture_stack(self, count, high_bit=False, timeout=30.0, **options):
+        """Ask the worker for a `count`-frame focus stack (`options` go to
+        the source's capture_stack). Returns a list of private copies of the
+        frames, empty if none arrived."""
+        with self._lock:
+            self._request_id += 1
+            request_id = self._request_id
+        self.send("stack", request_id, high_bit, count, options)
+        frames, _ = self._wait_captured(request_id, timeout)
+        return list(frames) if frames is not None else []
+
+    def _wait_captured(self, request_id, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.process.is_alive():
+            with self._lock:
+                self._drain()
+                reply = self._captured.pop(request_id, None)
+            if reply is not None:
+                name, shape, dtype, scores = reply
+                if name is None:
+                    return None, scores
+                shm = _attach(name)
+                try:
+                    return np.ndarray(shape, np.dtype(dtype), buffer=shm.buf).copy(), scores
+                finally:
+                    shm.close()
+            time.sleep(0.005)
+        return None, []
+
+    def health(self):
+        """None while healthy, else "crashed: <reason>" or "not responding"."""
+        if not self.process.is_alive():
+            return f"crashed (exit code {self.process.exitcode})"
+        with self._lock:
+            ring = self.ring
+            if ring is not None and ring.heartbeat_age() > self.heartbeat_timeout:
+                return "not responding"
+        return None
+
+    def close(self, timeout=2.0):
+        """Stop the worker, killing it if it does not exit in `timeout`."""
+        if self.process.is_alive():
+            self.send("quit")
+            self.process.join(timeout)
+        killed = self.process.is_alive() or self.process.exitcode != 0
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1.0)
+        with self._lock:
+            if self.ring is not None:
+                # A worker that did not exit cleanly cannot free its ring
+                self.ring.owner = killed
+                self._retired.append(self.ring)
+                self.ring = None
+            self._close_retired(RELEASE_TIMEOUT_S)
+            for ring in self._retired:
+                log.warning(f"Frame ring {ring.name} is still in use and stays mapped")
+        self.ctrl.cancel_join_thread()
+        self.events.cancel_join_thread()
@@ -0,0 +1,229 @@
+"""Read every DataMatrix code in a frame, and the label each one is on.
+
+A unit tray or drawer puts several specimens in one shot, each with its own
+DataMatrix label, so one frame has to identify several specimens. decode()
+reads all of the codes in a frame, not just the first. The grey frame is
+cut into TILE-pixel tiles that overlap by OVERLAP pixels (more than a code
+is wide, so every code lies whole in at least one tile). Each tile is
+scanned by pylibdmtx for up to `max_count` codes, on a thread pool:
+libdmtx is called through ctypes, which releases the GIL. A tile where
+nothing is found is scanned again adaptively thresholded, as the
+single-code decoder does. A code read in two tiles is kept once.
+
+specimens() then finds the labels in the frame (scripts.labelcrop.detect)
+and gives each code the label it is printed on. A code on no label that
+was found gets a square CONTEXT times its size around it. Each specimen is
+
+  text     the decoded accession
+  code     the code's (x, y, w, h) in the frame
+  region   the label's rotated rectangle, for labelcrop.crop()
+  bbox     the region's (x, y, w, h) in the frame
+
+all in full-resolution pixels.
+
+    python -m scripts.multicode IMAGE [IMAGE ...]
+
+prints the specimens found in saved frames and the time taken.
+"""
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pylibdmtx.pylibdmtx as dmtx
+
+from scripts import labelcrop
+
+TILE = 1024
+OVERLAP = 256               # more than the widest code, in pixels
+TIMEOUT_MS = 300            # per tile and pass
+CONTEXT = 3.0               # region round a code on no label, in code sizes
+MIN_LABEL_AREA = 0.0005     # a tray holds many small labels
+# Added to the tag of a specimen image, so it never shares a name with the
+# frame it was cut from
+SPECIMEN_SUFFIX = "_specimen"
+
+# Columns added to each capture's CSV and catalogue row: the frame a
+# specimen image was cut from, and where
+CSV_FIELDS = ('source_image', 'source_region')
+
+
+def _grey(frame):
+    if frame.dtype != np.uint8:
+        frame = (frame >> 8).astype(np.uint8)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+def _starts(length, tile, step):
+    if length <= tile:
+        return [0]
+    return list(range(0, length - tile, step)) + [length - tile]
+
+
+def tiles(size, tile=TILE, overlap=OVERLAP):
+    """(x, y, w, h) of the overlapping tiles covering a frame of `size`
+    (w, h)."""
+    step = max(1, tile - overlap)
+    return [(x, y, min(tile, size[0]), min(tile, size[1]))
+            for y in _starts(size[1], tile, step) for x in _starts(size[0], tile, step)]
+
+
+def decode_tile(grey, box, max_count=None, timeout_ms=TIMEOUT_MS):
+    """Codes in the `box` (x, y, w, h) of `grey`, each {'text', 'centre',
+    'side'} in frame pixels."""
+    x, y, w, h = box
+    tile = np.ascontiguousarray(grey[y:y + h, x:x + w])
+    found = dmtx.decode(tile, timeout=timeout_ms, max_count=max_count or None)
+    if not found:
+        thresh = cv2.adaptiveThreshold(tile, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                       cv2.THRESH_BINARY, blockSize=21, C=10)
+        found = dmtx.decode(thresh, timeout=timeout_ms, max_count=max_count or None)
+    codes = []
+    for result in found:
+        # The rect spans two opposite corners of the symbol, with y measured
+        # up from the bottom of the image, as libdmtx does
+        left, top, width, height = result.rect
+        x0, y0 = left, h - top
+        x1, y1 = left + width, h - (top + height)
+        codes.append({
+            'text': result.data.decode('utf-8', 'replace'),
+            'centre': (x + (x0 + x1) / 2, y + (y0 + y1) / 2),
+            'side': math.hypot(x1 - x0, y1 - y0) / math.sqrt(2),
+        })
+    return codes
+
+
+def decode(frame, max_count=0, tile=TILE, overlap=OVERLAP, timeout_ms=TIMEOUT_MS,
+           executor=None):
+    """Every DataMatrix code in `frame` (8 or 16-bit, colour or mono), in
+    tile order, each {'text', 'centre', 'side'}; at most `max_count` (0 for
+    no limit). Tiles are scanned on `executor`, or on a pool of one thread
+    per core."""
+    grey = _grey(frame)
+    boxes = tiles((grey.shape[1], grey.shape[0]), tile, overlap)
+    own = executor is None and len(boxes) > 1
+    if own:
+        executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2,
+                                      thread_name_prefix="multicode")
+    try:
+        if executor is None:
+            found = [decode_tile(grey, boxes[0], max_count, timeout_ms)]
+        else:
+            found = [future.result() for future in
+                     [executor.submit(decode_tile, grey, box, max_count, timeout_ms)
+                      for box in boxes]]
+    finally:
+        if own:
+            executor.shutdown()
+    codes = {}
+    for code in (code for tile_codes in found for code in tile_codes):
+        codes.setdefault(code['text'], code)
+    codes = list(codes.values())
+    return codes[:max_count] if max_count else codes
+
+
+def _square(centre, side):
+    return [int(round(centre[0] - side / 2)), int(round(centre[1] - side / 2)),
+            int(round(side)), int(round(side))]
+
+
+def specimens(frame, codes, context=CONTEXT, min_area=MIN_LABEL_AREA):
+    """The specimens of `codes` (from decode()): each code with the label
+    region it is on, as described above."""
+    size = (frame.shape[1], frame.shape[0])
+    labels = labelcrop.detect(frame, max(labelcrop.MAX_LABELS, 2 * len(codes)), min_area) \
+        if codes else []
+    corners = [cv2.boxPoints(rect).astype(np.float32) for rect in labels]
+    out = []
+    for code in codes:
+        centre = tuple(float(v) for v in code['centre'])
+        on = [rect for rect, box in zip(labels, corners)
+              if cv2.pointPolygonTest(box, centre, False) >= 0]
+        if on:
+            # The smallest label holding the code, not the tray round it
+            region = min(on, key=lambda rect: rect[1][0] * rect[1][1])
+        else:
+            side = code['side'] * context
+            region = (centre, (side, side), 0.0)
+        out.append({
+            'text': code['text'],
+            'code': _square(centre, code['side']),
+            'region': region,
+            'bbox': [int(v) for v in labelcrop.bounding_box(region, size)],
+        })
+    return out
+
+
+def csv_fields(source_image, specimen):
+    """The CSV_FIELDS values for the row of a specimen image cut from
+    `source_image`."""
+    return {
+        'source_image': os.path.basename(source_image),
+        'source_region': ",".join(str(v) for v in specimen['bbox']),
+    }
+
+
+class DecodePool:
+    """Read the specimens of frames in the background.
+
+    submit() returns a Future resolving to a dict with the specimens found
+    and the time taken in milliseconds. Frames are read one at a time, each
+    across `threads` tile workers (0 = one per core).
+    """
+
+    def __init__(self, threads=0, max_count=0, tile=TILE, overlap=OVERLAP,
+                 timeout_ms=TIMEOUT_MS, context=CONTEXT, min_area=MIN_LABEL_AREA):
+        self.max_count = int(max_count)
+        self.tile = int(tile)
+        self.overlap = int(overlap)
+        self.timeout_ms = int(timeout_ms)
+        self.context = float(context)
+        self.min_area = float(min_area)
+        self._tiles = ThreadPoolExecutor(max_workers=int(threads) or os.cpu_count() or 2,
+                                         thread_name_prefix="multicode")
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="multicode-read")
+
+    def submit(self, frame):
+        return self._executor.submit(self._read, frame)
+
+    def _read(self, frame):
+        t0 = time.perf_counter()
+        codes = decode(frame, self.max_count, self.tile, self.overlap, self.timeout_ms,
+                       self._tiles)
+        found = specimens(frame, codes, self.context, self.min_area)
+        return {"specimens": found, "ms": (time.perf_counter() - t0) * 1000}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        self._tiles.shutdown(wait=wait)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read every DataMatrix code in saved frames")
+    parser.add_argument("images", nargs="+", help="frames to read")
+    parser.add_argument("--max-count", type=int, default=0, help="codes per frame (0 = all)")
+    parser.add_argument("--tile", type=int, default=TILE)
+    parser.add_argument("--overlap", type=int, default=OVERLAP)
+    parser.add_argument("--timeout-ms", type=int, default=TIMEOUT_MS)
+    args = parser.parse_args(argv)
+
+    pool = DecodePool(0, args.max_count, args.tile, args.overlap, args.timeout_ms)
+    try:
+        for path in args.images:
+            frame = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+            if frame is None:
+                print(f"Cannot read {path}")
+                continue
+            result = pool.submit(frame).result()
+            print(f"{path}: {len(result['specimens'])} code(s) in {result['ms']:.0f} ms")
+            for specimen in result['specimens']:
+                print(f"  {specimen['text']}  code {specimen['code']}  label {specimen['bbox']}")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""First-pass OCR of label captures, with a cache of results.
+
+Each label capture is read with Tesseract (through the optional
+`pytesseract` package and a Tesseract install) to give transcribers a head
+start. Tesseract is slow — seconds for a 5 MP frame — and single-threaded
+per image, so images are read on a pool of worker processes, off the
+capture path entirely.
+
+Results are cached by the hash of the greyscale pixels read together with
+the language and page segmentation mode, in ~/.rapiid/ocr_cache.sqlite, so
+an image is never read twice: recapturing an unchanged frame, or running the
+batch mode over a folder again, costs one hash. Each image's result goes
+in a sidecar `<image>_ocr.json` beside it (or under `_derivatives/`):
+
+  text        the text, one line per line found
+  confidence  mean word confidence, 0-100
+  lines       [{'text', 'confidence', 'box': [x, y, w, h]}]
+  ms          time Tesseract took, when first read
+  cached      whether this result came from the cache
+  engine, lang, psm, hash
+
+    python -m scripts.ocr OUTPUT_FOLDER [--lang eng] [--processes 4]
+
+reads the masters of an existing output folder that have no sidecar yet.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from scripts import derivatives
+from scripts.journal import write_atomic
+
+try:
+    import pytesseract
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    PYTESSERACT_AVAILABLE = False
+
+CACHE_PATH = Path.home() / ".rapiid" / "ocr_cache.sqlite"
+LANG = "eng"
+PSM = 3                     # Tesseract's fully automatic page segmentation
+SIDECAR_NAME = "ocr"
+
+
+def available():
+    """(True, engine name) if Tesseract can be run, else (False, why not)."""
+    if not PYTESSERACT_AVAILABLE:
+        return False, "pytesseract is not installed"
+    try:
+        return True, f"tesseract {pytesseract.get_tesseract_version()}"
+    except Exception as e:
+        return False, f"Tesseract cannot be run ({e})"
+
+
+def sidecar_path(master, output_location=None, location="alongside"):
+    """Path of the OCR sidecar of `master`."""
+    return derivatives.derivative_path(master, SIDECAR_NAME, output_location,
+                                       location).with_suffix(".json")
+
+
+def to_grey(frame):
+    """The 8-bit greyscale image Tesseract reads, from any capture frame."""
+    if frame.dtype != np.uint8:
+        frame = (frame >> 8).astype(np.uint8)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+def image_hash(grey, lang=LANG, psm=PSM):
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{grey.shape}|{lang}|{psm}|".encode())
+    digest.update(np.ascontiguousarray(grey).data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """OCR results by image hash, in SQLite (WAL, so the worker processes
+    can share it)."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else CACHE_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(hash TEXT PRIMARY KEY, result TEXT NOT NULL, created TEXT NOT NULL)")
+
+    def get(self, key):
+        row = self._conn.execute("SELECT result FROM results WHERE hash = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, result):
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                               (key, json.dumps(result), now))
+
+    def close(self):
+        self._conn.close()
+
+
+def _lines(data):
+    """Group Tesseract's words (image_to_data) into lines."""
+    lines = {}
+    for i, word in enumerate(data['text']):
+        conf = float(data['conf'][i])
+        if not word.strip() or conf < 0:
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        box = (data['left'][i], data['top'][i], data['width'][i], data['height'][i])
+        lines.setdefault(key, []).append((word, conf, box))
+    out = []
+    for key in sorted(lines):
+        words = lines[key]
+        x0 = min(b[0] for _, _, b in words)
+        y0 = min(b[1] for _, _, b in words)
+        x1 = max(b[0] + b[2] for _, _, b in words)
+        y1 = max(b[1] + b[3] for _, _, b in words)
+        out.append({'text': " ".join(w for w, _, _ in words),
+                    'confidence': round(sum(c for _, c, _ in words) / len(words), 1),
+                    'box': [int(x0), int(y0), int(x1 - x0), int(y1 - y0)],
+                    'words': len(words)})
+    return out
+
+
+def recognise(grey, lang=LANG, psm=PSM, cache_path=None):
+    """Read `grey` (from to_grey()), or take its result from the cache.
+    Runs in a worker process."""
+    key = image_hash(grey, lang, psm)
+    cache = ResultCache(cache_path)
+    try:
+        result = cache.get(key)
+        if result is not None:
+            result['cached'] = True
+            return result
+        t0 = time.perf_counter()
+        data = pytesseract.image_to_data(grey, lang=lang, config=f"--psm {int(psm)}",
+                                         output_type=pytesseract.Output.DICT)
+        lines = _lines(data)
+        words = sum(line['words'] for line in lines)
+        result = {
+            'text': "\n".join(line['text'] for line in lines),
+            'confidence': round(sum(line['confidence'] * line['words'] for line in lines)
+                                / words, 1) if words else 0.0,
+            'lines': lines,
+            'ms': round((time.perf_counter() - t0) * 1000),
+            'engine': f"tesseract {pytesseract.get_tesseract_version()}",
+            'lang': lang,
+            'psm': int(psm),
+            'hash': key,
+        }
+        cache.put(key, result)
+        result['cached'] = False
+        return result
+    finally:
+        cache.close()
+
+
+def recognise_file(path, lang=LANG, psm=PSM, cache_path=None):
+    """recognise() an image file, read in the worker process."""
+    frame = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+    if frame is None:
+        raise IOError(f"cannot read {path}")
+    return recognise(to_grey(frame), lang, psm, cache_path)
+
+
+class OcrPool:
+    """Read images on a pool of worker processes.
+
+    submit() returns a Future resolving to recognise()'s result. Frames are
+    reduced to 8-bit grey before they are sent, a third of the pixels to
+    copy to the worker. shutdown(cancel=True) drops the images not yet
+    started, which the batch mode can read later.
+    """
+
+    def __init__(self, processes=1, lang=LANG, psm=PSM, cache_path=None):
+        self.lang = lang
+        self.psm = psm
+        self.cache_path = str(cache_path) if cache_path else None
+        # spawn on every platform, like the camera workers: forking a
+        # process that runs Qt is unsafe
+        self._executor = ProcessPoolExecutor(max_workers=max(1, int(processes)),
+                                             mp_context=mp.get_context("spawn"))
+        self._pending = set()
+
+    def submit(self, frame):
+        return self._track(self._executor.submit(
+            recognise, to_grey(frame), self.lang, self.psm, self.cache_path))
+
+    def submit_file(self, path):
+        return self._track(self._executor.submit(
+            recognise_file, str(path), self.lang, self.psm, self.cache_path))
+
+    def _track(self, future):
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    def shutdown(self, wait=True, cancel=False):
+        if cancel:
+            for future in list(self._pending):
+                future.cancel()
+        self._executor.shutdown(wait=wait)
+
+
+def sidecar_json(master, result):
+    """The bytes of the sidecar for `master` holding `result`."""
+    return json.dumps(dict(result, image=Path(master).name), indent=1,
+                      ensure_ascii=False).encode("utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OCR the label images of an output folder")
+    parser.add_argument("output", help="output folder")
+    parser.add_argument("--lang", default=LANG, help="Tesseract language(s), e.g. eng+lat")
+    parser.add_argument("--psm", type=int, default=PSM, help="Tesseract page segmentation mode")
+    parser.add_argument("--location", choices=("alongside", "sidecar"), default="alongside")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--cache", help=f"result cache (default {CACHE_PATH})")
+    args = parser.parse_args(argv)
+
+    ok, engine = available()
+    if not ok:
+        parser.error(engine)
+    pool = OcrPool(args.processes, args.lang, args.psm, args.cache)
+    pending = []
+    read = cached = 0
+    started = time.monotonic()
+
+    def finish(master, future):
+        nonlocal read, cached
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"{master}: {e}")
+            return
+        path = sidecar_path(master, args.output, args.location)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, sidecar_json(master, result), fsync=False)
+        read += 1
+        cached += result['cached']
+
+    for master in derivatives.find_masters(args.output):
+        if sidecar_path(master, args.output, args.location).exists():
+            continue
+        pending.append((master, pool.submit_file(master)))
+        if len(pending) >= 4 * args.processes:
+            finish(*pending.pop(0))
+    for master, future in pending:
+        finish(master, future)
+    pool.shutdown()
+    print(f"Read {read} image(s) with {engine}, {cached} from the cache, "
+          f"in {time.monotonic() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Record live camera streams and play them back as a camera.
+
+FrameRecorder dumps a stream to a folder — one image per frame plus a
+frames.csv index of timestamps. ReplayCamera plays a recording, a folder of
+images or a video file through the same interface as cv2.VideoCapture, so
+the app's live view, barcode decoding and capture paths run unchanged
+without any camera attached.
+"""
+import csv
+import datetime
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+
+import cv2
+
+RECORDING_INDEX = "frames.csv"
+RECORDING_META = "recording.json"
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp"}
+
+
+class FrameRecorder:
+    """Write frames to `folder` on a background thread.
+
+    add() never blocks the camera loop: if the writer falls behind by more
+    than `max_queue` frames, new frames are dropped and counted instead.
+    JPEG at quality 95 keeps up with a 5 MP stream; use ".png" for a
+    lossless recording at lower frame rates.
+    """
+
+    def __init__(self, folder, source="", camera_type="Webcam", serial=None,
+                 ext=".jpg", max_queue=64):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.ext = ext
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self._t0 = None
+        self._index = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+
+        with open(self.folder / RECORDING_META, "w") as f:
+            json.dump({
+                "source": source,
+                "camera_type": camera_type,
+                "serial": serial,
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            }, f, indent=2)
+
+        self._index_file = open(self.folder / RECORDING_INDEX, "w", newline="")
+        self._writer = csv.writer(self._index_file)
+        self._writer.writerow(["frame", "timestamp_s", "file"])
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, frame, timestamp=None):
+        """Queue a frame; `timestamp` defaults to now (time.monotonic())."""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        if self._t0 is None:
+            self._t0 = timestamp
+        try:
+            self._queue.put_nowait((self._index, timestamp - self._t0, frame))
+            self._index += 1
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            index, elapsed, frame = item
+            name = f"frame_{index:06d}{self.ext}"
+            if cv2.imwrite(str(self.folder / name), frame):
+                self._writer.writerow([index, f"{elapsed:.6f}", name])
+                self.frames_written += 1
+
+    def close(self):
+        """Flush queued frames and close the index."""
+        self._queue.put(None)
+        self._thread.join()
+        self._index_file.close()
+
+
+class ReplayCamera:
+    """cv2.VideoCapture look-alike that plays back recorded frames.
+
+    `source` is a FrameRecorder folder (or its frames.csv), a folder of
+    images played in name order at `fps`, or a video file. With
+    speed="real" frames are released on their recorded timestamps; with
+    speed="max" read() returns as fast as the caller asks. `preload`
+    decodes everything up front so file decoding does not show up in
+    profiles. Frames come back as 8-bit BGR, as they would from a webcam.
+    """
+
+    self_paced = True   # the camera loops skip their own frame-rate throttle
+
+    def __init__(self, source, speed="real", loop=True, preload=False, fps=15.0):
+        path = Path(source)
+        if path.is_file() and path.name == RECORDING_INDEX:
+            path = path.parent
+        self.source = path
+        self.speed = speed
+        self.loop = loop
+        self.flip = False      # True for recordings of webcams, whose view is rotated
+        self.camera_type = None
+        self._video = None
+        self._files = []
+        self._frames = None
+        self._pos = 0
+        self._t0 = None
+        self._shape = None
+        self._opened = True
+
+        if path.is_dir() and (path / RECORDING_INDEX).exists():
+            with open(path / RECORDING_INDEX, newline="") as f:
+                rows = list(csv.DictReader(f))
+            self._files = [path / row["file"] for row in rows]
+            self._timestamps = [float(row["timestamp_s"]) for row in rows]
+            meta_path = path / RECORDING_META
+            if meta_path.exists():
+                with open(meta_path) as f:
+                    self.camera_type = json.load(f).get("camera_type")
+            self.flip = self.camera_type == "Webcam"
+        elif path.is_dir():
+            self._files = sorted(p for p in path.iterdir()
+                                 if p.suffix.lower() in IMAGE_EXTENSIONS)
+            self._timestamps = [i / fps for i in range(len(self._files))]
+        elif path.is_file():
+            self._video = cv2.VideoCapture(str(path))
+            if not self._video.isOpened():
+                raise ValueError(f"Cannot open video: {path}")
+            video_fps = self._video.get(cv2.CAP_PROP_FPS) or fps
+            count = int(self._video.get(cv2.CAP_PROP_FRAME_COUNT))
+            self._timestamps = [i / video_fps for i in range(max(count, 0))]
+            # Some containers do not report a frame count — decode them up
+            # front so the length is known
+            preload = preload or count <= 0
+        else:
+            raise ValueError(f"Replay source not found: {path}")
+
+        if self._video is None and not self._files:
+            raise ValueError(f"No frames to replay in {path}")
+        if preload:
+            self._frames = list(self._iter_source())
+            if not self._frames:
+                raise ValueError(f"No frames to replay in {path}")
+            if len(self._timestamps) != len(self._frames):
+                self._timestamps = [i / fps for i in range(len(self._frames))]
+
+    def __len__(self):
+        return len(self._frames) if self._frames is not None else len(self._timestamps)
+
+    def _iter_source(self):
+        if self._video is not None:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            while True:
+                ret, frame = self._video.read()
+                if not ret:
+                    return
+                yield frame
+        else:
+            for path in self._files:
+                frame = cv2.imread(str(path), cv2.IMREAD_COLOR)
+                if frame is not None:
+                    yield frame
+
+    def _load(self, pos):
+        if self._frames is not None:
+            return self._frames[pos]
+        if self._video is not None:
+            if pos == 0:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._video.read()
+            return frame if ret else None
+        return cv2.imread(str(self._files[pos]), cv2.IMREAD_COLOR)
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        if self._pos >= len(self):
+            if not self.loop:
+                return False, None
+            self._pos = 0
+            self._t0 = None
+
+        if self.speed == "real" and self._pos < len(self._timestamps):
+            now = time.monotonic()
+            if self._t0 is None:
+                self._t0 = now - self._timestamps[self._pos]
+            delay = self._t0 + self._timestamps[self._pos] - now
+            if delay > 0:
+                time.sleep(delay)
+
+        frame = self._load(self._pos)
+        self._pos += 1
+        if frame is None:
+            # End of a video whose frame count was over-reported
+            self._pos = len(self)
+            return self.read() if self.loop and len(self) else (False, None)
+        self._shape = frame.shape
+        return True, frame
+
+    def isOpened(self):
+        return self._opened
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            if len(self._timestamps) > 1 and self._timestamps[-1] > 0:
+                return (len(self._timestamps) - 1) / self._timestamps[-1]
+            return 0.0
+        if self._shape is None and self._opened:
+            frame = self._load(0)
+            if self._video is not None:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, self._pos)
+            self._shape = frame.shape if frame is not None else (0, 0)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self._shape[1])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self._shape[0])
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self))
+        return 0.0
+
+    def set(self, prop, value):
+        # Resolution and similar requests mean nothing for a recording
+        return False
+
+    def release(self):
+        self._opened = False
+        if self._video is not None:
+            self._video.release()
+            self._video = None
@@ -0,0 +1,362 @@
+"""Review pane: the capture sets of a session as a thumbnail list.
+
+ReviewModel holds one row per capture set, newest first. Thumbnails are
+loaded only when the view asks for them (the view is virtualised: with
+uniform item sizes it only queries the rows on screen), on a background
+thread pool:
+
+- A ready-made `_thumb` derivative (scripts.derivatives) is used if there
+  is one.
+- Otherwise JPEGs are decoded at 1/2, 1/4 or 1/8 scale by libjpeg
+  (cv2.IMREAD_REDUCED_*), so a 5 MP master costs a fraction of a full
+  decode.
+- Each thumbnail is kept in a disk cache (~/.rapiid/thumbs), keyed on path,
+  modification time and size, and the composed set thumbnails in an LRU of
+  QPixmaps, so scrolling back is free.
+
+ImageViewer opens a set's images one at a time, decoded at reduced scale
+to fit the screen. Full size is decoded only on request, one image at a
+time, so memory use does not depend on the number of captures.
+"""
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PyQt5 import QtCore, QtGui, QtWidgets
+from PyQt5.QtCore import Qt
+
+from scripts import derivatives
+
+THUMB_DIR = Path.home() / ".rapiid" / "thumbs"
+THUMB_EDGE = 160                # longest edge of one image's thumbnail
+SET_IMAGES = 2                  # images side by side in a set's thumbnail
+GAP = 4                         # pixels between them
+PIXMAP_CACHE_ITEMS = 1000
+_REDUCED = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+            (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+log = logging.getLogger("rapiid.review")
+
+
+def read_reduced(path, max_edge):
+    """Decode `path` at the smallest of 1/8, 1/4, 1/2 or full scale whose
+    longest edge is still at least `max_edge`, as 8-bit BGR."""
+    size = QtGui.QImageReader(str(path)).size()     # from the header only
+    longest = max(size.width(), size.height()) if size.isValid() else 0
+    flag = cv2.IMREAD_COLOR
+    for factor, reduced in _REDUCED:
+        if longest and longest // factor >= max_edge:
+            flag = reduced
+            break
+    image = cv2.imread(str(path), flag)
+    if image is None:
+        raise IOError(f"cannot read {path}")
+    return image
+
+
+def fit(image, max_edge):
+    h, w = image.shape[:2]
+    scale = max_edge / max(h, w)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (max(1, round(w * scale)), max(1, round(h * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def to_qimage(image):
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    h, w = rgb.shape[:2]
+    return QtGui.QImage(rgb.data, w, h, 3 * w, QtGui.QImage.Format_RGB888).copy()
+
+
+def thumbnail(paths, edge=THUMB_EDGE, cache_dir=THUMB_DIR):
+    """Thumbnail (BGR) of the first of `paths` that exists, or None."""
+    for path in map(Path, paths):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        key = hashlib.sha1(f"{path.resolve()}|{st.st_mtime_ns}|{st.st_size}|{edge}"
+                           .encode("utf-8")).hexdigest()
+        cached = Path(cache_dir) / key[:2] / f"{key}.jpg"
+        image = cv2.imread(str(cached)) if cached.exists() else None
+        if image is not None:
+            return image
+        thumb = derivatives.derivative_path(path, "thumb")
+        image = fit(read_reduced(thumb if thumb.exists() else path, edge), edge)
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(cached), image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        return image
+    return None
+
+
+def set_width(edge=THUMB_EDGE):
+    """Width of a set's thumbnail: SET_IMAGES thumbnails and the gaps
+    between them."""
+    return SET_IMAGES * edge + (SET_IMAGES - 1) * GAP
+
+
+def set_thumbnail(images, edge=THUMB_EDGE):
+    """One QImage for a capture set: the thumbnails of its first SET_IMAGES
+    images side by side, in a fixed set_width(edge) by edge box."""
+    box = np.full((edge, set_width(edge), 3), 48, np.uint8)
+    x = 0
+    for image in images[:SET_IMAGES]:
+        thumb = thumbnail(image_paths(image), edge)
+        if thumb is None:
+            continue
+        h, w = thumb.shape[:2]
+        y = (edge - h) // 2
+        box[y:y + h, x:x + w] = thumb
+        x += w + GAP
+        if x >= box.shape[1]:
+            break
+    return to_qimage(box[:, :max(x - GAP, edge)])
+
+
+def image_paths(image):
+    """Where an image may be: its final path, then where it was written
+    (the staging folder) while it has not been moved yet."""
+    paths = [image['image_path']]
+    if image.get('write_path') and image['write_path'] != image['image_path']:
+        paths.append(image['write_path'])
+    return paths
+
+
+def capture_set(rows):
+    """A capture set from its rows (catalogue rows, CSV rows with an
+    'image_path', or the rows the app records)."""
+    return {
+        'accession': rows[0]['accession_number'],
+        'taxon': rows[0]['taxon_name'],
+        'date': rows[0].get('date_captured', ''),
+        'images': list(rows),
+    }
+
+
+def group_sets(rows):
+    """Group capture rows into capture sets, oldest first: by catalogue set,
+    or for rows without one (CSV, imported) by accession and minute."""
+    groups = OrderedDict()
+    for row in rows:
+        key = row.get('set_id') or (row['accession_number'], row.get('date_captured', '')[:16])
+        groups.setdefault(key, []).append(row)
+    return [capture_set(group) for group in groups.values()]
+
+
+class ReviewModel(QtCore.QAbstractListModel):
+    """Capture sets, newest first, with thumbnails loaded on demand."""
+
+    _thumbnail_ready = QtCore.pyqtSignal(int, int, QtGui.QImage)   # generation, set, image
+
+    def __init__(self, threads=2, parent=None):
+        super().__init__(parent)
+        self._sets = []                 # oldest first; row r is _sets[-1 - r]
+        self.images = 0
+        self._pixmaps = OrderedDict()   # set index → QPixmap (LRU)
+        self._pending = set()
+        self._generation = 0            # bumped by reset, drops stale loads
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="thumbs")
+        self._placeholder = QtGui.QPixmap(set_width(), THUMB_EDGE)
+        self._placeholder.fill(QtGui.QColor(48, 48, 48))
+        self._thumbnail_ready.connect(self._store)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._sets)
+
+    def set_at(self, row):
+        return self._sets[len(self._sets) - 1 - row]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._sets):
+            return None
+        i = len(self._sets) - 1 - index.row()
+        capture_set = self._sets[i]
+        if role == Qt.DisplayRole:
+            return f"{capture_set['accession']}\n{capture_set['taxon']}"
+        if role == Qt.ToolTipRole:
+            names = "\n".join(os.path.basename(img['image_path']) for img in capture_set['images'])
+            return f"{capture_set['date']}\n{names}"
+        if role == Qt.DecorationRole:
+            pixmap = self._pixmaps.get(i)
+            if pixmap is not None:
+                self._pixmaps.move_to_end(i)
+                return pixmap
+            self._request(i)
+            return self._placeholder
+        return None
+
+    def reset(self, sets):
+        self.beginResetModel()
+        self._sets = list(sets)
+        self.images = sum(len(s['images']) for s in self._sets)
+        self._pixmaps.clear()
+        self._pending.clear()
+        self._generation += 1
+        self.endResetModel()
+
+    def add_set(self, capture_set):
+        self.beginInsertRows(QtCore.QModelIndex(), 0, 0)
+        self._sets.append(capture_set)
+        self.images += len(capture_set['images'])
+        self.endInsertRows()
+
+    def _request(self, i):
+        if i in self._pending:
+            return
+        self._pending.add(i)
+        generation, images = self._generation, self._sets[i]['images']
+
+        def load():
+            try:
+                image = set_thumbnail(images)
+            except Exception as e:
+                log.error(f"Error making the thumbnail of {images[0]['image_path']}: {e}")
+                image = QtGui.QImage()
+            self._thumbnail_ready.emit(generation, i, image)
+        self._executor.submit(load)
+
+    def _store(self, generation, i, image):
+        # GUI thread: QPixmaps may only be made here
+        if generation != self._generation:
+            return
+        self._pending.discard(i)
+        # A set that failed keeps the placeholder rather than being retried
+        # on every repaint
+        self._pixmaps[i] = self._placeholder if image.isNull() else QtGui.QPixmap.fromImage(image)
+        while len(self._pixmaps) > PIXMAP_CACHE_ITEMS:
+            self._pixmaps.popitem(last=False)
+        index = self.index(len(self._sets) - 1 - i)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def shutdown(self):
+        self._generation += 1
+        self._executor.shutdown(wait=False)
+
+
+class ImageViewer(QtWidgets.QDialog):
+    """A capture set's images, one at a time, fitted to the window; *Full
+    size* decodes the shown image at full resolution."""
+
+    def __init__(self, capture_set, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"{capture_set['accession']} — {capture_set['taxon']}")
+        self.images = capture_set['images']
+        self.current = 0
+        self.full_size = False
+
+        layout = QtWidgets.QVBoxLayout(self)
+        self.scroll = QtWidgets.QScrollArea()
+        self.scroll.setAlignment(Qt.AlignCenter)
+        self.label = QtWidgets.QLabel()
+        self.label.setAlignment(Qt.AlignCenter)
+        self.scroll.setWidget(self.label)
+        self.scroll.setWidgetResizable(True)
+        layout.addWidget(self.scroll)
+
+        buttons = QtWidgets.QHBoxLayout()
+        self.previous_button = QtWidgets.QPushButton("◀ Previous")
+        self.next_button = QtWidgets.QPushButton("Next ▶")
+        self.full_button = QtWidgets.QPushButton("Full size")
+        self.full_button.setCheckable(True)
+        self.name_label = QtWidgets.QLabel()
+        for widget in (self.previous_button, self.name_label, self.next_button):
+            buttons.addWidget(widget)
+        buttons.addStretch()
+        buttons.addWidget(self.full_button)
+        layout.addLayout(buttons)
+        self.previous_button.clicked.connect(lambda: self.show_image(self.current - 1))
+        self.next_button.clicked.connect(lambda: self.show_image(self.current + 1))
+        self.full_button.toggled.connect(self._set_full_size)
+
+        screen = QtWidgets.QApplication.primaryScreen().availableGeometry()
+        self.resize(int(screen.width() * 0.8), int(screen.height() * 0.8))
+        self.show_image(0)
+
+    def _set_full_size(self, checked):
+        self.full_size = checked
+        self.scroll.setWidgetResizable(not checked)
+        self.show_image(self.current)
+
+    def show_image(self, i):
+        self.current = max(0, min(i, len(self.images) - 1))
+        self.previous_button.setEnabled(self.current > 0)
+        self.next_button.setEnabled(self.current < len(self.images) - 1)
+        image = self.images[self.current]
+        self.name_label.setText(f"{os.path.basename(image['image_path'])} "
+                                f"({self.current + 1} of {len(self.images)})")
+        self.label.clear()
+        QtWidgets.QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            path = next((p for p in image_paths(image) if os.path.exists(p)), None)
+            if path is None:
+                self.label.setText("Image not found (still being moved, or in a container)")
+                return
+            if self.full_size:
+                frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            else:
+                edge = max(self.scroll.viewport().width(), self.scroll.viewport().height())
+                frame = fit(read_reduced(path, edge), edge)
+            if frame is None:
+                raise IOError(f"cannot read {path}")
+            self.label.setPixmap(QtGui.QPixmap.fromImage(to_qimage(frame)))
+            if self.full_size:
+                self.label.adjustSize()
+        except Exception as e:
+            self.label.setText(str(e))
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+
+class ReviewPanel(QtWidgets.QWidget):
+    """Thumbnail list of capture sets with a refresh button. Double-click a
+    set to open it in an ImageViewer."""
+
+    refresh_requested = QtCore.pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = ReviewModel(parent=self)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        header = QtWidgets.QHBoxLayout()
+        self.count_label = QtWidgets.QLabel()
+        refresh = QtWidgets.QPushButton("Refresh")
+        refresh.clicked.connect(self.refresh_requested)
+        header.addWidget(self.count_label)
+        header.addStretch()
+        header.addWidget(refresh)
+        layout.addLayout(header)
+
+        self.view = QtWidgets.QListView()
+        self.view.setModel(self.model)
+        self.view.setViewMode(QtWidgets.QListView.IconMode)
+        self.view.setIconSize(QtCore.QSize(set_width(), THUMB_EDGE))
+        self.view.setGridSize(QtCore.QSize(set_width() + 16, THUMB_EDGE + 48))
+        self.view.setResizeMode(QtWidgets.QListView.Adjust)
+        self.view.setMovement(QtWidgets.QListView.Static)
+        # Uniform sizes + batched layout: only visible rows are laid out and
+        # asked for their thumbnail
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QtWidgets.QListView.Batched)
+        self.view.setBatchSize(200)
+        self.view.setWordWrap(True)
+        self.view.activated.connect(self.open_set)
+        layout.addWidget(self.view)
+
+        self.model.rowsInserted.connect(self._update_count)
+        self.model.modelReset.connect(self._update_count)
+        self._update_count()
+
+    def _update_count(self):
+        self.count_label.setText(
+            f"{self.model.rowCount()} capture set(s), {self.model.images} image(s)")
+
+    def open_set(self, index):
+        ImageViewer(self.model.set_at(index.row()), self).exec_()
@@ -0,0 +1,281 @@
+"""Stage captures on a local disk and move them to the output folder.
+
+When the output folder is a network share, writing captures straight to it
+puts every network stall into the capture. With staging, images are written
+to a local folder (~/.rapiid/staging by default) mirroring the output
+layout, and a Mover copies them to the output folder in the background:
+
+- `streams` files are copied at once, each to a ".part" file that is
+  renamed into place, so a half-copied image never appears in the output.
+- The copy is hashed (SHA-256) as it is written and, with `verify`, read
+  back and hashed again before the staged file is deleted.
+- A failed copy is retried with exponential backoff, up to `retries` times;
+  after that it is marked failed and retried at the next start.
+- CSV rows travel with their images and are added, grouped per CSV file,
+  once the images have arrived.
+- The queue is a SQLite database in the staging folder, so files still
+  waiting when the app closes are moved on the next start.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from scripts import catalogue
+
+STAGING_DIR = Path.home() / ".rapiid" / "staging"
+QUEUE_FILE = "queue.sqlite"
+FILES_DIR = "files"
+CHUNK_BYTES = 1024 * 1024
+
+log = logging.getLogger("rapiid.staging")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    src TEXT NOT NULL UNIQUE,
+    dst TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    csv_path TEXT,
+    csv_row TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',   -- pending, copying, copied, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_try REAL NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, next_try);
+"""
+
+
+def has_backlog(staging_dir=STAGING_DIR):
+    """True if a previous session left files waiting in `staging_dir`."""
+    path = Path(staging_dir) / QUEUE_FILE
+    if not path.exists():
+        return False
+    conn = sqlite3.connect(str(path))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] > 0
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Mover:
+    """Background mover from the staging folder to the output folder."""
+
+    def __init__(self, staging_dir=STAGING_DIR, streams=4, retries=5, verify=True,
+                 retry_delay_s=2.0):
+        self.staging_dir = Path(staging_dir)
+        self.files_dir = self.staging_dir / FILES_DIR
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        self.streams = max(1, int(streams))
+        self.retries = max(1, int(retries))
+        self.verify = verify
+        self.retry_delay_s = retry_delay_s
+        self.files_moved = 0
+        self._lock = threading.Lock()          # guards the connection
+        self._csv_lock = threading.Lock()      # one CSV flush at a time
+        self._wake = threading.Event()
+        self._stopping = False
+        self._conn = sqlite3.connect(str(self.staging_dir / QUEUE_FILE),
+                                     check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            # Copies interrupted by the last exit, and files that gave up,
+            # get another go
+            self._conn.execute("UPDATE jobs SET state = 'pending', attempts = 0, next_try = 0 "
+                               "WHERE state IN ('copying', 'failed')")
+        self._threads = [
+            threading.Thread(target=self._run, name=f"mover-{i}", daemon=True)
+            for i in range(self.streams)
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._flush_csv()
+
+    def staged_path(self, final_path, output_location):
+        """Where to write `final_path` (inside `output_location`) while staging.
+
+        Each output folder stages under its name and a hash of its full
+        path, so two folders of the same name (D:/a/images, E:/b/images)
+        never share staged files.
+        """
+        out = Path(output_location).resolve()
+        rel = Path(final_path).resolve().relative_to(out)
+        digest = hashlib.sha1(str(out).encode("utf-8")).hexdigest()[:8]
+        return self.files_dir / f"{out.name}-{digest}" / rel
+
+    def enqueue(self, items):
+        """Queue files to move, in one transaction.
+
+        Each item is a dict with 'src' and 'dst' paths and optionally
+        'csv_path' and 'csv_row' (a dict) to append once the file arrives.
+        A file queued again before it was moved keeps only the newest job.
+        """
+        rows = []
+        for item in items:
+            row = item.get('csv_row')
+            rows.append((str(item['src']), str(item['dst']), os.path.getsize(item['src']),
+                         str(item['csv_path']) if item.get('csv_path') else None,
+                         json.dumps(row) if row else None))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO jobs (src, dst, bytes, csv_path, csv_row) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+        self._wake.set()
+
+    def backlog(self):
+        """Files and bytes waiting, and files that failed."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*), COALESCE(SUM(bytes), 0) FROM jobs GROUP BY state"
+            ).fetchall()
+        counts = {state: (n, size) for state, n, size in rows}
+        failed = counts.pop('failed', (0, 0))[0]
+        counts.pop('copied', None)             # only the CSV row is left to write
+        return {
+            'files': sum(n for n, _ in counts.values()),
+            'bytes': sum(size for _, size in counts.values()),
+            'failed': failed,
+        }
+
+    def retry_failed(self):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET state = 'pending', attempts = 0, next_try = 0 "
+                               "WHERE state = 'failed'")
+        self._wake.set()
+
+    def stop(self, timeout=10.0):
+        """Stop after the copies in progress; queued files wait for next time."""
+        self._stopping = True
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            self._conn.close()
+
+    # ── Worker threads ─────────────────────────────────────────────────────────
+
+    def _claim(self):
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id, src, dst, attempts FROM jobs WHERE state = 'pending' "
+                "AND next_try <= ? ORDER BY id LIMIT 1", (time.time(),)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE jobs SET state = 'copying' WHERE id = ?", (row[0],))
+        return row
+
+    def _run(self):
+        while not self._stopping:
+            job = self._claim()
+            if job is None:
+                self._wake.wait(1.0)
+                self._wake.clear()
+                continue
+            job_id, src, dst, attempts = job
+            try:
+                self._move(Path(src), Path(dst), job_id)
+            except Exception as e:
+                attempts += 1
+                with self._lock, self._conn:
+                    if attempts >= self.retries:
+                        self._conn.execute(
+                            "UPDATE jobs SET state = 'failed', attempts = ?, error = ? "
+                            "WHERE id = ?", (attempts, str(e), job_id))
+                        log.error(f"Giving up moving {src} to {dst}: {e}")
+                    else:
+                        delay = self.retry_delay_s * 2 ** (attempts - 1)
+                        self._conn.execute(
+                            "UPDATE jobs SET state = 'pending', attempts = ?, next_try = ?, "
+                            "error = ? WHERE id = ?", (attempts, time.time() + delay, str(e), job_id))
+                        log.warning(f"Moving {src} failed ({e}); retrying in {delay:.1f} s")
+                continue
+            self._flush_csv()
+
+    def _move(self, src, dst, job_id):
+        if not src.exists():
+            if dst.exists():
+                # Copied and renamed before the last exit, but not recorded
+                self._done(job_id, src)
+                return
+            raise FileNotFoundError(f"staged file missing: {src}")
+
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        part = dst.with_name(dst.name + ".part")
+        digest = hashlib.sha256()
+        with open(src, "rb") as fin, open(part, "wb") as fout:
+            for chunk in iter(lambda: fin.read(CHUNK_BYTES), b""):
+                digest.update(chunk)
+                fout.write(chunk)
+            fout.flush()
+            os.fsync(fout.fileno())
+        if self.verify and _sha256(part) != digest.hexdigest():
+            part.unlink()
+            raise IOError("checksum mismatch after copy")
+        os.replace(part, dst)
+        self._done(job_id, src)
+
+    def _done(self, job_id, src):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'copied' WHERE id = ? AND csv_row IS NOT NULL", (job_id,))
+            self._conn.execute(
+                "DELETE FROM jobs WHERE id = ? AND csv_row IS NULL", (job_id,))
+            # A retake of the same file may have been queued meanwhile
+            requeued = self._conn.execute(
+                "SELECT 1 FROM jobs WHERE src = ? AND id != ?", (str(src), job_id)).fetchone()
+        if not requeued:
+            try:
+                src.unlink()
+                self._prune(src.parent)
+            except OSError:
+                pass
+        self.files_moved += 1
+
+    def _prune(self, folder):
+        """Remove empty staging folders up to files_dir."""
+        while folder != self.files_dir and self.files_dir in folder.parents:
+            try:
+                folder.rmdir()
+            except OSError:
+                return
+            folder = folder.parent
+
+    def _flush_csv(self):
+        """Add the CSV rows of copied files, one write per CSV file, then
+        drop their jobs. A retaken image's row replaces its earlier one, so
+        a crash in between cannot repeat a row either."""
+        with self._csv_lock:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, csv_path, csv_row FROM jobs WHERE state = 'copied' ORDER BY id"
+                ).fetchall()
+            by_file = {}
+            for job_id, path, row in rows:
+                by_file.setdefault(path, []).append((job_id, json.loads(row)))
+            for path, entries in by_file.items():
+                path = Path(path)
+                try:
+                    catalogue.replace_csv_rows(path, [row for _, row in entries])
+                except OSError as e:
+                    # Stays 'copied'; appended after the next file arrives
+                    log.warning(f"Cannot append to {path} yet: {e}")
+                    continue
+                with self._lock, self._conn:
+                    self._conn.executemany("DELETE FROM jobs WHERE id = ?",
+                                           [(job_id,) for job_id, _ in entries])